@@ -0,0 +1,122 @@
+"""
+Concurrent invoice posting stress test.
+
+Starts several processes (one per billing terminal) that post invoices into
+the same database as fast as they can, each through its own DBManager, with
+numbers drawn from one series. Afterwards it checks that the numbers handed
+out are unique and gap-free and reports the sustained invoices per second.
+With --stock the items start with that much stock, so posters compete for it:
+invoices that no longer fit are rejected and stock must never go negative.
+
+    python benchmarks/concurrent_posting.py bench.db --processes 8 --invoices 200
+    python benchmarks/concurrent_posting.py bench.db --processes 8 --invoices 50 --stock 100
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.db_manager import DBManager
+from modules.billing.numbering import fiscal_year
+from modules.billing.posting import StockConflict, post_invoice
+from modules.inventory.ledger import adjust_stock
+
+LINES_PER_INVOICE = 5
+
+def ensure_master_data(db, items=LINES_PER_INVOICE):
+    """Makes sure party 1 and the first `items` items exist. Returns their item ids."""
+    if not db.execute_query("SELECT COUNT(*) FROM parties")[0][0]:
+        db.execute_query("INSERT INTO parties (name) VALUES ('Stress Test Party')", commit=True)
+    missing = items - db.execute_query("SELECT COUNT(*) FROM items")[0][0]
+    if missing > 0:
+        db.bulk_insert("items", ("name", "sku", "price", "stock_quantity"),
+                       [(f"Stress item {i}", f"STRESS{i:04d}", 10.0, 1e9) for i in range(missing)])
+    return [r[0] for r in db.execute_query("SELECT id FROM items ORDER BY id LIMIT ?", (items,))]
+
+def poster(db_path, series, invoices, item_ids, start_at):
+    """One terminal: tries to post `invoices` invoices. Returns (numbers it was given, rejected count)."""
+    db = DBManager(db_path=db_path, slow_query_ms=None)
+    try:
+        lines = [{'id': item_id, 'qty': 1, 'rate': 10.0, 'total': 10.0} for item_id in item_ids]
+        total = sum(line['total'] for line in lines)
+        party_id = db.execute_query("SELECT MIN(id) FROM parties")[0][0]
+        today = date.today().isoformat()
+        numbers, rejected = [], 0
+        time.sleep(max(0.0, start_at - time.time())) # start together, after every process has connected
+        for _ in range(invoices):
+            try:
+                numbers.append(post_invoice(db, {'series': series, 'party_id': party_id, 'date': today,
+                                                 'total_amount': total}, lines)[1])
+            except StockConflict:
+                rejected += 1
+        return numbers, rejected
+    finally:
+        db.close()
+
+def run_stress(db_path, processes=4, invoices=100, series=None, stock=None):
+    """
+    Posts processes * invoices invoices concurrently. Returns a report dict with the
+    numbers drawn, duplicates and gaps found, rejected invoices, the lowest stock
+    left and the sustained invoices per second.
+    """
+    series = series or f"ST{int(time.time())}"
+    db = DBManager(db_path=db_path, slow_query_ms=None)
+    try:
+        item_ids = ensure_master_data(db)
+        if stock is not None:
+            adjust_stock(db, {item_id: stock for item_id in item_ids}, note="stress test stock")
+    finally:
+        db.close()
+
+    context = multiprocessing.get_context("spawn")
+    start_at = time.time() + 1.0 + 0.25 * processes
+    with context.Pool(processes) as pool:
+        pending = [pool.apply_async(poster, (db_path, series, invoices, item_ids, start_at))
+                   for _ in range(processes)]
+        results = [result.get() for result in pending]
+    elapsed = time.time() - start_at
+    numbers = [number for drawn, _ in results for number in drawn]
+
+    db = DBManager(db_path=db_path, slow_query_ms=None)
+    try:
+        min_stock = db.execute_query(f"SELECT MIN(stock_quantity) FROM items WHERE id IN "
+                                     f"({', '.join('?' * len(item_ids))})", tuple(item_ids))[0][0]
+    finally:
+        db.close()
+
+    prefix = f"{series}/{fiscal_year(date.today())}/"
+    values = sorted(int(number[len(prefix):]) for number in numbers)
+    expected = set(range(values[0], values[0] + len(values))) if values else set()
+    return {
+        'invoices': len(numbers),
+        'duplicates': len(values) - len(set(values)),
+        'gaps': sorted(expected - set(values)),
+        'rejected': sum(rejected for _, rejected in results),
+        'min_stock': min_stock,
+        'elapsed_s': round(elapsed, 3),
+        'invoices_per_s': round(len(numbers) / elapsed, 1) if elapsed > 0 else None,
+        'numbers': numbers,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post invoices from several processes at once")
+    parser.add_argument("db_path")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--invoices", type=int, default=200, help="invoices per process")
+    parser.add_argument("--series", help="number series to draw from (default: a fresh one per run)")
+    parser.add_argument("--stock", type=float, help="stock each item starts with (default: leave as is)")
+    args = parser.parse_args(argv)
+
+    report = run_stress(args.db_path, args.processes, args.invoices, args.series, args.stock)
+    print(f"{report['invoices']:,} invoices from {args.processes} processes in {report['elapsed_s']:.2f}s "
+          f"({report['invoices_per_s']} invoices/s)")
+    print(f"duplicates: {report['duplicates']}, gaps: {len(report['gaps'])}, "
+          f"rejected for stock: {report['rejected']}, lowest stock left: {report['min_stock']:g}")
+    return 1 if report['duplicates'] or report['gaps'] or report['min_stock'] < 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
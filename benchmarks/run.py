@@ -0,0 +1,274 @@
+"""
+End-to-end performance benchmarks.
+
+Times the code paths behind the screens headlessly against a seeded database
+(see benchmarks/seed.py): the invoice list, dashboard KPIs, every analytics
+report, the CSV exports and PDF invoice rendering (one by one and batched). View methods are called
+with a stand-in that only carries .db, so the timed code is the code the
+screens run. Results are written as JSON; with --baseline each benchmark's
+median is compared against a previous run and regressions fail the run.
+
+    python benchmarks/run.py --db bench.db --seed-scale small --output results.json
+    python benchmarks/run.py --db bench.db --output results.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.seed import SCALES, seed
+from core.virtual_tree import SqlRowSource
+from db.db_manager import DBManager
+from modules.analytics.view import AnalyticsModule, SALES_TREND_SQL, TOP_PRODUCTS_SQL, TOP_CUSTOMERS_SQL
+from modules.billing.batch_pdf import fetch_batch, render_batch
+from modules.billing.filters import compile_invoice_filter
+from modules.billing.pos import PosCart
+from modules.billing.view import InvoiceListFrame, INVOICE_LIST_SOURCE, ITEM_MASTER_SQL, fetch_invoice_lines
+from modules.dashboard.view import DashboardModule
+from modules.hr.view import EmployeeListFrame
+from modules.inventory.ledger import last_month_end, stock_as_of
+from modules.inventory.reorder import suggest_purchase_orders
+from modules.inventory.valuation import valuation_as_of
+from modules.inventory.view import InventoryModule
+
+PERIODS = ("Daily", "Monthly", "Annual")
+LIST_PAGE = 200 # rows per VirtualTreeview page
+SCROLL_PAGES = 50
+POS_SCANS = 1000
+TABLES = ("parties", "items", "invoices", "invoice_items", "documents", "employees")
+
+def time_runs(func, repeat):
+    """Runs func once cold and `repeat` more times. Returns timings in ms and the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    warm = timings[1:]
+    return {
+        'first_ms': round(timings[0], 3),
+        'min_ms': round(min(warm), 3),
+        'median_ms': round(statistics.median(warm), 3),
+        'max_ms': round(max(warm), 3),
+        'runs': len(warm),
+    }, result
+
+def benchmarks(db, workdir, pdf_invoices):
+    """(name, func, describe(result) -> extra fields) for every timed code path."""
+    view = SimpleNamespace(db=db)
+    count_rows = lambda rows: {'rows': len(rows)}
+    file_size = lambda path: {'bytes': os.path.getsize(path)}
+
+    invoices = SqlRowSource(db, **INVOICE_LIST_SOURCE)
+    cases = [
+        # What the invoice list loads when opened: the row count and its first page
+        ("invoice_list", lambda: (invoices.count(), invoices.page(0, LIST_PAGE))[1], count_rows),
+        ("invoice_list_scroll", lambda: scroll_pages(invoices, SCROLL_PAGES), count_rows),
+        # Finding one invoice through the filter bar
+        ("invoice_search_number", lambda: search_invoices(db, number_prefix="INV-0000123"), count_rows),
+        ("invoice_search_party", lambda: search_invoices(db, party="Party 00042", status="final"), count_rows),
+        ("dashboard_kpis", lambda: DashboardModule.fetch_kpis(view), None),
+        # POS mode: loading the item master once, then scans resolved in memory
+        ("pos_load_items", lambda: PosCart(db.execute_query(ITEM_MASTER_SQL)), lambda cart: {'items': len(cart.items)}),
+        ("pos_scan", pos_scanner(db, POS_SCANS), lambda n: {'scans': n}),
+        # Every item's stock at the last period end, from snapshots and the movement ledger
+        ("stock_as_of", lambda: stock_as_of(db, last_month_end()), lambda stock: {'items': len(stock)}),
+        # FIFO and weighted-average cost of every item, replayed from the whole ledger
+        ("stock_valuation", lambda: valuation_as_of(db, date.today().isoformat()),
+         lambda rows: {'items': len(rows)}),
+        # Purchase orders for the trigger-maintained low-stock set
+        ("reorder_suggestions", lambda: suggest_purchase_orders(db),
+         lambda orders: {'lines': sum(len(o['lines']) for o in orders)}),
+    ]
+    for period in PERIODS:
+        since = AnalyticsModule.get_date_filter(view, period)
+        params = (AnalyticsModule.get_group_format(view, period), since)
+        key = period.lower()
+        cases += [
+            (f"analytics_sales_trend_{key}", lambda p=params: db.execute_query(SALES_TREND_SQL, p), count_rows),
+            (f"analytics_top_products_{key}", lambda s=since: db.execute_query(TOP_PRODUCTS_SQL, (s,)), count_rows),
+            (f"analytics_top_customers_{key}", lambda s=since: db.execute_query(TOP_CUSTOMERS_SQL, (s,)), count_rows),
+        ]
+
+    exports = (("export_invoices_csv", InvoiceListFrame.write_csv),
+               ("export_stock_csv", InventoryModule.write_csv),
+               ("export_employees_csv", EmployeeListFrame.write_csv))
+    for name, write_csv in exports:
+        path = os.path.join(workdir, f"{name}.csv")
+        cases.append((name, lambda w=write_csv, p=path: w(view, p) or p, file_size))
+
+    cases.append(("pdf_generate_invoice", lambda: render_pdfs(db, workdir, pdf_invoices),
+                  lambda n: {'invoices': n}))
+    cases.append(("pdf_salary_slip", lambda: render_payslips(db, workdir, pdf_invoices),
+                  lambda n: {'documents': n}))
+    # The same invoices through the batch export: set-based fetch, one render process per core
+    cases.append(("pdf_batch", lambda: render_batch_pdfs(db, os.path.join(workdir, "batch"), pdf_invoices),
+                  lambda n: {'invoices': n}))
+    return cases
+
+def scroll_pages(source, pages):
+    """Keyset-pages through the list as continuous scrolling would."""
+    rows = source.page(0, LIST_PAGE)
+    seen = list(rows)
+    for _ in range(pages - 1):
+        if not rows:
+            break
+        rows = source.after(rows[-1], LIST_PAGE)
+        seen += rows
+    return seen
+
+def pos_scanner(db, scans):
+    """
+    Returns a function that scans `scans` SKUs (cycling through a few hundred items) into the cart.
+    The item master is loaded on the first (cold) run only, as the POS tab loads it once.
+    """
+    state = {}
+    def scan():
+        if 'cart' not in state:
+            state['cart'] = cart = PosCart(db.execute_query(ITEM_MASTER_SQL))
+            state['codes'] = [item[5] for item in list(cart.items.values())[:300] if item[5]]
+        cart, codes = state['cart'], state['codes']
+        cart.clear()
+        for i in range(scans if codes else 0):
+            cart.scan(codes[i % len(codes)])
+        return scans if codes else 0
+    return scan
+
+def search_invoices(db, **fields):
+    where, params = compile_invoice_filter(**fields)
+    source = SqlRowSource(db, where=where, params=params, **INVOICE_LIST_SOURCE)
+    source.count()
+    return source.page(0, LIST_PAGE)
+
+def render_pdfs(db, workdir, count):
+    from common.pdf_generator import shared_generator
+    pdf = shared_generator(output_dir=workdir)
+    headers = db.execute_query(
+        "SELECT i.id, i.invoice_number, p.name, i.date, i.total_amount FROM invoices i "
+        "LEFT JOIN parties p ON i.party_id = p.id WHERE i.id <= ? ORDER BY i.id", (count,))
+    for inv_id, number, party_name, inv_date, total in headers:
+        items = fetch_invoice_lines(db, inv_id)
+        invoice = {'number': number, 'party_name': party_name or "", 'date': inv_date, 'total_amount': total}
+        pdf.generate_invoice(invoice, items)
+    return len(headers)
+
+def render_payslips(db, workdir, count):
+    from common.pdf_generator import shared_generator
+    pdf = shared_generator(output_dir=workdir)
+    employees = db.execute_query("SELECT name, role, base_salary FROM employees ORDER BY id LIMIT ?", (count,))
+    for name, role, base in employees:
+        pdf.generate_salary_slip({'name': name, 'role': role or "", 'month': "May 2026", 'generated_on': "2026-05-31",
+                                  'base': base or 0.0, 'bonus': 0.0, 'total': base or 0.0})
+    return len(employees)
+
+def render_batch_pdfs(db, workdir, count):
+    return len(render_batch(fetch_batch(db, "i.id <= ?", (count,)), workdir)['paths'])
+
+def run(db, repeat=5, pdf_invoices=50, only=None, progress=print):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bizapp-bench-") as workdir:
+        for name, func, describe in benchmarks(db, workdir, pdf_invoices):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            timing, result = time_runs(func, repeat)
+            if describe:
+                timing.update(describe(result))
+            results[name] = timing
+            progress(f"  {name:<34} median {timing['median_ms']:>10.2f} ms  (first {timing['first_ms']:.2f} ms)")
+    for name in ('pdf_generate_invoice', 'pdf_batch'):
+        if results.get(name, {}).get('invoices'):
+            r = results[name]
+            r['invoices_per_s'] = round(r['invoices'] / (r['median_ms'] / 1000), 1)
+    if results.get('pdf_salary_slip', {}).get('documents'):
+        r = results['pdf_salary_slip']
+        r['documents_per_s'] = round(r['documents'] / (r['median_ms'] / 1000), 1)
+    if results.get('pos_scan', {}).get('scans'):
+        r = results['pos_scan']
+        r['ms_per_scan'] = round(r['median_ms'] / r['scans'], 4)
+    return results
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Returns (lines, regressions). A benchmark regresses when its median is more than
+    `tolerance` (fraction) and more than min_delta_ms above the baseline median.
+    """
+    lines, regressions = [], []
+    for name, current in results.items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            lines.append(f"  {name:<34} (new)")
+            continue
+        before, after = base['median_ms'], current['median_ms']
+        change = (after - before) / before if before else 0.0
+        regressed = change > tolerance and after - before > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        lines.append(f"  {name:<34} {before:>10.2f} -> {after:>10.2f} ms  {change:+7.1%}"
+                     f"{'  REGRESSION' if regressed else ''}")
+    return lines, regressions
+
+def table_counts(db):
+    return {t: db.execute_query(f"SELECT COUNT(*) FROM {t}")[0][0] for t in TABLES}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the end-to-end performance benchmarks")
+    parser.add_argument("--db", default="bench.db", help="benchmark database (seeded if empty)")
+    parser.add_argument("--seed-scale", choices=sorted(SCALES), default="small",
+                        help="scale used when the database has to be seeded")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark after a cold run")
+    parser.add_argument("--pdf-invoices", type=int, default=50, help="invoices rendered per PDF run")
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed slowdown before failing (0.20 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    db = DBManager(db_path=args.db, slow_query_ms=None)
+    try:
+        if not db.execute_query("SELECT COUNT(*) FROM invoices")[0][0]:
+            print(f"Seeding {args.db} at '{args.seed_scale}' scale")
+            seed(db, **SCALES[args.seed_scale])
+        counts = table_counts(db)
+        print(f"Benchmarking {args.db}: " + ", ".join(f"{t}={n:,}" for t, n in counts.items()))
+        results = run(db, repeat=args.repeat, pdf_invoices=args.pdf_invoices, only=args.only)
+    finally:
+        db.close()
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'rows': counts,
+        'benchmarks': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('rows') != counts:
+            print("Warning: baseline was taken on a database of a different size")
+        lines, regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        print(f"Compared with {args.baseline}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Synthetic data generator for benchmarks.
+
+Seeds an empty database through DBManager at a given scale. Rows are
+generated lazily and written in bulk_insert batches, so memory stays flat
+even at millions of invoice lines. The output is deterministic for a given
+seed, so runs compared against a baseline see the same data.
+
+    python benchmarks/seed.py bench.db --scale medium
+    python benchmarks/seed.py bench.db --invoices 500000 --invoice-items 2500000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.db_manager import DBManager
+
+SCALES = {
+    "small": dict(parties=200, items=1_000, invoices=10_000, invoice_items=50_000, documents=500, employees=50),
+    "medium": dict(parties=2_000, items=20_000, invoices=200_000, invoice_items=1_000_000, documents=5_000, employees=200),
+    "large": dict(parties=10_000, items=100_000, invoices=2_000_000, invoice_items=10_000_000, documents=50_000,
+                  employees=1_000),
+}
+
+TAX_RATES = (0.0, 5.0, 12.0, 18.0, 28.0)
+STATUSES = ("draft", "final", "final", "final", "paid", "cancelled")
+HISTORY_DAYS = 3 * 365 # Invoices are spread over the last three years
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def party_rows(rnd, count):
+    for i in range(1, count + 1):
+        yield (i, f"Party {i:05d}", rnd.choice(("customer", "customer", "supplier")), f"98{i:08d}")
+
+def item_rows(rnd, count):
+    for i in range(1, count + 1):
+        yield (i, f"Item {i:06d}", f"SKU{i:07d}", round(rnd.uniform(10, 5000), 2),
+               rnd.randint(0, 500), rnd.choice(TAX_RATES), f"{rnd.randint(1000, 9999)}")
+
+def invoice_rows(rnd, invoices, invoice_items, parties, items, lines_out):
+    """
+    Yields invoice headers and appends their lines to lines_out, so each header's
+    total_amount matches its lines. invoice_items lines are spread over all invoices.
+    """
+    per_invoice, extra = divmod(invoice_items, invoices)
+    today = date.today()
+    line_id = 0
+    for i in range(1, invoices + 1):
+        total = 0.0
+        for _ in range(per_invoice + (1 if i <= extra else 0)):
+            line_id += 1
+            qty = rnd.randint(1, 20)
+            rate = round(rnd.uniform(10, 5000), 2)
+            line_total = round(qty * rate, 2)
+            total += line_total
+            lines_out.append((line_id, i, rnd.randint(1, items), qty, rate, line_total))
+        day = today - timedelta(days=rnd.randrange(HISTORY_DAYS))
+        yield (i, f"INV-{i:08d}", rnd.randint(1, parties), day.isoformat(), round(total, 2),
+               rnd.choice(STATUSES), f"{day.isoformat()} {rnd.randrange(9, 19):02d}:{rnd.randrange(60):02d}:00")
+
+def document_rows(rnd, count):
+    today = date.today()
+    for i in range(1, count + 1):
+        ext = rnd.choice((".PDF", ".PNG", ".XLSX"))
+        day = today - timedelta(days=rnd.randrange(HISTORY_DAYS))
+        yield (i, f"doc_{i:06d}{ext.lower()}", f"my_documents_store/doc_{i:06d}{ext.lower()}", ext,
+               f"{day.isoformat()} 12:00:00")
+
+def employee_rows(rnd, count):
+    for i in range(1, count + 1):
+        yield (i, f"Employee {i:05d}", rnd.choice(("Staff", "Sales", "Accounts", "Manager")),
+               rnd.randrange(15_000, 120_000, 500))
+
+def seed(db, parties, items, invoices, invoice_items, documents, employees, seed=42, batch_size=50_000,
+         progress=print):
+    """Fills an empty database. Returns the row counts written per table."""
+    if db.execute_query("SELECT COUNT(*) FROM invoices")[0][0]:
+        raise ValueError("database already has invoices; seed an empty one")
+
+    rnd = random.Random(seed)
+    counts = {}
+
+    def load(table, columns, rows):
+        start = time.perf_counter()
+        written = 0
+        for batch in batched(rows, batch_size):
+            written += db.bulk_insert(table, columns, batch)
+        counts[table] = counts.get(table, 0) + written
+        progress(f"  {table}: {written:,} rows in {time.perf_counter() - start:.1f}s")
+
+    load("parties", ("id", "name", "type", "phone"), party_rows(rnd, parties))
+    load("items", ("id", "name", "sku", "price", "stock_quantity", "tax_rate", "hsn_code"), item_rows(rnd, items))
+    load("employees", ("id", "name", "role", "base_salary"), employee_rows(rnd, employees))
+    load("documents", ("id", "filename", "filepath", "doc_type", "upload_date"), document_rows(rnd, documents))
+
+    # Headers and their lines are generated together but written table by table
+    lines = []
+    for headers in batched(invoice_rows(rnd, invoices, invoice_items, parties, items, lines), batch_size):
+        load("invoices", ("id", "invoice_number", "party_id", "date", "total_amount", "status", "created_at"), headers)
+        load("invoice_items", ("id", "invoice_id", "item_id", "quantity", "rate", "total"), lines)
+        lines.clear()
+
+    with db.write_connection() as conn:
+        conn.execute("ANALYZE")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("db_path")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for table in SCALES["small"]:
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, help=f"override the scale's {table} count")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale])
+    sizes.update({table: getattr(args, table) for table in sizes if getattr(args, table) is not None})
+
+    db = DBManager(db_path=args.db_path, slow_query_ms=None)
+    try:
+        print(f"Seeding {args.db_path}: {sizes}")
+        seed(db, seed=args.seed, **sizes)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
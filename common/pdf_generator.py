@@ -4,26 +4,80 @@ from reportlab.lib import colors
 from reportlab.platypus import Table, TableStyle
 import os
 
+COMPANY_NAME = "BizSuperApp Demo Company"
+COMPANY_ADDRESS = "123, Tech Street, Bangalore, KA - 560001"
+COMPANY_CONTACT = "GSTIN: 29AAAAA0000A1Z5 | Phone: 9876543210"
+
+INVOICE_COLUMNS = ['Item', 'HSN', 'Qty', 'Rate', 'Taxable', 'GST %', 'Tax', 'Total']
+INVOICE_COL_WIDTHS = [140, 45, 35, 55, 65, 40, 55, 60]
+INVOICE_TERMS = ("Terms & Conditions:",
+                 "1. Goods once sold will not be taken back.",
+                 "2. Interest @ 18% p.a. will be charged if not paid within due date.")
+
+PAYSLIP_COL_WIDTHS = [150, 100, 150, 100]
+PAYSLIP_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'), # Total Row
+]
+
+# Page streams are Flate-compressed through ReportLab's public pageCompression setting,
+# per canvas; ReportLab also ASCII85-encodes them, and that is accepted
+PAGE_COMPRESSION = 1
+
+_shared = {}
+
+def shared_generator(output_dir="invoices"):
+    """A warm generator per output directory, so repeated documents reuse its cached layout."""
+    if output_dir not in _shared:
+        _shared[output_dir] = PDFGenerator(output_dir)
+    return _shared[output_dir]
+
 class PDFGenerator:
+    """
+    Table styles are built once per generator and reused, as is the layout
+    above; keep one instance for a run of documents (see shared_generator).
+    """
     def __init__(self, output_dir="invoices"):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        self._payslip_style = TableStyle(PAYSLIP_STYLE)
+        self._invoice_styles = {} # item rows -> TableStyle
+
+    def invoice_style(self, item_rows):
+        """The items table style; only the grid's extent depends on the invoice."""
+        style = self._invoice_styles.get(item_rows)
+        if style is None:
+            style = self._invoice_styles[item_rows] = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, item_rows), 1, colors.black),
+                ('LINEBELOW', (0, -1), (-1, -1), 2, colors.black),
+            ])
+        return style
 
     def generate_invoice(self, invoice_data, items, output_filename=None):
         if not output_filename:
-            output_filename = f"{invoice_data['number']}.pdf"
+            # Series numbers look like INV/2026-27/00001
+            output_filename = f"{invoice_data['number']}.pdf".replace("/", "-")
         
         filepath = os.path.join(self.output_dir, output_filename)
-        c = canvas.Canvas(filepath, pagesize=A4)
+        c = canvas.Canvas(filepath, pagesize=A4, pageCompression=PAGE_COMPRESSION)
         width, height = A4
         
         # --- Header ---
         c.setFont("Helvetica-Bold", 20)
-        c.drawString(50, height - 50, "BizSuperApp Demo Company")
+        c.drawString(50, height - 50, COMPANY_NAME)
         
         c.setFont("Helvetica", 10)
-        c.drawString(50, height - 70, "123, Tech Street, Bangalore, KA - 560001")
-        c.drawString(50, height - 85, "GSTIN: 29AAAAA0000A1Z5 | Phone: 9876543210")
+        c.drawString(50, height - 70, COMPANY_ADDRESS)
+        c.drawString(50, height - 85, COMPANY_CONTACT)
         
         c.setFont("Helvetica-Bold", 16)
         c.drawRightString(width - 50, height - 50, "TAX INVOICE")
@@ -42,34 +96,35 @@ class PDFGenerator:
         c.drawString(350, height - 150, f"Date: {invoice_data['date']}")
         
         # --- Items Table ---
-        # Data preparation
-        data = [['Item', 'Qty', 'Rate', 'Tax %', 'Total']]
+        # Data preparation; GST figures are the ones stored with the lines (not recomputed here)
+        data = [INVOICE_COLUMNS]
         for item in items:
+            has_tax = item.get('tax_amount') is not None
             data.append([
                 item['name'],
-                str(item['qty']),
+                item.get('hsn') or '',
+                f"{item['qty']:g}",
                 f"₹ {item['rate']:.2f}",
-                # Mock tax for now, logic could be passed
-                str(item.get('tax', '18%')), 
+                f"₹ {item['taxable']:.2f}" if has_tax else '-',
+                f"{item['tax_rate']:g}%" if has_tax else str(item.get('tax', '-')),
+                f"₹ {item['tax_amount']:.2f}" if has_tax else '-',
                 f"₹ {item['total']:.2f}"
             ])
             
-        # Total Row
-        data.append(['', '', '', 'Grand Total:', f"₹ {invoice_data['total_amount']:.2f}"])
+        # Tax summary and total rows
+        if items and all(item.get('tax_amount') is not None for item in items):
+            data.append(['', '', '', '', '', '', 'Taxable Value:', f"₹ {sum(i['taxable'] for i in items):.2f}"])
+            igst = sum(i['igst'] or 0 for i in items)
+            if igst:
+                data.append(['', '', '', '', '', '', 'IGST:', f"₹ {igst:.2f}"])
+            else:
+                data.append(['', '', '', '', '', '', 'CGST:', f"₹ {sum(i['cgst'] or 0 for i in items):.2f}"])
+                data.append(['', '', '', '', '', '', 'SGST:', f"₹ {sum(i['sgst'] or 0 for i in items):.2f}"])
+        data.append(['', '', '', '', '', '', 'Grand Total:', f"₹ {invoice_data['total_amount']:.2f}"])
         
         # Style
-        table = Table(data, colWidths=[200, 50, 80, 60, 100])
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -2), 1, colors.black),
-            ('LINEBELOW', (0, -1), (-1, -1), 2, colors.black),
-        ])
-        table.setStyle(style)
+        table = Table(data, colWidths=INVOICE_COL_WIDTHS)
+        table.setStyle(self.invoice_style(len(items)))
         
         # Draw Table
         table.wrapOn(c, width, height)
@@ -78,12 +133,11 @@ class PDFGenerator:
         # --- Footer ---
         y_pos = height - 200 - (len(data) * 20) - 50
         c.setFont("Helvetica", 8)
-        c.drawString(50, y_pos, "Terms & Conditions:")
-        c.drawString(50, y_pos - 15, "1. Goods once sold will not be taken back.")
-        c.drawString(50, y_pos - 30, "2. Interest @ 18% p.a. will be charged if not paid within due date.")
+        for i, line in enumerate(INVOICE_TERMS):
+            c.drawString(50, y_pos - 15 * i, line)
         
         c.setFont("Helvetica-Bold", 10)
-        c.drawRightString(width - 50, y_pos - 30, "For BizSuperApp Demo Company")
+        c.drawRightString(width - 50, y_pos - 30, f"For {COMPANY_NAME}")
         c.drawString(width - 150, y_pos - 60, "Authorized Signatory")
         
         c.save()
@@ -97,14 +151,14 @@ class PDFGenerator:
         filename = f"Payslip_{slip_data['name']}_{slip_data['month']}.pdf"
         filepath = os.path.join(self.output_dir, filename)
         
-        c = canvas.Canvas(filepath, pagesize=A4)
+        c = canvas.Canvas(filepath, pagesize=A4, pageCompression=PAGE_COMPRESSION)
         width, height = A4
         
         # Header
         c.setFont("Helvetica-Bold", 22)
-        c.drawCentredString(width/2, height - 50, "BIZSUPERAPP DEMO COMPANY")
+        c.drawCentredString(width/2, height - 50, COMPANY_NAME.upper())
         c.setFont("Helvetica", 10)
-        c.drawCentredString(width/2, height - 70, "123, Tech Street, Bangalore, KA")
+        c.drawCentredString(width/2, height - 70, COMPANY_ADDRESS)
         
         c.setLineWidth(1)
         c.line(50, height - 90, width - 50, height - 90)
@@ -132,15 +186,8 @@ class PDFGenerator:
             ['Gross Earnings', f"{slip_data['total']:,.2f}", 'Total Deductions', '0.00']
         ]
         
-        table = Table(data, colWidths=[150, 100, 150, 100])
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'), # Total Row
-        ])
-        table.setStyle(style)
+        table = Table(data, colWidths=PAYSLIP_COL_WIDTHS)
+        table.setStyle(self._payslip_style)
         
         table.wrapOn(c, width, height)
         table.drawOn(c, 50, height - 400)
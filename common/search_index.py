@@ -0,0 +1,122 @@
+"""
+In-memory search over master data (items, parties) for typeahead lookups.
+
+Every record is indexed under its searchable texts (name, SKU, phone, ...):
+a sorted list of texts and their words answers prefix queries with a binary
+search, and a trigram index answers substring queries by scanning the
+shortest posting list. Prefix matches rank ahead of substring matches.
+Updates are incremental; stale postings are skipped at query time. Once
+they pile up, needs_compaction turns true and the owner builds a fresh index
+off the UI thread and swaps it in.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+def normalize(text):
+    return " ".join(str(text).lower().split()) if text is not None else ""
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    def __init__(self, texts_of):
+        """texts_of(record) -> the record's searchable strings; record[0] is its key."""
+        self.texts_of = texts_of
+        self.clear()
+
+    def clear(self):
+        self._records = {} # key -> record
+        self._haystacks = {} # key -> normalized texts joined by "\n"
+        self._terms = [] # sorted (term, key): whole texts and each word in them
+        self._postings = defaultdict(list) # trigram -> [key, ...]
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, key):
+        return self._records.get(key)
+
+    def build(self, records):
+        self.clear()
+        terms = []
+        for record in records:
+            terms += self._index(record)
+        terms.sort()
+        self._terms = terms
+
+    def add(self, record):
+        """Adds or replaces a record. A replacement with the same texts (a stock change) is not reindexed."""
+        key = record[0]
+        if key in self._records:
+            if self._haystacks[key] == self._haystack(record):
+                self._records[key] = record
+                return
+            self.remove(key)
+        for term in self._index(record):
+            insort(self._terms, term)
+
+    def remove(self, key):
+        haystack = self._haystacks.pop(key, None)
+        if haystack is None:
+            return
+        del self._records[key]
+        self._stale += haystack.count("\n") + 1
+
+    @property
+    def needs_compaction(self):
+        """True once stale postings pile up; build() a fresh index (it takes seconds at 100k records)."""
+        return self._stale > max(1000, len(self._terms) // 4)
+
+    def search(self, query, limit=10):
+        """Up to limit records matching query: prefix matches first, then substring matches."""
+        query = normalize(query)
+        if not query:
+            return []
+        found = {}
+        terms = self._terms
+        for i in range(bisect_left(terms, (query,)), len(terms)):
+            term, key = terms[i]
+            if not term.startswith(query):
+                break
+            if key not in found and self._is_current(key, term):
+                found[key] = self._records[key]
+                if len(found) >= limit:
+                    return list(found.values())
+
+        if len(query) >= 3:
+            postings = self._postings
+            lists = [postings[gram] if gram in postings else () for gram in trigrams(query)]
+            for key in min(lists, key=len):
+                if key not in found and query in self._haystacks.get(key, ""):
+                    found[key] = self._records[key]
+                    if len(found) >= limit:
+                        break
+        return list(found.values())
+
+    def _haystack(self, record):
+        return "\n".join(t for t in (normalize(t) for t in self.texts_of(record)) if t)
+
+    def _index(self, record):
+        key = record[0]
+        haystack = self._haystack(record)
+        texts = haystack.split("\n") if haystack else []
+        self._records[key] = record
+        self._haystacks[key] = haystack
+        terms, grams = set(texts), set()
+        for text in texts:
+            terms.update(text.split())
+            grams.update(text[i:i + 3] for i in range(len(text) - 2))
+        postings = self._postings
+        for gram in grams:
+            postings[gram].append(key)
+        return [(term, key) for term in terms]
+
+    def _is_current(self, key, term):
+        # A replaced or removed record leaves its old terms behind until compaction;
+        # a term is current only if it is still one of the record's texts or words
+        haystack = self._haystacks.get(key)
+        if haystack is None:
+            return False
+        texts = haystack.split("\n")
+        return term in texts or any(term in text.split() for text in texts)
@@ -0,0 +1,56 @@
+class TreeSync:
+    """
+    Keeps a Treeview whose iids are row ids of `table` in step with committed
+    changes (DBManager.subscribe), touching only the rows that changed.
+
+    rows_sql re-reads changed rows: its "{ids}" placeholder becomes one ? per id,
+    followed by the values of params(). Rows it no longer returns (deleted, or
+    filtered out by params) are removed. format_row(row) gives the Treeview values.
+    When a commit changed too many rows to list, reload() runs instead.
+    """
+    def __init__(self, db, tree, table, rows_sql, format_row, reload, new_rows_at="end", params=tuple):
+        self.db = db
+        self.tree = tree
+        self.rows_sql = rows_sql
+        self.format_row = format_row
+        self.reload = reload
+        self.new_rows_at = 0 if new_rows_at == "top" else "end"
+        self.params = params
+        db.subscribe(table, self.on_changes, widget=tree)
+
+    def on_changes(self, events):
+        changed, deleted = set(), set()
+        for event in events:
+            if event.rowids is None:
+                self.reload()
+                return
+            (deleted if event.op == "delete" else changed).update(event.rowids)
+        changed -= deleted
+
+        for row_id in deleted:
+            if self.tree.exists(str(row_id)):
+                self.tree.delete(str(row_id))
+        if changed:
+            # params() may read Tk widgets, so it is evaluated here on the Tk thread
+            self.db.submit(self.fetch_rows, sorted(changed), tuple(self.params()),
+                           widget=self.tree, on_done=self.apply_rows)
+
+    def fetch_rows(self, ids, params):
+        sql = self.rows_sql.format(ids=", ".join("?" * len(ids)))
+        return ids, self.db.execute_query(sql, (*ids, *params))
+
+    def apply_rows(self, result):
+        ids, rows = result
+        found = set()
+        for row in rows:
+            iid = str(row[0])
+            found.add(iid)
+            values = self.format_row(row)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+            else:
+                self.tree.insert("", self.new_rows_at, iid=iid, values=values)
+        for row_id in ids:
+            iid = str(row_id)
+            if iid not in found and self.tree.exists(iid):
+                self.tree.delete(iid)
@@ -0,0 +1,102 @@
+"""
+Entry with an incremental-search popup, backed by a SearchIndex.
+
+Each keystroke asks the index for the top matches and shows them in a small
+listbox under the entry; nothing is loaded into the widget up front, so the
+master data can be as large as it likes.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+class TypeaheadEntry(ttk.Entry):
+    """
+    index: a common.search_index.SearchIndex (may be swapped later via .index).
+    format_result(record) -> the text shown in the popup and put into the entry.
+    on_select(record) is called when a match is picked (Enter, Tab or click).
+    .selected holds the picked record until the text is edited again.
+    """
+    def __init__(self, parent, index, format_result, on_select=None, limit=10, **entry_options):
+        self.var = entry_options.pop("textvariable", None) or tk.StringVar()
+        super().__init__(parent, textvariable=self.var, **entry_options)
+        self.index = index
+        self.format_result = format_result
+        self.on_select = on_select
+        self.limit = limit
+        self.selected = None
+        self.matches = []
+
+        self.popup = tk.Toplevel(self)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.listbox = tk.Listbox(self.popup, height=limit, activestyle="dotbox", exportselection=False)
+        self.listbox.pack(fill="both", expand=True)
+        self.listbox.bind("<ButtonRelease-1>", self.on_click)
+
+        self.bind("<KeyRelease>", self.on_key)
+        self.bind("<Down>", lambda e: self.move(1))
+        self.bind("<Up>", lambda e: self.move(-1))
+        self.bind("<Return>", self.choose)
+        self.bind("<Tab>", self.choose, add="+")
+        self.bind("<Escape>", lambda e: self.hide())
+        self.bind("<FocusOut>", lambda e: self.after(150, self.hide))
+
+    def on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Tab", "Escape", "Shift_L", "Shift_R",
+                            "Control_L", "Control_R", "Alt_L", "Alt_R"):
+            return
+        self.selected = None
+        self.show(self.index.search(self.var.get(), self.limit))
+
+    def show(self, matches):
+        self.matches = matches
+        self.listbox.delete(0, tk.END)
+        if not matches:
+            self.hide()
+            return
+        for record in matches:
+            self.listbox.insert(tk.END, self.format_result(record))
+        self.listbox.selection_set(0)
+        self.listbox.configure(height=len(matches))
+        self.popup.geometry(f"{max(self.winfo_width(), 250)}x{self.listbox.winfo_reqheight()}"
+                            f"+{self.winfo_rootx()}+{self.winfo_rooty() + self.winfo_height()}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide(self):
+        self.popup.withdraw()
+
+    def move(self, step):
+        if not self.matches:
+            return "break"
+        current = self.listbox.curselection()
+        index = min(max((current[0] if current else -1) + step, 0), len(self.matches) - 1)
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def on_click(self, event):
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(self.listbox.nearest(event.y))
+        self.choose()
+
+    def choose(self, event=None):
+        current = self.listbox.curselection()
+        if not self.popup.winfo_viewable() or not current:
+            return None
+        self.select(self.matches[current[0]])
+        return "break" if event is not None and event.keysym == "Return" else None
+
+    def select(self, record):
+        self.selected = record
+        self.var.set(self.format_result(record))
+        self.icursor(tk.END)
+        self.hide()
+        if self.on_select:
+            self.on_select(record)
+
+    def clear(self):
+        self.selected = None
+        self.matches = []
+        self.var.set("")
+        self.hide()
@@ -0,0 +1,328 @@
+"""
+Virtual (windowed) Treeview for lists too large to load whole.
+
+Only the rows in view exist as Tk items. Rows come from a row source in pages:
+scrolling onto the next or previous page seeks from the boundary row (keyset
+pagination on the sort column and the row id), while jumps (dragging the
+scrollbar, Home/End) fetch by OFFSET. Clicking a heading re-sorts in SQL.
+"""
+from tkinter import ttk
+
+class SqlRowSource:
+    """
+    Pages through SELECT <columns> FROM <from_clause> [WHERE where] in one sort order.
+
+    columns: (name, sql) pairs; the first is the row key (a unique integer id).
+    Columns that only serve as sort keys (e.g. created_at) can trail the ones shown.
+    Keyset pages cost O(page) when the sort column is indexed; NULL sort values
+    (which SQLite orders lowest) are walked as a separate run. count_from can drop
+    joins that only add display columns, so COUNT(*) runs on covering indexes.
+    """
+    def __init__(self, db, columns, from_clause, sort=None, descending=False, where="", params=(), count_from=None):
+        self.db = db
+        self.columns = list(columns)
+        self.names = [name for name, _ in self.columns]
+        self.key = self.columns[0][1]
+        self.from_clause = from_clause
+        self.count_from = count_from or from_clause
+        self.sort = sort or self.names[0]
+        self.descending = descending
+        self.where = where
+        self.params = tuple(params)
+
+    def set_sort(self, name, descending):
+        self.sort, self.descending = name, descending
+
+    def set_filter(self, where="", params=()):
+        self.where, self.params = where, tuple(params)
+
+    def count(self):
+        where = f" WHERE {self.where}" if self.where else ""
+        return self.db.execute_query(f"SELECT COUNT(*) FROM {self.count_from}{where}", self.params)[0][0]
+
+    def page(self, offset, limit):
+        return self._select((), (), self.descending, limit, offset)
+
+    def after(self, row, limit):
+        """Up to limit rows following row in the current order."""
+        return self._seek(row, self.descending, limit)
+
+    def before(self, row, limit):
+        """Up to limit rows preceding row, in the current order."""
+        return self._seek(row, not self.descending, limit)[::-1]
+
+    def _seek(self, row, descending, limit):
+        sort = dict(self.columns)[self.sort]
+        op = "<" if descending else ">"
+        if sort == self.key:
+            return self._select((f"{self.key} {op} ?",), (row[0],), descending, limit)
+
+        value = row[self.names.index(self.sort)]
+        nulls_ahead = not descending # Walking ascending, NULLs come before everything else
+        if value is None:
+            rows = self._select((f"{sort} IS NULL", f"{self.key} {op} ?"), (row[0],), descending, limit)
+            if nulls_ahead and len(rows) < limit:
+                rows += self._select((f"{sort} IS NOT NULL",), (), descending, limit - len(rows))
+            return rows
+        rows = self._select((f"({sort}, {self.key}) {op} (?, ?)",), (value, row[0]), descending, limit)
+        if not nulls_ahead and len(rows) < limit:
+            rows += self._select((f"{sort} IS NULL",), (), descending, limit - len(rows))
+        return rows
+
+    def _select(self, conditions, params, descending, limit, offset=0):
+        sort = dict(self.columns)[self.sort]
+        direction = "DESC" if descending else "ASC"
+        order = f"{sort} {direction}" if sort == self.key else f"{sort} {direction}, {self.key} {direction}"
+        conditions = ([self.where] if self.where else []) + list(conditions)
+        where = " WHERE " + " AND ".join(f"({c})" for c in conditions) if conditions else ""
+        sql = (f"SELECT {', '.join(sql for _, sql in self.columns)} FROM {self.from_clause}{where} "
+               f"ORDER BY {order} LIMIT ? OFFSET ?")
+        return list(self.db.execute_query(sql, (*self.params, *params, limit, offset)))
+
+class RowWindow:
+    """
+    The consecutive rows [start, start + len(rows)) of a source's order that are in
+    memory, and which fetch brings rows [top, top + visible) into it.
+    """
+    def __init__(self, page_size=200, max_rows=1000):
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.clear()
+
+    def clear(self):
+        self.start = 0
+        self.rows = []
+
+    @property
+    def end(self):
+        return self.start + len(self.rows)
+
+    def covers(self, top, visible, total):
+        return self.start <= top and min(top + visible, total) <= self.end
+
+    def rows_at(self, top, visible):
+        return self.rows[top - self.start:top - self.start + visible]
+
+    def plan(self, top, visible):
+        """(kind, anchor, limit): 'after'/'before' seek from an anchor row, 'page' reads at an offset."""
+        if self.rows:
+            if self.start <= top and self.end < top + visible <= self.end + self.page_size:
+                return "after", self.rows[-1], self.page_size
+            if self.start - self.page_size <= top < self.start:
+                return "before", self.rows[0], self.page_size
+        return "page", max(0, top - self.page_size // 4), self.page_size
+
+    def apply(self, kind, anchor, limit, rows):
+        """Merges fetched rows. Returns the row count if the fetch ran into the end of the list."""
+        if kind == "page":
+            self.start, self.rows = anchor, rows
+            return anchor + len(rows) if len(rows) < limit else None
+        if kind == "after":
+            self.rows += rows
+            if len(self.rows) > self.max_rows:
+                drop = len(self.rows) - self.max_rows
+                self.start += drop
+                del self.rows[:drop]
+            return self.end if len(rows) < limit else None
+        # before: fewer rows than asked for means the window now starts the list
+        self.start = max(0, self.start - len(rows)) if len(rows) == limit else 0
+        self.rows = rows + self.rows
+        del self.rows[self.max_rows:]
+        return None
+
+class VirtualTreeview(ttk.Frame):
+    """
+    A Treeview holding only the visible window of a row source's rows.
+
+    headings: (column, title) pairs for the shown columns; format_row(row) gives
+    their values. Item iids are row keys, so selection() / item(iid) work as on a
+    plain Treeview through .tree. With watch=(tables...), committed changes to
+    those tables reload the window (see DBManager.subscribe). on_count(total) is
+    called whenever the row count changes.
+    """
+    HEADER_HEIGHT = 25 # px
+
+    def __init__(self, parent, db, source, headings, format_row, watch=(), sortable=None, page_size=200,
+                 on_count=None, **tree_options):
+        super().__init__(parent)
+        self.db = db
+        self.source = source
+        self.format_row = format_row
+        self.on_count = on_count
+        self.window = RowWindow(page_size)
+        self.total = 0
+        self.top = 0
+        self.visible = 20
+        self._generation = 0 # bumped when the order or contents change; older fetches are dropped
+        self._loading = False
+        self._selected = ()
+
+        columns = [column for column, _ in headings]
+        self.titles = dict(headings)
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", **tree_options)
+        for column, title in headings:
+            if sortable is None or column in sortable:
+                self.tree.heading(column, text=title, command=lambda c=column: self.sort_by(c))
+            else:
+                self.tree.heading(column, text=title)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self._show_sort_indicator()
+
+        self.tree.bind("<Configure>", self.on_resize)
+        # The Treeview only holds the visible rows, so its own scrolling is replaced
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3) or "break")
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3) or "break")
+        self.tree.bind("<Down>", lambda e: self.on_arrow(1))
+        self.tree.bind("<Up>", lambda e: self.on_arrow(-1))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible) or "break")
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda e: self.scroll_to(self.total) or "break")
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+        if watch:
+            db.subscribe(watch, self.on_changes, widget=self)
+        self.reload()
+
+    # --- Loading ---
+
+    def reload(self, keep_position=False):
+        """Recounts and refetches, e.g. after the filter or sort changed."""
+        self._generation += 1
+        self._loading = False
+        self.window.clear()
+        if not keep_position:
+            self.top = 0
+        self._fetch("page", max(0, self.top - self.window.page_size // 4), self.window.page_size, count=True)
+
+    def on_changes(self, events):
+        # Inserts and deletes shift every offset after them, so the window is re-read
+        # (one page); updates matter only when they touch rows in memory.
+        in_memory = {row[0] for row in self.window.rows}
+        for event in events:
+            if event.rowids is None or event.op != "update" or in_memory.intersection(event.rowids):
+                self.reload(keep_position=True)
+                return
+
+    def _fetch(self, kind, anchor, limit, count=False):
+        self._loading = True
+        self.db.submit(self._load, self._generation, kind, anchor, limit, count,
+                       widget=self, on_done=self._loaded, on_error=self._failed)
+
+    def _load(self, generation, kind, anchor, limit, count):
+        # Runs on the DB worker thread
+        if kind == "page":
+            rows = self.source.page(anchor, limit)
+        elif kind == "after":
+            rows = self.source.after(anchor, limit)
+        else:
+            rows = self.source.before(anchor, limit)
+        return generation, kind, anchor, limit, rows, self.source.count() if count else None
+
+    def _loaded(self, result):
+        generation, kind, anchor, limit, rows, total = result
+        if generation != self._generation:
+            return
+        self._loading = False
+        previous = self.total
+        if total is not None:
+            self.total = total
+        end = self.window.apply(kind, anchor, limit, rows)
+        if end is not None:
+            self.total = end
+        self.total = max(self.total, self.window.end)
+        if self.on_count and (total is not None or self.total != previous):
+            self.on_count(self.total)
+        self.scroll_to(self.top)
+
+    def _failed(self, exc):
+        self._loading = False
+        print(f"List load failed: {exc}")
+
+    # --- Scrolling ---
+
+    def scroll(self, rows):
+        self.scroll_to(self.top + rows)
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, self.total - self.visible))
+        if self.window.covers(self.top, self.visible, self.total):
+            self._render()
+        elif not self._loading:
+            self._fetch(*self.window.plan(self.top, self.visible))
+        self._update_scrollbar()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible)
+        else:
+            self.scroll(int(amount))
+
+    def on_arrow(self, step):
+        # Moving the selection past the first/last visible row scrolls the window
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if not children or focus not in children:
+            return None
+        index = children.index(focus) + step
+        if 0 <= index < len(children):
+            return None # Treeview moves the selection itself
+        self.scroll(step)
+        self.after_idle(self._select_edge, step)
+        return "break"
+
+    def _select_edge(self, step):
+        children = self.tree.get_children()
+        if children:
+            iid = children[-1] if step > 0 else children[0]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - self.HEADER_HEIGHT) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)
+
+    def _update_scrollbar(self):
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _render(self):
+        self.tree.delete(*self.tree.get_children())
+        for row in self.window.rows_at(self.top, self.visible):
+            self.tree.insert("", "end", iid=str(row[0]), values=self.format_row(row))
+        keep = [iid for iid in self._selected if self.tree.exists(iid)]
+        if keep:
+            self.tree.selection_set(keep)
+
+    def on_select(self, event=None):
+        # Remembered by key, so the selection survives the row scrolling out and back
+        selection = self.tree.selection()
+        if selection:
+            self._selected = selection
+
+    # --- Sorting ---
+
+    def sort_by(self, column):
+        descending = not self.source.descending if self.source.sort == column else False
+        self.set_sort(column, descending)
+        self.reload()
+
+    def set_sort(self, column, descending):
+        """Changes the order without reloading (call reload() once the source is set up)."""
+        self.source.set_sort(column, descending)
+        self._show_sort_indicator()
+
+    def _show_sort_indicator(self):
+        for column, title in self.titles.items():
+            arrow = (" ▼" if self.source.descending else " ▲") if column == self.source.sort else ""
+            self.tree.heading(column, text=title + arrow)
@@ -0,0 +1,79 @@
+"""
+In-process cache for master-data reads (parties, items, employees).
+
+Every table has a version number that DBManager bumps after a write to it
+commits. A cached result remembers the versions of the tables it read, so it
+is served only while none of them changed. Entries are evicted LRU once the
+entry or total row bound is hit.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM"
+    r"|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+def tables_read(sql):
+    return frozenset(t.lower() for t in _READ_TABLES.findall(sql))
+
+def table_written(sql):
+    match = _WRITE_TABLE.match(sql)
+    return match.group(1).lower() if match else None
+
+class QueryCache:
+    def __init__(self, max_entries=64, max_rows=500_000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # (sql, params) -> (versions, rows)
+        self._versions = {}
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in sorted(tables))
+
+    def get(self, sql, params):
+        key = (sql, tuple(params))
+        tables = tables_read(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == tuple(self._versions.get(t, 0) for t in sorted(tables)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(key)
+            self.misses += 1
+        return None
+
+    def put(self, sql, params, versions, rows):
+        """versions must be taken (self.versions) before the query ran."""
+        key = (sql, tuple(params))
+        if len(rows) > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (versions, rows)
+            self._rows += len(rows)
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tables):
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def _drop(self, key):
+        _, rows = self._entries.pop(key)
+        self._rows -= len(rows)
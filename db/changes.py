@@ -0,0 +1,77 @@
+"""
+Row-level change notifications for the writer connection.
+
+Temporary triggers on every application table append (table, op, rowid) to
+temp.change_log as the writer modifies rows. DBManager drains the log just
+before each COMMIT (a rollback discards it along with the data) and publishes
+the resulting ChangeEvents to subscribers once the commit has gone through.
+"""
+import threading
+from collections import namedtuple
+
+# rowids is None when a statement touched too many rows to be worth listing;
+# subscribers should then reload whatever they show from that table.
+ChangeEvent = namedtuple("ChangeEvent", "table op rowids")
+
+OPS = ("insert", "update", "delete")
+MAX_EVENT_ROWIDS = 500
+
+# stock_snapshots is also WITHOUT ROWID, which the rowid-logging triggers cannot handle
+_UNWATCHED = ("schema_version", "invoice_sequences", "stock_snapshots")
+
+def watched_tables(conn):
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        if r[0] not in _UNWATCHED]
+
+def install_change_log(conn):
+    """(Re)creates the temp change log and its triggers on conn; safe to call repeatedly."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS change_log (tbl TEXT, op TEXT, row_id INTEGER)")
+    for table in watched_tables(conn):
+        for op in OPS:
+            ref = "OLD" if op == "delete" else "NEW"
+            conn.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS _chg_{table}_{op} AFTER {op.upper()} ON main.{table}
+                BEGIN INSERT INTO change_log VALUES ('{table}', '{op}', {ref}.rowid); END
+            """)
+
+def drain_change_log(cursor):
+    """Reads and empties the change log (inside the open transaction). Returns ChangeEvents."""
+    grouped = {}
+    for table, op, row_id in cursor.execute("SELECT tbl, op, row_id FROM change_log ORDER BY rowid"):
+        grouped.setdefault((table, op), {})[row_id] = None # dict keeps first-seen order
+    if not grouped:
+        return []
+    cursor.execute("DELETE FROM change_log")
+    return [ChangeEvent(table, op, None if len(ids) > MAX_EVENT_ROWIDS else tuple(ids))
+            for (table, op), ids in grouped.items()]
+
+class ChangeBus:
+    def __init__(self):
+        self._subscribers = {} # token -> (tables, deliver)
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, tables, deliver):
+        """deliver(events) is called with the events for tables after each commit."""
+        if isinstance(tables, str):
+            tables = (tables,)
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (frozenset(t.lower() for t in tables), deliver)
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for tables, deliver in subscribers:
+            relevant = [e for e in events if e.table in tables]
+            if relevant:
+                try:
+                    deliver(relevant)
+                except Exception as e:
+                    print(f"Change subscriber failed: {e}")
@@ -1,46 +1,405 @@
-import sqlite3
+import logging
 import os
+import sqlite3
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from db.cache import QueryCache, tables_read, table_written
+from db.changes import ChangeBus, drain_change_log, install_change_log
+from db.instrumentation import InstrumentedConnection, QueryStats, caller_context, find_caller, slow_log
+from db.migrations import apply_migrations
 
 class DBManager:
-    def __init__(self, db_path="biz_app.db"):
+    # How often (ms) the Tk thread drains results coming back from the DB worker
+    UI_POLL_MS = 30
+
+    def __init__(self, db_path="biz_app.db", busy_timeout=5000, max_readers=8,
+                 synchronous="NORMAL", cache_size=-16000, mmap_size=256 * 1024 * 1024,
+                 slow_query_ms=200, slow_query_log=None):
+        """
+        busy_timeout: ms a connection waits on a lock before "database is locked"
+        max_readers: upper bound on pooled read connections (one per thread)
+        cache_size: sqlite page cache per connection (negative = KiB)
+        slow_query_ms / slow_query_log: statements at least this slow are logged
+            (with their query plan) to the given file; see self.stats for timings
+        """
         self.db_path = db_path
-        self.conn = None
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+
+        self.stats = QueryStats(slow_query_ms)
+        if slow_query_log:
+            self._attach_slow_log(slow_query_log)
+
+        # Readers: one pooled connection per thread. WAL lets them run alongside the writer.
+        self._local = threading.local()
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        self._idle_readers = []
+        self._reader_owners = {} # id(conn) -> (thread, conn)
+        self._pool_lock = threading.Lock()
+
+        # Writer: a single connection shared by all threads, serialized by a lock
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._tx_depth = 0 # transaction() nesting, only touched while holding the writer lock
+        self._written = set() # tables written since the last commit
+
+        # Master-data reads (execute_query(..., cached=True)), invalidated per table on commit
+        self.cache = QueryCache()
+
+        # Row-level change events published after each commit (see subscribe)
+        self.changes = ChangeBus()
+        self._change_log = False
+
+        # A single worker keeps submitted work in order (a write followed by a refresh
+        # always sees the write) while the Tk main loop stays free.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-worker")
+        self._ui_queue = queue.SimpleQueue()
+        self._ui_root = None
+
         self.initialize_db()
 
+    def _open_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout / 1000, check_same_thread=False,
+                               factory=InstrumentedConnection)
+        conn.stats = self.stats
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def _attach_slow_log(self, path):
+        path = os.path.abspath(path)
+        if not any(getattr(h, "baseFilename", None) == path for h in slow_log.handlers):
+            handler = logging.FileHandler(path, delay=True, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            slow_log.addHandler(handler)
+
     def get_connection(self):
-        if not self.conn:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-        return self.conn
+        """
+        Returns the calling thread's read connection from the pool.
+        Writes must go through write_connection() (or execute_query(..., commit=True)).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._acquire_reader()
+            self._local.conn = conn
+        return conn
 
-    def initialize_db(self):
-        """Creates tables if they don't exist."""
+    def release_connection(self):
+        """Hands the calling thread's read connection back to the pool."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._pool_lock:
+            self._reader_owners.pop(id(conn), None)
+            self._idle_readers.append(conn)
+        self._reader_slots.release()
+
+    @contextmanager
+    def read_connection(self):
+        """Borrows a read connection for the duration of a block (for short-lived threads)."""
+        owned = getattr(self._local, "conn", None) is not None
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Read schema from file if it exists, otherwise use a hardcoded string or relative path
-        # Assuming schema.sql is in the same directory as this file
-        schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        
-        if os.path.exists(schema_path):
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-                cursor.executescript(schema_sql)
-        else:
-            print("Schema file not found!")
-            
+        try:
+            yield conn
+        finally:
+            if not owned:
+                self.release_connection()
+
+    def _acquire_reader(self):
+        if not self._reader_slots.acquire(blocking=False):
+            self._reclaim_dead_readers()
+            if not self._reader_slots.acquire(timeout=self.busy_timeout / 1000):
+                raise sqlite3.OperationalError("connection pool exhausted")
+        with self._pool_lock:
+            conn = self._idle_readers.pop() if self._idle_readers else None
+        if conn is None:
+            try:
+                conn = self._open_connection()
+            except Exception:
+                self._reader_slots.release()
+                raise
+        with self._pool_lock:
+            self._reader_owners[id(conn)] = (threading.current_thread(), conn)
+        return conn
+
+    def _reclaim_dead_readers(self):
+        # Threads that exit without release_connection() would otherwise leak their slot
+        with self._pool_lock:
+            dead = [key for key, (thread, _) in self._reader_owners.items() if not thread.is_alive()]
+            for key in dead:
+                _, conn = self._reader_owners.pop(key)
+                self._idle_readers.append(conn)
+                self._reader_slots.release()
+
+    def _get_writer(self):
+        if self._writer is None:
+            self._writer = self._open_connection()
+            self._writer.execute("PRAGMA journal_mode = WAL")
+            self._writer.write_hook = self._note_write
+        return self._writer
+
+    @contextmanager
+    def write_connection(self):
+        """
+        Yields the single writer connection while holding the writer lock.
+        Commits when the block exits cleanly, rolls back if it raises.
+        Inside a transaction() block it just joins that transaction.
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            if self._tx_depth:
+                yield conn
+                return
+            try:
+                yield conn
+            except Exception:
+                conn.rollback()
+                self._written.clear()
+                raise
+            else:
+                if conn.in_transaction:
+                    self._commit(conn)
+                else:
+                    self._after_commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the block in one BEGIN IMMEDIATE ... COMMIT on the writer (rollback on error).
+        Nested transaction() blocks become savepoints of the outer one, and
+        execute_query(commit=True) / bulk_* calls inside the block join it.
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            depth = self._tx_depth
+            if depth:
+                savepoint = f"sp_{depth}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+            self._tx_depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                if depth:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                    self._written.clear()
+                raise
+            else:
+                if depth:
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    self._commit(conn)
+            finally:
+                self._tx_depth = depth
+
+    def _note_write(self, sql):
+        # Called by the writer connection for every statement it runs
+        table = table_written(sql)
+        if table:
+            self._written.add(table)
+
+    def _commit(self, conn):
+        # The change log is read inside the transaction, so it holds exactly what commits
+        events = drain_change_log(conn.cursor(sqlite3.Cursor)) if self._change_log else []
         conn.commit()
-    
-    def execute_query(self, query, params=(), commit=False):
+        self._after_commit(events)
+
+    def _after_commit(self, events=()):
+        # Events also cover rows changed by triggers, which the SQL text does not show
+        tables = self._written | {e.table for e in events}
+        self._written = set()
+        if tables:
+            self.cache.invalidate(tables)
+        if events:
+            self.changes.publish(events)
+
+    def subscribe(self, tables, callback, widget=None):
+        """
+        Calls callback(events) after every commit that inserted, updated or deleted
+        rows of the given tables; events are ChangeEvent(table, op, rowids) tuples.
+        With a widget the callback runs on the Tk thread, otherwise on the committing
+        thread while it still holds the writer lock. Returns a token for unsubscribe().
+        """
+        if widget is None:
+            return self.changes.subscribe(tables, callback)
+        self._ensure_ui_pump(widget)
+        token = self.changes.subscribe(tables, lambda events: self._post_to_ui(widget, callback, events))
+        widget.bind("<Destroy>", lambda e: e.widget is widget and self.unsubscribe(token), add="+")
+        return token
+
+    def unsubscribe(self, token):
+        self.changes.unsubscribe(token)
+
+    def bulk_insert(self, table, columns, rows):
+        """INSERTs every tuple in rows with a single executemany. Returns the row count."""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def bulk_update(self, table, set_clause, rows, key="id", where=""):
+        """
+        Runs UPDATE table SET <set_clause> WHERE <key> = ? [AND <where>] for every tuple
+        in rows (set_clause parameters, then the key, then where's) with a single
+        executemany. Returns the number of rows updated.
+        """
+        sql = f"UPDATE {table} SET {set_clause} WHERE {key} = ?" + (f" AND {where}" if where else "")
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def initialize_db(self):
+        """Brings the schema up to date; a no-op beyond one SELECT when already current."""
+        with self.write_connection() as conn:
+            apply_migrations(conn)
+            install_change_log(conn)
+            self._change_log = True
+
+    def execute_query(self, query, params=(), commit=False, cached=False):
+        """
+        cached=True serves a read from the master-data cache; use it for lookups on
+        parties/items/employees. Writes through DBManager invalidate it.
+        """
+        if commit:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                return cursor.lastrowid
+        if cached:
+            rows = self.cache.get(query, params)
+            if rows is not None:
+                return rows
+            versions = self.cache.versions(tables_read(query))
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute(query, params)
-        if commit:
-            conn.commit()
-            return cursor.lastrowid
-        return cursor.fetchall()
+        rows = cursor.fetchall()
+        if cached:
+            self.cache.put(query, params, versions, rows)
+        return rows
+
+    def iter_query(self, query, params=(), batch_size=1000):
+        """
+        Streams the rows of a SELECT in fetchmany() batches instead of fetchall(),
+        so exports of any size run in flat memory. Runs on the caller's read connection.
+        """
+        cursor = self.get_connection().cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cursor.close()
+
+    # --- Background execution ---
+
+    def submit(self, func, *args, widget=None, on_done=None, on_error=None, **kwargs):
+        """
+        Runs func(*args, **kwargs) on the DB worker thread and returns its Future.
+        If a widget is given, on_done(result) / on_error(exc) are called on the Tk thread.
+        """
+        future = self._executor.submit(self._run_for, find_caller(), func, args, kwargs)
+        if widget is not None:
+            self._ensure_ui_pump(widget)
+            future.add_done_callback(
+                lambda f: self._post_to_ui(widget, self._resolve, f, on_done, on_error))
+        return future
+
+    def submit_long(self, func, *args, widget=None, on_done=None, on_error=None, **kwargs):
+        """
+        Like submit(), but runs func on a thread of its own with its own read connection:
+        for jobs that take seconds (imports) and would otherwise hold up every view's
+        queries queued on the DB worker. Their writes still take turns on the writer lock.
+        """
+        future, caller = Future(), find_caller()
+        def run():
+            with self.read_connection():
+                try:
+                    future.set_result(self._run_for(caller, func, args, kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        if widget is not None:
+            self._ensure_ui_pump(widget)
+            future.add_done_callback(
+                lambda f: self._post_to_ui(widget, self._resolve, f, on_done, on_error))
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def submit_query(self, query, params=(), commit=False, widget=None, on_done=None, on_error=None, cached=False):
+        """Background version of execute_query. Returns a Future."""
+        return self.submit(self.execute_query, query, params, commit, cached,
+                           widget=widget, on_done=on_done, on_error=on_error)
+
+    def _run_for(self, caller, func, args, kwargs):
+        # Worker-side queries are attributed to the code that submitted them
+        with caller_context(caller):
+            return func(*args, **kwargs)
+
+    def _resolve(self, future, on_done, on_error):
+        exc = future.exception()
+        if exc is not None:
+            if on_error:
+                on_error(exc)
+            else:
+                print(f"DB task failed: {exc}")
+        elif on_done:
+            on_done(future.result())
+
+    def notify_ui(self, widget, func, *args):
+        """Calls func(*args) on the Tk thread; for progress reports from a task running on the worker."""
+        self._ensure_ui_pump(widget)
+        self._post_to_ui(widget, func, *args)
+
+    def _post_to_ui(self, widget, func, *args):
+        # Safe from any thread: the Tk thread picks this up in _pump_ui
+        self._ui_queue.put((widget, func, args))
+
+    def _ensure_ui_pump(self, widget):
+        if self._ui_root is None:
+            self._ui_root = widget.nametowidget(".")
+            self._ui_root.after(self.UI_POLL_MS, self._pump_ui)
+
+    def _pump_ui(self):
+        while True:
+            try:
+                widget, func, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if widget.winfo_exists():
+                    func(*args)
+            except Exception as e:
+                print(f"UI callback failed: {e}")
+        try:
+            self._ui_root.after(self.UI_POLL_MS, self._pump_ui)
+        except Exception:
+            self._ui_root = None # Root destroyed
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        self._executor.shutdown(wait=True)
+        with self._writer_lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+        with self._pool_lock:
+            for _, conn in self._reader_owners.values():
+                conn.close()
+            for conn in self._idle_readers:
+                conn.close()
+            self._reader_owners = {}
+            self._idle_readers = []
+        self._local = threading.local()
@@ -0,0 +1,235 @@
+"""
+Query instrumentation for DBManager connections.
+
+Every statement run through an InstrumentedConnection (execute_query, submit_query
+and raw get_connection().execute alike) is timed from execute until its rows are
+fetched. QueryStats keeps a latency histogram, row counts and calling modules per
+statement, and logs statements slower than slow_query_ms together with their
+EXPLAIN QUERY PLAN.
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in ms; the last bucket collects everything slower
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+slow_log = logging.getLogger("bizapp.slow_queries")
+
+_DB_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_MODULES = ("threading", "concurrent.", "contextlib")
+_context = threading.local()
+
+def normalize(sql):
+    return " ".join(sql.split())
+
+@contextmanager
+def caller_context(caller):
+    """Attributes queries run inside the block (e.g. on the DB worker) to caller."""
+    previous = getattr(_context, "caller", None)
+    _context.caller = caller
+    try:
+        yield
+    finally:
+        _context.caller = previous
+
+def find_caller():
+    """'module.function' of the nearest frame outside the db package."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not frame.f_code.co_filename.startswith(_DB_DIR) and not module.startswith(_SKIP_MODULES):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return getattr(_context, "caller", None) or "unknown"
+
+def explain(conn, sql, params=()):
+    try:
+        rows = conn.cursor(sqlite3.Cursor).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return [row[3] for row in rows]
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def add(self, elapsed_ms, rows, caller):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        self.callers[caller] += 1
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def percentile(self, pct):
+        """Upper bound (ms) of the histogram bucket holding the given percentile."""
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+class QueryStats:
+    def __init__(self, slow_query_ms=200):
+        self.slow_query_ms = slow_query_ms
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed_ms, rows, caller, plan_source=None):
+        key = normalize(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(elapsed_ms, rows, caller)
+
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            plan = plan_source() if plan_source else []
+            slow_log.warning("%.1f ms, %d rows, from %s\n  %s\n  plan: %s",
+                             elapsed_ms, rows, caller, key, " | ".join(plan) or "-")
+
+    def summary(self):
+        """Per-statement stats, slowest (by total time) first."""
+        with self._lock:
+            stats = list(self._stats.values())
+        stats.sort(key=lambda s: s.total_ms, reverse=True)
+        return [{
+            'sql': s.sql,
+            'count': s.count,
+            'total_ms': round(s.total_ms, 3),
+            'avg_ms': round(s.total_ms / s.count, 3),
+            'p50_ms': s.percentile(50),
+            'p95_ms': s.percentile(95),
+            'max_ms': round(s.max_ms, 3),
+            'rows': s.rows,
+            'histogram': dict(zip([f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"], s.histogram)),
+            'callers': dict(s.callers),
+        } for s in stats]
+
+    def format_summary(self, limit=20):
+        lines = [f"{'total ms':>10} {'calls':>7} {'avg':>8} {'p95':>7} {'max':>8} {'rows':>9}  statement / callers"]
+        for s in self.summary()[:limit]:
+            lines.append(f"{s['total_ms']:>10.1f} {s['count']:>7} {s['avg_ms']:>8.2f} {s['p95_ms']:>7} "
+                         f"{s['max_ms']:>8.1f} {s['rows']:>9}  {s['sql'][:100]}")
+            lines.append(f"{'':>55}  <- {', '.join(sorted(s['callers']))}")
+        return "\n".join(lines)
+
+    def dump(self, path, limit=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.format_summary(limit or len(self._stats)) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times a statement from execute() until its rows are fetched (or it is replaced)."""
+    _pending = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        if self.connection.write_hook is not None:
+            self.connection.write_hook(sql)
+        caller = find_caller()
+        start = time.perf_counter()
+        super().execute(sql, params)
+        self._pending = [sql, params, time.perf_counter() - start, 0, caller]
+        if self.description is None:
+            self._finish(rows=max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        if self.connection.write_hook is not None:
+            self.connection.write_hook(sql)
+        caller = find_caller()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        self._pending = [sql, None, time.perf_counter() - start, 0, caller]
+        self._finish(rows=max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(start, 1 if row is not None else 0)
+        self._finish() # Single-row reads rarely fetch until exhaustion
+        return row
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(start, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        self._add(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _add(self, start, rows):
+        if self._pending:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += rows
+
+    def _finish(self, rows=None):
+        pending, self._pending = self._pending, None
+        stats = getattr(self.connection, "stats", None)
+        if not pending or stats is None:
+            return
+        sql, params, elapsed, fetched, caller = pending
+        plan_source = None
+        if params is not None and sql.lstrip()[:7].upper() not in ("PRAGMA ", "EXPLAIN"):
+            plan_source = lambda: explain(self.connection, sql, params)
+        stats.record(sql, elapsed * 1000, fetched if rows is None else rows, caller, plan_source)
+
+class InstrumentedConnection(sqlite3.Connection):
+    stats = None
+    write_hook = None # DBManager sets this on the writer to learn which tables changed
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
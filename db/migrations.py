@@ -0,0 +1,347 @@
+"""
+Versioned schema migrations.
+
+Each entry in MIGRATIONS is (version, description, apply) where apply(conn)
+runs on the writer connection. apply_migrations() runs every pending entry in
+one transaction and records it in schema_version, so a database is either
+fully upgraded or left untouched. When the recorded version is already the
+latest, startup costs a single SELECT.
+"""
+import os
+import sqlite3
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+def split_statements(script):
+    """Splits a SQL script into statements (executescript would commit mid-migration)."""
+    statements, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            if current.strip():
+                statements.append(current.strip())
+            current = ""
+    leftover = "\n".join(l for l in current.splitlines() if not l.strip().startswith("--")).strip()
+    if leftover:
+        statements.append(leftover)
+    return statements
+
+def run_script(conn, script):
+    for statement in split_statements(script):
+        conn.execute(statement)
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _adopt_legacy_tables(conn, schema_sql):
+    """
+    Brings databases created before schema_version existed (by runtime CREATE TABLEs
+    and the old migrate_db.py) up to the columns declared in schema.sql.
+    """
+    # ComplianceModule used to create compliance_events with 'name' instead of 'title'
+    columns = table_columns(conn, "compliance_events")
+    if "name" in columns and "title" not in columns:
+        conn.execute("ALTER TABLE compliance_events RENAME COLUMN name TO title")
+
+    reference = sqlite3.connect(":memory:")
+    try:
+        reference.executescript(schema_sql)
+        tables = [r[0] for r in reference.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            existing = table_columns(conn, table)
+            if not existing:
+                continue # Not there yet; the schema script creates it whole
+            for _, name, col_type, _, default, _ in reference.execute(f"PRAGMA table_info({table})"):
+                if name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table} ADD COLUMN {name} {col_type}"
+                # ADD COLUMN only accepts constant defaults
+                if default is not None and default.upper() != "CURRENT_TIMESTAMP":
+                    ddl += f" DEFAULT {default}"
+                conn.execute(ddl)
+    finally:
+        reference.close()
+
+def _baseline(conn):
+    with open(SCHEMA_PATH, 'r') as f:
+        schema_sql = f.read()
+    _adopt_legacy_tables(conn, schema_sql)
+    run_script(conn, schema_sql)
+
+def _invoice_filter_indexes(conn):
+    # Invoice list filters: number prefix, and party in the list's created_at order
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices(invoice_number)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_invoices_party ON invoices(party_id, created_at)")
+
+def _invoice_sequences(conn):
+    # Counters the posting transaction draws invoice numbers from (modules/billing/numbering.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS invoice_sequences (
+            company_id INTEGER NOT NULL DEFAULT 0,
+            series TEXT NOT NULL,
+            fiscal_year TEXT NOT NULL,
+            next_value INTEGER NOT NULL,
+            PRIMARY KEY (company_id, series, fiscal_year)
+        )
+    """)
+    # Existing duplicates keep their number on the oldest row; later copies get "#<id>" appended
+    conn.execute("""
+        UPDATE invoices SET invoice_number = invoice_number || '#' || id
+        WHERE id NOT IN (SELECT MIN(id) FROM invoices GROUP BY invoice_number)
+    """)
+    # Same name as before, so the number-prefix filter keeps using it
+    conn.execute("DROP INDEX IF EXISTS idx_invoices_number")
+    conn.execute("CREATE UNIQUE INDEX idx_invoices_number ON invoices(invoice_number)")
+
+def _item_versions(conn):
+    # Bumped by every stock write, so a screen can tell its snapshot of an item went stale
+    if "version" not in table_columns(conn, "items"):
+        conn.execute("ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+def _gst_columns(conn):
+    # Tax figures stored by modules/billing/gst.py; NULL tax_amount marks lines still to backfill
+    for table, columns in (("invoice_items", ("taxable_value REAL", "tax_rate REAL", "cgst REAL", "sgst REAL",
+                                              "igst REAL", "hsn_code TEXT")),
+                           ("invoices", ("taxable_value REAL", "cgst REAL", "sgst REAL", "igst REAL"))):
+        existing = table_columns(conn, table)
+        for column in columns:
+            if column.split()[0] not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+def _stock_ledger(conn):
+    # Append-only stock history (modules/inventory/ledger.py). items.stock_quantity stays as
+    # the running balance, kept by triggers, so stock screens read one row per item
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            kind TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            unit_cost REAL,
+            invoice_id INTEGER,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(item_id) REFERENCES items(id),
+            FOREIGN KEY(invoice_id) REFERENCES invoices(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements(item_id, date)")
+    # Balance per item at the end of as_of, so as-of queries only sum the movements after it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            item_id INTEGER NOT NULL,
+            as_of DATE NOT NULL,
+            quantity REAL NOT NULL,
+            PRIMARY KEY (item_id, as_of)
+        ) WITHOUT ROWID
+    """)
+    # Stock on hand today is where each item's history starts
+    conn.execute("""
+        INSERT INTO stock_movements (item_id, date, kind, quantity, note)
+        SELECT id, date('now', 'localtime'), 'opening', stock_quantity, 'stock on hand when the ledger started'
+        FROM items WHERE COALESCE(stock_quantity, 0) != 0
+    """)
+    # An item's opening stock is the stock_quantity it is created with
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_opening_stock AFTER INSERT ON items
+        WHEN COALESCE(NEW.stock_quantity, 0) != 0
+        BEGIN
+            INSERT INTO stock_movements (item_id, date, kind, quantity, note)
+            VALUES (NEW.id, date('now', 'localtime'), 'opening', NEW.stock_quantity, 'opening stock');
+        END
+    """)
+    # Every other movement moves the balance (and the version, like any stock write) and
+    # corrects snapshots it lands before, so a backdated movement keeps them true
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS stock_movements_balance AFTER INSERT ON stock_movements
+        WHEN NEW.kind != 'opening'
+        BEGIN
+            UPDATE items SET stock_quantity = COALESCE(stock_quantity, 0) + NEW.quantity, version = version + 1
+            WHERE id = NEW.item_id;
+            UPDATE stock_snapshots SET quantity = quantity + NEW.quantity
+            WHERE item_id = NEW.item_id AND as_of >= NEW.date;
+        END
+    """)
+    for op in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS stock_movements_no_{op.lower()} BEFORE {op} ON stock_movements
+            BEGIN SELECT RAISE(ABORT, 'stock_movements is append-only; record an adjustment instead'); END
+        """)
+
+def _item_valuations(conn):
+    # Cost of stock on hand per item, kept by modules/inventory/valuation.py: the FIFO layers
+    # (JSON [[quantity, unit cost], ...]) and moving average as of last_movement_id
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS item_valuations (
+            item_id INTEGER PRIMARY KEY,
+            quantity REAL NOT NULL,
+            fifo_value REAL NOT NULL,
+            avg_cost REAL NOT NULL,
+            avg_value REAL NOT NULL,
+            layers TEXT NOT NULL,
+            last_date DATE NOT NULL,
+            last_movement_id INTEGER NOT NULL,
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+    """)
+
+def _unique_item_skus(conn):
+    # Catalog imports upsert by SKU (modules/inventory/catalog.py). SKUs are matched trimmed and
+    # upper-cased everywhere (POS, invoice import), so they are stored that way; blanks become NULL
+    conn.execute("UPDATE items SET sku = NULLIF(UPPER(TRIM(sku)), '') WHERE sku IS NOT NULL")
+    # Existing duplicates keep their SKU on the oldest item; later copies get "#<id>" appended
+    conn.execute("""
+        UPDATE items SET sku = sku || '#' || id
+        WHERE sku IS NOT NULL AND id NOT IN (SELECT MIN(id) FROM items WHERE sku IS NOT NULL GROUP BY sku)
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_sku ON items(sku)")
+
+def _reorder_levels(conn):
+    # Per-item reorder point (10 was the dashboard's fixed threshold), how much to order, and from whom
+    existing = table_columns(conn, "items")
+    for column in ("reorder_level REAL NOT NULL DEFAULT 10", "reorder_qty REAL",
+                   "supplier_id INTEGER REFERENCES parties(id)"):
+        if column.split()[0] not in existing:
+            conn.execute(f"ALTER TABLE items ADD COLUMN {column}")
+    # Items below their reorder level, kept by the triggers below so readers never scan the catalog
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS low_stock_items (
+            item_id INTEGER PRIMARY KEY,
+            stock_quantity REAL NOT NULL,
+            reorder_level REAL NOT NULL,
+            since TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO low_stock_items (item_id, stock_quantity, reorder_level)
+        SELECT id, COALESCE(stock_quantity, 0), reorder_level FROM items
+        WHERE COALESCE(stock_quantity, 0) < reorder_level
+    """)
+    low = "COALESCE(NEW.stock_quantity, 0) < NEW.reorder_level"
+    # since stays when an item already low moves again
+    upsert = """
+        INSERT INTO low_stock_items (item_id, stock_quantity, reorder_level)
+        VALUES (NEW.id, COALESCE(NEW.stock_quantity, 0), NEW.reorder_level)
+        ON CONFLICT(item_id) DO UPDATE SET stock_quantity = excluded.stock_quantity,
+                                           reorder_level = excluded.reorder_level;
+    """
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS items_low_stock_insert AFTER INSERT ON items WHEN {low} "
+                 f"BEGIN {upsert} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_low_stock_update AFTER UPDATE OF stock_quantity, reorder_level ON items
+        WHEN {low} BEGIN {upsert} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_low_stock_clear AFTER UPDATE OF stock_quantity, reorder_level ON items
+        WHEN NOT ({low}) AND COALESCE(OLD.stock_quantity, 0) < OLD.reorder_level
+        BEGIN DELETE FROM low_stock_items WHERE item_id = NEW.id; END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_low_stock_delete AFTER DELETE ON items
+        BEGIN DELETE FROM low_stock_items WHERE item_id = OLD.id; END
+    """)
+
+def _kpi_counters(conn):
+    # Dashboard figures kept current by triggers (modules/dashboard/kpis.py), read with one
+    # primary-key lookup; verify_kpis.py recounts them from scratch
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            final_sales REAL NOT NULL DEFAULT 0,
+            invoice_count INTEGER NOT NULL DEFAULT 0,
+            party_count INTEGER NOT NULL DEFAULT 0,
+            low_stock_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO kpi_counters (id, final_sales, invoice_count, party_count, low_stock_count)
+        SELECT 1, COALESCE((SELECT SUM(total_amount) FROM invoices WHERE status = 'final'), 0),
+               (SELECT COUNT(*) FROM invoices), (SELECT COUNT(*) FROM parties), (SELECT COUNT(*) FROM low_stock_items)
+    """)
+    # final_sales is kept unrounded: totals can be finer than a paisa, and rounding each step
+    # would drift from the sum. Readers round it for display.
+    sales = "CASE WHEN {row}.status = 'final' THEN COALESCE({row}.total_amount, 0) ELSE 0 END"
+    new, old = sales.format(row="NEW"), sales.format(row="OLD")
+    triggers = {
+        "kpi_invoices_insert": ("AFTER INSERT ON invoices",
+                                f"invoice_count = invoice_count + 1, final_sales = final_sales + {new}"),
+        "kpi_invoices_delete": ("AFTER DELETE ON invoices",
+                                f"invoice_count = invoice_count - 1, final_sales = final_sales - {old}"),
+        "kpi_invoices_update": ("AFTER UPDATE OF status, total_amount ON invoices "
+                                "WHEN OLD.status = 'final' OR NEW.status = 'final'",
+                                f"final_sales = final_sales - {old} + {new}"),
+        "kpi_parties_insert": ("AFTER INSERT ON parties", "party_count = party_count + 1"),
+        "kpi_parties_delete": ("AFTER DELETE ON parties", "party_count = party_count - 1"),
+        # low_stock_items is itself kept by triggers on items, so this follows every stock change
+        "kpi_low_stock_insert": ("AFTER INSERT ON low_stock_items", "low_stock_count = low_stock_count + 1"),
+        "kpi_low_stock_delete": ("AFTER DELETE ON low_stock_items", "low_stock_count = low_stock_count - 1"),
+    }
+    for name, (event, assignments) in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} "
+                     f"BEGIN UPDATE kpi_counters SET {assignments} WHERE id = 1; END")
+
+def _invoice_number_nocase_index(conn):
+    # The number-prefix filter matches case-insensitively ("inv-" finds "INV-..."); the unique
+    # index stays BINARY, so numbers differing only in case are still distinct
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_invoices_number_nocase ON invoices(invoice_number COLLATE NOCASE)")
+
+def _drop_items_stock_index(conn):
+    # Low stock is read from low_stock_items (migration 9); nothing queries items by
+    # stock_quantity any more, and the index cost a write on every stock movement
+    conn.execute("DROP INDEX IF EXISTS idx_items_stock")
+
+MIGRATIONS = [
+    (1, "baseline schema.sql", _baseline),
+    (2, "invoice list filter indexes", _invoice_filter_indexes),
+    (3, "invoice number sequences and unique invoice numbers", _invoice_sequences),
+    (4, "item versions for stock reservation", _item_versions),
+    (5, "GST figures on invoices and their lines", _gst_columns),
+    (6, "stock movement ledger and snapshots", _stock_ledger),
+    (7, "item valuations at cost", _item_valuations),
+    (8, "unique item SKUs", _unique_item_skus),
+    (9, "reorder levels and the low-stock set", _reorder_levels),
+    (10, "trigger-maintained dashboard KPI counters", _kpi_counters),
+    (11, "case-insensitive invoice number index", _invoice_number_nocase_index),
+    (12, "drop the unused stock quantity index", _drop_items_stock_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn):
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0 # Pre-versioned or brand new database
+    return row[0] or 0
+
+def apply_migrations(conn, migrations=MIGRATIONS):
+    """Applies pending migrations in a single transaction. Returns the versions applied."""
+    if current_version(conn) >= migrations[-1][0]:
+        return []
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock: another process may have just migrated
+        version = current_version(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        applied = []
+        for number, description, apply in migrations:
+            if number <= version:
+                continue
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (number, description))
+            applied.append(number)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied
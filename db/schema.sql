@@ -115,3 +115,22 @@ CREATE TABLE IF NOT EXISTS compliance_events (
     company_id INTEGER,
     FOREIGN KEY(company_id) REFERENCES companies(id)
 );
+
+-- Indexes for the hot queries in modules/*/view.py (checked by tests/test_query_plans.py)
+CREATE INDEX IF NOT EXISTS idx_parties_name ON parties(name);
+CREATE INDEX IF NOT EXISTS idx_items_stock ON items(stock_quantity); -- dropped by migration 12
+
+-- Invoice list is newest first
+CREATE INDEX IF NOT EXISTS idx_invoices_created_at ON invoices(created_at);
+-- Covering index for date-filtered analytics (trend, top customers) and the CSV export order
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices(date, party_id, total_amount);
+-- Covering index for the dashboard sales total
+CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status, total_amount);
+
+-- Covering index for invoice lines and the top products aggregate
+CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice ON invoice_items(invoice_id, item_id, total);
+CREATE INDEX IF NOT EXISTS idx_invoice_items_item ON invoice_items(item_id);
+
+CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents(upload_date);
+CREATE INDEX IF NOT EXISTS idx_approval_requests_created_at ON approval_requests(created_at);
+CREATE INDEX IF NOT EXISTS idx_compliance_events_due_date ON compliance_events(due_date);
@@ -0,0 +1,34 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.db_manager import DBManager
+from modules.inventory.catalog import import_catalog
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or update items from a CSV or XLSX catalog, by SKU")
+    parser.add_argument("path", help="CSV or XLSX file, one row per item")
+    parser.add_argument("--db", default="biz_app.db")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: next to the input)")
+    args = parser.parse_args(argv)
+
+    db = DBManager(db_path=args.db, slow_query_ms=None)
+    try:
+        result = import_catalog(db, args.path, args.rejects,
+                                progress=lambda r: print(f"  {r['rows']:,} rows, {r['inserted']:,} new, "
+                                                         f"{r['updated']:,} updated, {r['rejected']:,} rejected"))
+    finally:
+        db.close()
+
+    rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+    print(f"Read {result['rows']:,} rows in {result['seconds']:.1f}s ({rate:,.0f} rows/s): "
+          f"{result['inserted']:,} inserted, {result['updated']:,} updated, {result['unchanged']:,} unchanged.")
+    if result['rejects_path']:
+        print(f"{result['rejected']:,} rows rejected; see {result['rejects_path']}")
+    return 1 if result['rejected'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
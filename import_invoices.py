@@ -0,0 +1,36 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.db_manager import DBManager
+from modules.billing.importer import import_invoices
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import invoices from a CSV or JSONL file")
+    parser.add_argument("path", help="CSV or JSONL file, one row per invoice line")
+    parser.add_argument("--db", default="biz_app.db")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: next to the input)")
+    parser.add_argument("--no-stock", action="store_true", help="import as history: leave item stock alone")
+    args = parser.parse_args(argv)
+
+    db = DBManager(db_path=args.db, slow_query_ms=None)
+    try:
+        result = import_invoices(db, args.path, args.rejects, update_stock=not args.no_stock,
+                                 progress=lambda r: print(f"  {r['lines']:,} lines, {r['invoices']:,} invoices, "
+                                                          f"{r['rejected_rows']:,} rows rejected"))
+    finally:
+        db.close()
+
+    rate = result['lines'] / result['seconds'] if result['seconds'] else 0
+    print(f"Imported {result['invoices']:,} invoices ({result['lines']:,} lines) in {result['seconds']:.1f}s "
+          f"({rate:,.0f} lines/s).")
+    if result['rejects_path']:
+        print(f"{result['rejected_invoices']:,} invoices ({result['rejected_rows']:,} rows) rejected; "
+              f"see {result['rejects_path']}")
+    return 1 if result['rejected_rows'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,7 +65,7 @@ class BizApp(tk.Tk):
             print(f"Icon error: {e}")
             
         # Database
-        self.db = DBManager()
+        self.db = DBManager(slow_query_log="slow_queries.log")
         
         # Layout
         self.sidebar = Sidebar(self, self)
@@ -75,6 +75,7 @@ class BizApp(tk.Tk):
         self.container.pack(side="right", fill="both", expand=True)
         
         self.frames = {}
+        self.current_frame = None
         
         # Initialize Modules
         self.init_modules()
@@ -153,7 +154,12 @@ class BizApp(tk.Tk):
 
     def show_frame(self, key):
         frame = self.frames[key]
+        # Every module stays gridded; these virtual events tell one when it is hidden or shown
+        if self.current_frame is not None and self.current_frame is not frame:
+            self.current_frame.event_generate("<<ModuleHidden>>")
         frame.tkraise()
+        self.current_frame = frame
+        frame.event_generate("<<ModuleShown>>")
 
 if __name__ == "__main__":
     app = BizApp()
@@ -1,34 +1,42 @@
 import sqlite3
+import sys
 import os
 
-db_path = "C:/Users/shiva/.gemini/antigravity/scratch/biz_super_app/biz_app.db"
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-def migrate():
+from db.migrations import apply_migrations, current_version, LATEST_VERSION
+
+def backfill_tax(db_path):
+    """Stores GST figures for invoice lines posted before the tax engine existed."""
+    from db.db_manager import DBManager
+    from modules.billing.gst import backfill
+    db = DBManager(db_path=db_path, slow_query_ms=None)
+    try:
+        filled = backfill(db, progress=lambda done: print(f"  {done:,} invoice lines taxed"))
+        print(f"Backfilled GST on {filled:,} invoice lines.")
+    finally:
+        db.close()
+
+def migrate(db_path):
     try:
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # Check if column exists
-        cursor.execute("PRAGMA table_info(items)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
-        if 'stock_quantity' not in columns:
-            print("Adding stock_quantity column...")
-            cursor.execute("ALTER TABLE items ADD COLUMN stock_quantity REAL DEFAULT 0")
-        
-        if 'tax_rate' not in columns:
-            print("Adding tax_rate column...")
-            cursor.execute("ALTER TABLE items ADD COLUMN tax_rate REAL DEFAULT 18.0")
-            
-        if 'hsn_code' not in columns:
-            print("Adding hsn_code column...")
-            cursor.execute("ALTER TABLE items ADD COLUMN hsn_code TEXT")
-            
-        conn.commit()
-        print("Migration successful.")
-            
+        before = current_version(conn)
+        applied = apply_migrations(conn)
+
+        if applied:
+            print(f"Migrated {db_path} from version {before} to {applied[-1]} (applied {applied}).")
+        else:
+            print(f"{db_path} is already at version {LATEST_VERSION}.")
+
         conn.close()
     except Exception as e:
-        print(f"Migration failed: {e}")
+        print(f"Migration failed (database left unchanged): {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    migrate()
+    args = [a for a in sys.argv[1:] if a != "--backfill-tax"]
+    db_path = args[0] if args else "biz_app.db"
+    migrate(db_path)
+    if "--backfill-tax" in sys.argv[1:]:
+        backfill_tax(db_path)
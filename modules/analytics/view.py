@@ -3,6 +3,39 @@ from tkinter import ttk
 from datetime import datetime, timedelta, date
 import math
 
+# Report queries; all filter on invoices.date and are served by idx_invoices_date
+SALES_TREND_SQL = """
+    SELECT strftime(?, i.date) as p, SUM(i.total_amount), COUNT(*)
+    FROM invoices i
+    WHERE i.date >= date('now', ?)
+    GROUP BY p
+    ORDER BY p ASC
+"""
+
+TOP_PRODUCTS_SQL = """
+    SELECT it.name, SUM(ii.total) as val
+    FROM invoice_items ii
+    JOIN invoices i ON ii.invoice_id = i.id
+    JOIN items it ON ii.item_id = it.id
+    WHERE i.date >= date('now', ?)
+    GROUP BY it.name
+    ORDER BY val DESC
+    LIMIT 5
+"""
+
+TOP_CUSTOMERS_SQL = """
+    SELECT p.name, SUM(i.total_amount) as val
+    FROM invoices i
+    JOIN parties p ON i.party_id = p.id
+    WHERE i.date >= date('now', ?)
+    GROUP BY p.name
+    ORDER BY val DESC
+    LIMIT 5
+"""
+
+# Commits arriving within this window are folded into one report reload
+REFRESH_DELAY_MS = 500
+
 class AnalyticsModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -48,38 +81,64 @@ class AnalyticsModule(ttk.Frame):
         
         self.stats_lbl = ttk.Label(self.text_frame, text="Details", font=("Segoe UI", 11), background="white", padding=10, relief="flat")
         self.stats_lbl.pack(fill="both", expand=True)
-        
-        self.refresh_report()
+
+        # Reports read invoices, their lines and party/item names, never stock, so the stock
+        # updates on items are not watched. While the module is hidden, changes only mark the
+        # report stale; it reloads when the module is shown again (main.py's <<ModuleShown>>).
+        self._refresh_job = None
+        self._visible = False
+        self._stale = True
+        self.bind("<<ModuleShown>>", self.on_shown)
+        self.bind("<<ModuleHidden>>", self.on_hidden)
+        self.db.subscribe(("invoices", "invoice_items", "parties"), self.on_changes, widget=self)
 
     def get_date_filter(self, period):
-        if period == "Daily": return "WHERE i.date >= date('now', '-30 days')"
-        if period == "Monthly": return "WHERE i.date >= date('now', '-12 months')"
-        return "WHERE i.date >= date('now', '-5 years')"
+        # date('now', ?) modifier bound into every report query
+        if period == "Daily": return "-30 days"
+        if period == "Monthly": return "-12 months"
+        return "-5 years"
+
+    def on_shown(self, event=None):
+        self._visible = True
+        if self._stale:
+            self.refresh_report()
+
+    def on_hidden(self, event=None):
+        self._visible = False
+
+    def on_changes(self, events):
+        if not self._visible:
+            self._stale = True
+        elif self._refresh_job is None:
+            self._refresh_job = self.after(REFRESH_DELAY_MS, self.refresh_report)
 
     def refresh_report(self, event=None):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self._stale = False
         rtype = self.report_type.get()
         period = self.period_var.get()
-        filter_clause = self.get_date_filter(period)
+        since = self.get_date_filter(period)
         
         if "Bar" in rtype:
-            self.show_trend_bar(period, filter_clause)
+            self.show_trend_bar(period, since)
         elif "Products" in rtype:
-            self.show_product_pie(period, filter_clause)
+            self.show_product_pie(period, since)
         else:
-            self.show_customer_pie(period, filter_clause)
-
-    def show_trend_bar(self, period, filter_clause):
-        # ... (Previous Bar Logic adjusted) ...
-        grp_fmt = "%Y-%m-%d" if period == "Daily" else ("%Y-%m" if period == "Monthly" else "%Y")
-        
-        query = f"""
-            SELECT strftime('{grp_fmt}', i.date) as p, SUM(i.total_amount), COUNT(*)
-            FROM invoices i
-            {filter_clause}
-            GROUP BY p
-            ORDER BY p ASC
-        """
-        rows = self.db.execute_query(query)
+            self.show_customer_pie(period, since)
+
+    def get_group_format(self, period):
+        # strftime() format the sales trend groups by
+        return "%Y-%m-%d" if period == "Daily" else ("%Y-%m" if period == "Monthly" else "%Y")
+
+    def show_trend_bar(self, period, since):
+        grp_fmt = self.get_group_format(period)
+        
+        self.db.submit_query(SALES_TREND_SQL, (grp_fmt, since), widget=self,
+                             on_done=lambda rows: self.show_trend_rows(period, rows))
+
+    def show_trend_rows(self, period, rows):
         data = [(r[0], r[1], r[2]) for r in rows]
         
         self.draw_bar_chart(data, f"Sales {period}")
@@ -88,36 +147,19 @@ class AnalyticsModule(ttk.Frame):
         total = sum(d[1] for d in data)
         self.update_summary(f"Trend: {period}", total, sum(d[2] for d in data), data)
 
-    def show_product_pie(self, period, filter_clause):
+    def show_product_pie(self, period, since):
         # Top 5 Products by Revenue
-        query = f"""
-            SELECT it.name, SUM(ii.total) as val
-            FROM invoice_items ii
-            JOIN invoices i ON ii.invoice_id = i.id
-            JOIN items it ON ii.item_id = it.id
-            {filter_clause}
-            GROUP BY it.name
-            ORDER BY val DESC
-            LIMIT 5
-        """
-        rows = self.db.execute_query(query)
-        self.draw_pie_chart(rows, "Top 5 Products")
-        self.update_summary("Top Products", sum(r[1] for r in rows), 0, rows, is_pie=True)
-
-    def show_customer_pie(self, period, filter_clause):
+        self.db.submit_query(TOP_PRODUCTS_SQL, (since,), widget=self,
+                             on_done=lambda rows: self.show_pie_rows(rows, "Top 5 Products", "Top Products"))
+
+    def show_customer_pie(self, period, since):
         # Top 5 Customers by Revenue
-        query = f"""
-            SELECT p.name, SUM(i.total_amount) as val
-            FROM invoices i
-            JOIN parties p ON i.party_id = p.id
-            {filter_clause}
-            GROUP BY p.name
-            ORDER BY val DESC
-            LIMIT 5
-        """
-        rows = self.db.execute_query(query)
-        self.draw_pie_chart(rows, "Top 5 Customers")
-        self.update_summary("Top Customers", sum(r[1] for r in rows), 0, rows, is_pie=True)
+        self.db.submit_query(TOP_CUSTOMERS_SQL, (since,), widget=self,
+                             on_done=lambda rows: self.show_pie_rows(rows, "Top 5 Customers", "Top Customers"))
+
+    def show_pie_rows(self, rows, title, mode):
+        self.draw_pie_chart(rows, title)
+        self.update_summary(mode, sum(r[1] for r in rows), 0, rows, is_pie=True)
 
     def draw_bar_chart(self, data, title):
         self.canvas.delete("all")
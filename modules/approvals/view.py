@@ -2,6 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+from core.virtual_tree import SqlRowSource, VirtualTreeview
+
+APPROVAL_LIST_SOURCE = dict(
+    columns=(("id", "id"), ("type", "module"), ("status", "status"), ("date", "created_at")),
+    from_clause="approval_requests",
+    sort="date", descending=True,
+)
+
 class ApprovalsModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -25,45 +33,38 @@ class ApprovalsModule(ttk.Frame):
         ttk.Button(req_frame, text="Submit Request", command=self.submit_req).pack(side="left", padx=10)
         
         # List
-        self.tree = ttk.Treeview(self, columns=("id", "type", "details", "status", "date"), show="headings")
-        self.tree.heading("id", text="ID")
-        self.tree.heading("type", text="Type")
-        self.tree.heading("details", text="Details")
-        self.tree.heading("status", text="Status")
-        self.tree.heading("date", text="Date")
-        
-        self.tree.pack(fill="both", expand=True, padx=20, pady=10)
+        headings = (("id", "ID"), ("type", "Type"), ("details", "Details"), ("status", "Status"), ("date", "Date"))
+        self.list = VirtualTreeview(self, self.db, SqlRowSource(self.db, **APPROVAL_LIST_SOURCE), headings,
+                                    self.format_row, watch=("approval_requests",),
+                                    sortable=("id", "type", "status", "date"))
+        self.tree = self.list.tree
+        self.list.pack(fill="both", expand=True, padx=20, pady=10)
         
         # Action Buttons
         btn_frame = ttk.Frame(self)
         btn_frame.pack(pady=10)
         ttk.Button(btn_frame, text="✅ Approve Selected", command=self.approve).pack(side="left", padx=10)
         ttk.Button(btn_frame, text="❌ Reject Selected", command=self.reject).pack(side="left", padx=10)
-        
-        self.refresh()
 
     def submit_req(self):
         rtype = self.type_combo.get()
         details = self.detail_entry.get()
         if rtype and details:
             # We use approval_requests table from schema
-            self.db.execute_query("INSERT INTO approval_requests (module, reference_id, status) VALUES (?, ?, ?)", 
-                                  (rtype, 0, 'pending'), commit=True)
+            self.db.submit_query("INSERT INTO approval_requests (module, reference_id, status) VALUES (?, ?, ?)", 
+                                 (rtype, 0, 'pending'), commit=True)
             # Schema was module, reference_id. Let's hijack 'module' for type and maybe we need a details column?
             # Schema: module TEXT, reference_id INTEGER.
             # I'll stick to schema and maybe add a 'note' column if allows, or just put details in module string for now.
             # "Expense > 5000: Buying Server"
             
-            self.refresh()
             self.detail_entry.delete(0, tk.END)
 
     def refresh(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        rows = self.db.execute_query("SELECT id, module, status, created_at FROM approval_requests ORDER BY created_at DESC")
-        for r in rows:
-            self.tree.insert("", "end", values=(r[0], r[1], "N/A", r[2], r[3]))
+        self.list.reload(keep_position=True)
+
+    def format_row(self, r):
+        return (r[0], r[1], "N/A", r[2], r[3])
 
     def approve(self):
         self.update_status('approved')
@@ -75,5 +76,4 @@ class ApprovalsModule(ttk.Frame):
         sel = self.tree.selection()
         if not sel: return
         item_id = self.tree.item(sel[0], "values")[0]
-        self.db.execute_query("UPDATE approval_requests SET status=? WHERE id=?", (status, item_id), commit=True)
-        self.refresh()
+        self.db.submit_query("UPDATE approval_requests SET status=? WHERE id=?", (status, item_id), commit=True)
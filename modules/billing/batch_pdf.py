@@ -0,0 +1,115 @@
+"""
+Invoice PDFs in bulk, e.g. every invoice of a month or a party (no Tk imports here).
+
+Headers and lines for the whole selection come from two set-based queries
+(the invoice list's filter applied once, not one query per invoice); the
+rendering is spread over a process pool, a chunk of invoices per task, so
+throughput grows with the cores available. The files can optionally be merged
+into one PDF, which needs pypdf.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Invoices per pool task: enough to amortize the pickling, small enough for smooth progress
+RENDER_CHUNK = 20
+
+LINE_COLUMNS = """
+    it.name, ii.quantity, ii.rate, ii.total, ii.hsn_code, ii.taxable_value, ii.tax_rate, ii.tax_amount,
+    ii.cgst, ii.sgst, ii.igst
+"""
+
+BATCH_HEADERS_SQL = """
+    SELECT i.id, i.invoice_number, p.name, p.phone, i.date, i.total_amount
+    FROM invoices i
+    LEFT JOIN parties p ON i.party_id = p.id
+    {where}
+    ORDER BY i.date, i.id
+"""
+
+BATCH_LINES_SQL = """
+    SELECT ii.invoice_id, """ + LINE_COLUMNS + """
+    FROM invoice_items ii
+    JOIN items it ON ii.item_id = it.id
+    WHERE ii.invoice_id IN (SELECT i.id FROM invoices i {where})
+    ORDER BY ii.invoice_id, ii.id
+"""
+
+def invoice_line(row):
+    """A LINE_COLUMNS row as the line dict PDFGenerator.generate_invoice takes."""
+    return {'name': row[0], 'qty': row[1], 'rate': row[2], 'total': row[3], 'hsn': row[4], 'taxable': row[5],
+            'tax_rate': row[6], 'tax_amount': row[7], 'cgst': row[8], 'sgst': row[9], 'igst': row[10]}
+
+def fetch_batch(db, where="", params=()):
+    """
+    The invoices matching a compile_invoice_filter() clause (over invoices aliased as i),
+    as (invoice, lines) pairs ready for generate_invoice, in date order.
+    """
+    where = f"WHERE {where}" if where else ""
+    invoices, order = {}, []
+    for inv_id, number, party_name, phone, inv_date, total in db.execute_query(
+            BATCH_HEADERS_SQL.format(where=where), params):
+        invoices[inv_id] = ({'number': number, 'party_name': party_name or "", 'party_phone': phone or "N/A",
+                             'date': inv_date, 'total_amount': total}, [])
+        order.append(inv_id)
+    for row in db.iter_query(BATCH_LINES_SQL.format(where=where), params):
+        entry = invoices.get(row[0])
+        if entry is not None:
+            entry[1].append(invoice_line(row[1:]))
+    return [invoices[inv_id] for inv_id in order]
+
+def render_chunk(output_dir, jobs):
+    """Pool task: renders (invoice, lines) pairs. Returns the paths written."""
+    from common.pdf_generator import shared_generator
+    pdf = shared_generator(output_dir) # warm across the chunks this process renders
+    return [pdf.generate_invoice(invoice, lines) for invoice, lines in jobs]
+
+def render_batch(batch, output_dir, workers=None, progress=None, should_stop=None, merge_path=None):
+    """
+    Renders fetch_batch() output into output_dir across `workers` processes (default: one
+    per core). progress(done, total) follows each finished chunk; should_stop() cancels the
+    chunks not yet started (files already written stay). merge_path also writes every
+    page, in batch order, into that one PDF (skipped when cancelled).
+    Returns a dict: paths (in batch order), cancelled, merged (the merge path or None).
+    """
+    if merge_path and not can_merge():
+        raise RuntimeError("Merging into one PDF needs the pypdf package (pip install pypdf)")
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = [batch[start:start + RENDER_CHUNK] for start in range(0, len(batch), RENDER_CHUNK)]
+    results, done, cancelled = {}, 0, False
+    if chunks:
+        # spawn, not fork: the caller has DB connections and worker threads a fork would copy
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(chunks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(render_chunk, output_dir, chunk): i for i, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                done += len(results[futures[future]])
+                if progress:
+                    progress(done, len(batch))
+                if should_stop and should_stop():
+                    cancelled = True
+                    pool.shutdown(cancel_futures=True)
+                    break
+    paths = [path for i in sorted(results) for path in results[i]]
+    merged = None
+    if merge_path and paths and not cancelled:
+        merged = merge_pdfs(paths, merge_path)
+    return {'paths': paths, 'cancelled': cancelled, 'merged': merged}
+
+def can_merge():
+    try:
+        import pypdf # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def merge_pdfs(paths, merge_path):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(merge_path, "wb") as f:
+        writer.write(f)
+    writer.close()
+    return merge_path
@@ -0,0 +1,81 @@
+"""
+Invoice list filters compiled to a parameterized WHERE clause (no Tk imports here).
+
+Every condition is written so an index can serve it: number prefixes become a
+case-insensitive range on idx_invoices_number_nocase, parties go through idx_invoices_party, dates
+through idx_invoices_date.
+"""
+from datetime import date
+
+STATUSES = ("draft", "final", "paid", "cancelled")
+
+def prefix_range(prefix, nocase=False):
+    """
+    (low, high) such that low <= s < high exactly when s starts with prefix, under
+    BINARY collation or, with nocase, under NOCASE (which folds ASCII A-Z to a-z).
+    """
+    if not nocase:
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    prefix = prefix.translate(_ASCII_LOWER)
+    after = chr(ord(prefix[-1]) + 1)
+    # A-Z never compare as themselves under NOCASE: after "@" the next folded character is "["
+    return prefix, prefix[:-1] + ("[" if after == "A" else after)
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _date(text, label):
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise ValueError(f"{label} must be a date like 2026-04-01")
+
+def _amount(text, label):
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{label} must be a number")
+
+def compile_invoice_filter(date_from="", date_to="", party="", status="", min_amount="", max_amount="",
+                           number_prefix=""):
+    """
+    Builds (where, params) over invoices aliased as i from the filter bar's raw text.
+    Empty fields are ignored; malformed ones raise ValueError with a message for the user.
+    """
+    conditions, params = [], []
+
+    number_prefix = number_prefix.strip()
+    if number_prefix:
+        conditions.append("i.invoice_number COLLATE NOCASE >= ? AND i.invoice_number COLLATE NOCASE < ?")
+        params += prefix_range(number_prefix, nocase=True)
+
+    if date_from.strip():
+        conditions.append("i.date >= ?")
+        params.append(_date(date_from.strip(), "From date"))
+    if date_to.strip():
+        conditions.append("i.date <= ?")
+        params.append(_date(date_to.strip(), "To date"))
+
+    party = party.strip()
+    if party:
+        # parties is small next to invoices; the matching ids drive idx_invoices_party
+        conditions.append("i.party_id IN (SELECT id FROM parties WHERE name LIKE ? ESCAPE '\\')")
+        params.append(f"%{escape_like(party)}%")
+
+    status = status.strip().lower()
+    if status:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'")
+        conditions.append("i.status = ?")
+        params.append(status)
+
+    if min_amount.strip():
+        conditions.append("i.total_amount >= ?")
+        params.append(_amount(min_amount.strip(), "Min amount"))
+    if max_amount.strip():
+        conditions.append("i.total_amount <= ?")
+        params.append(_amount(max_amount.strip(), "Max amount"))
+
+    return " AND ".join(conditions), tuple(params)
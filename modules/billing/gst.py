@@ -0,0 +1,113 @@
+"""
+GST computation for invoice lines (no Tk imports here).
+
+Line rates are tax inclusive, so each line's total is split into its taxable
+value and tax at the item's rate, and the tax into CGST + SGST (same state) or
+IGST (different states, from the GSTIN state codes). Amounts are rounded half
+up to the paisa per line; taxable + tax always equals the line total and
+CGST + SGST always equals the tax. Header totals are sums of the stored lines.
+
+post_invoice stores these figures as it writes an invoice and backfill()
+fills them in for invoices posted before they existed, so reports and
+returns read stored values instead of recomputing them.
+"""
+# The company printed on invoices (see PDFGenerator); companies.gstin takes precedence when set
+DEFAULT_COMPANY_GSTIN = "29AAAAA0000A1Z5"
+
+TAX_COLUMNS = ("taxable_value", "tax_rate", "tax_amount", "cgst", "sgst", "igst")
+
+# Lines still without tax figures, with what computing them needs
+PENDING_LINES_SQL = """
+    SELECT ii.id, ii.invoice_id, ii.total, it.tax_rate, it.hsn_code, p.gstin, c.gstin
+    FROM invoice_items ii
+    JOIN invoices i ON ii.invoice_id = i.id
+    LEFT JOIN items it ON ii.item_id = it.id
+    LEFT JOIN parties p ON i.party_id = p.id
+    LEFT JOIN companies c ON i.company_id = c.id
+    WHERE ii.id > ? AND ii.tax_amount IS NULL
+    ORDER BY ii.id
+    LIMIT ?
+"""
+
+INVOICE_TAX_TOTALS_SQL = """
+    UPDATE invoices SET
+        taxable_value = (SELECT ROUND(SUM(taxable_value), 2) FROM invoice_items WHERE invoice_id = invoices.id),
+        cgst = (SELECT ROUND(SUM(cgst), 2) FROM invoice_items WHERE invoice_id = invoices.id),
+        sgst = (SELECT ROUND(SUM(sgst), 2) FROM invoice_items WHERE invoice_id = invoices.id),
+        igst = (SELECT ROUND(SUM(igst), 2) FROM invoice_items WHERE invoice_id = invoices.id)
+    WHERE id IN ({ids})
+"""
+
+HSN_SUMMARY_SQL = """
+    SELECT ii.hsn_code, ii.tax_rate, SUM(ii.quantity), ROUND(SUM(ii.taxable_value), 2),
+           ROUND(SUM(ii.cgst), 2), ROUND(SUM(ii.sgst), 2), ROUND(SUM(ii.igst), 2), ROUND(SUM(ii.total), 2)
+    FROM invoices i
+    JOIN invoice_items ii ON ii.invoice_id = i.id
+    WHERE i.date BETWEEN ? AND ? AND i.status != 'cancelled'
+    GROUP BY ii.hsn_code, ii.tax_rate
+    ORDER BY ii.hsn_code, ii.tax_rate
+"""
+
+def round2(value):
+    """Half-up rounding to 2 decimals (the nudge absorbs binary noise such as 2.675 -> 2.67499...)."""
+    return round(value + (1e-8 if value >= 0 else -1e-8), 2)
+
+def state_code(gstin):
+    """The two-digit state code a GSTIN starts with, or None."""
+    gstin = (gstin or "").strip()
+    return gstin[:2] if len(gstin) >= 2 and gstin[:2].isdigit() else None
+
+def is_inter_state(company_gstin, party_gstin):
+    """IGST applies only when both states are known and differ (unregistered buyers pay CGST + SGST)."""
+    company = state_code(company_gstin or DEFAULT_COMPANY_GSTIN)
+    party = state_code(party_gstin)
+    return bool(company and party and company != party)
+
+def split_line(total, rate, inter_state):
+    """A tax-inclusive line total -> (taxable_value, tax_rate, tax_amount, cgst, sgst, igst)."""
+    rate = rate or 0.0
+    total = total or 0.0
+    taxable = round2(total * 100 / (100 + rate))
+    tax = round2(total - taxable)
+    if inter_state:
+        return taxable, rate, tax, 0.0, 0.0, tax
+    cgst = round2(tax / 2)
+    return taxable, rate, tax, cgst, round2(tax - cgst), 0.0
+
+def invoice_totals(taxes):
+    """Sums split_line results into header totals: dict of taxable_value, cgst, sgst, igst."""
+    return {
+        'taxable_value': round2(sum(t[0] for t in taxes)),
+        'cgst': round2(sum(t[3] for t in taxes)),
+        'sgst': round2(sum(t[4] for t in taxes)),
+        'igst': round2(sum(t[5] for t in taxes)),
+    }
+
+def backfill(db, batch_size=50_000, progress=None):
+    """
+    Computes and stores tax figures for every line that has none, batch by batch
+    (one transaction per batch, so it can be interrupted and resumed), then the
+    totals of the invoices those lines belong to. Returns the number of lines filled.
+    """
+    done, last_id = 0, 0
+    while True:
+        rows = db.execute_query(PENDING_LINES_SQL, (last_id, batch_size))
+        if not rows:
+            return done
+        updates = [split_line(total, rate, is_inter_state(company_gstin, party_gstin)) + (hsn, line_id)
+                   for line_id, _, total, rate, hsn, party_gstin, company_gstin in rows]
+        invoice_ids = sorted({row[1] for row in rows})
+        with db.transaction() as conn:
+            db.bulk_update("invoice_items", ", ".join(f"{c} = ?" for c in TAX_COLUMNS) + ", hsn_code = ?", updates)
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(invoice_ids), 10_000):
+                chunk = invoice_ids[start:start + 10_000]
+                conn.execute(INVOICE_TAX_TOTALS_SQL.format(ids=", ".join("?" * len(chunk))), chunk)
+        done += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(done)
+
+def hsn_summary(db, date_from, date_to):
+    """Per HSN code and rate: quantity, taxable value, CGST, SGST, IGST and total, from stored figures."""
+    return db.execute_query(HSN_SUMMARY_SQL, (date_from, date_to))
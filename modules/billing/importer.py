@@ -0,0 +1,296 @@
+"""
+Bulk invoice import from CSV or JSONL (no Tk imports here).
+
+Input is one row per invoice line:
+
+    invoice_number, date, party_gstin, party_name, sku, qty, rate[, total][, status]
+
+Consecutive rows with the same invoice_number make up one invoice; a row
+without a number is an invoice of its own, numbered from the series as on
+the New Invoice tab. JSONL may also hold whole invoices:
+{"invoice_number": ..., "date": ..., "lines": [...]}.
+
+The file is streamed; parties (by GSTIN, else name) and items (by SKU) resolve
+through in-memory maps loaded once. Accepted invoices are written in chunks,
+each chunk one transaction of a few executemany calls (headers with ids
+assigned up front, lines, sale movements of final invoices), GST included.
+An invoice with any bad row is rejected whole and its rows go to the rejects
+file with the reason.
+"""
+import csv
+import json
+import os
+import time
+from datetime import date
+
+from modules.billing.gst import TAX_COLUMNS, invoice_totals, is_inter_state, split_line
+from modules.billing.numbering import DEFAULT_SERIES, allocate_invoice_number, claim_manual_number
+from modules.billing.pos import normalize_code
+from modules.billing.posting import wanted_quantities
+from modules.inventory.ledger import record_movements, sale_movements
+
+FIELDS = ("invoice_number", "date", "party_gstin", "party_name", "sku", "qty", "rate", "total", "status")
+STATUSES = ("draft", "final", "paid", "cancelled")
+CHUNK_LINES = 20_000
+PROGRESS_EVERY = 10_000
+
+ITEM_MAP_SQL = "SELECT id, sku, tax_rate, hsn_code FROM items WHERE sku IS NOT NULL"
+PARTY_MAP_SQL = "SELECT id, name, gstin FROM parties"
+# invoices is AUTOINCREMENT: ids of deleted invoices are never handed out again
+NEXT_INVOICE_ID_SQL = """
+    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'invoices'), 0),
+               COALESCE((SELECT MAX(id) FROM invoices), 0)) + 1
+"""
+EXISTING_NUMBERS_SQL = "SELECT invoice_number FROM invoices WHERE invoice_number IN ({numbers})"
+
+class RejectedInvoice(ValueError):
+    pass
+
+def read_rows(path):
+    """Yields one dict per line row from a .csv or .jsonl/.json file."""
+    if path.lower().endswith((".jsonl", ".json", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for number, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except ValueError as e:
+                    yield {'invoice_number': f"<line {number}>", '_error': f"Bad JSON: {e}", '_raw': text.strip()}
+                    continue
+                lines = record.get("lines") if isinstance(record, dict) else None
+                if not isinstance(record, dict) or (isinstance(lines, list) and
+                                                    not all(isinstance(line, dict) for line in lines)):
+                    yield {'invoice_number': f"<line {number}>", '_error': "Not an invoice object",
+                           '_raw': text.strip()}
+                    continue
+                if isinstance(lines, list):
+                    header = {k: v for k, v in record.items() if k != "lines"}
+                    for line in lines:
+                        yield dict(header, **line)
+                else:
+                    yield record
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            for values in reader:
+                if values:
+                    yield dict(zip(header, values))
+
+def _text(row, field):
+    value = row.get(field)
+    return str(value).strip() if value is not None else ""
+
+def group_invoices(rows):
+    """Groups consecutive rows by invoice_number. Yields lists of rows."""
+    group, current = [], None
+    for row in rows:
+        number = _text(row, 'invoice_number')
+        if group and (number != current or not number):
+            yield group
+            group = []
+        current = number
+        group.append(row)
+    if group:
+        yield group
+
+def _number(value, field):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RejectedInvoice(f"{field} '{value}' is not a number")
+
+class InvoiceImporter:
+    """
+    Resolves and validates invoices against the master data, then writes them in chunks.
+    Only final invoices move stock; update_stock=False imports history without touching it.
+    """
+    def __init__(self, db, update_stock=True, series=DEFAULT_SERIES, chunk_lines=CHUNK_LINES):
+        self.db = db
+        self.update_stock = update_stock
+        self.series = series
+        self.chunk_lines = chunk_lines
+        self.items = {normalize_code(r[1]): (r[0], r[2], r[3]) for r in db.execute_query(ITEM_MAP_SQL)}
+        self.parties_by_gstin, self.parties_by_name = {}, {}
+        for party_id, name, gstin in db.execute_query(PARTY_MAP_SQL):
+            if gstin:
+                self.parties_by_gstin[gstin.strip().upper()] = (party_id, gstin)
+            self.parties_by_name.setdefault(name.strip().lower(), (party_id, gstin))
+
+    def resolve(self, rows):
+        """A group of rows -> (header, lines) ready to write. Raises RejectedInvoice."""
+        first = rows[0]
+        if first.get('_error'):
+            raise RejectedInvoice(first['_error'])
+        try:
+            day = date.fromisoformat(_text(first, 'date')[:10]).isoformat()
+        except ValueError:
+            raise RejectedInvoice(f"date '{first.get('date')}' is not YYYY-MM-DD")
+        status = (_text(first, 'status') or "final").lower()
+        if status not in STATUSES:
+            raise RejectedInvoice(f"unknown status '{status}'")
+
+        gstin = _text(first, 'party_gstin').upper()
+        name = _text(first, 'party_name')
+        party_id, party_gstin = None, None
+        if gstin:
+            if gstin not in self.parties_by_gstin:
+                raise RejectedInvoice(f"no party with GSTIN {gstin}")
+            party_id, party_gstin = self.parties_by_gstin[gstin]
+        elif name:
+            if name.lower() not in self.parties_by_name:
+                raise RejectedInvoice(f"no party named '{name}'")
+            party_id, party_gstin = self.parties_by_name[name.lower()]
+        inter_state = is_inter_state(None, party_gstin)
+
+        # The hot path: plain dict lookups, helpers only for what is off
+        lines, items = [], self.items
+        for row in rows:
+            sku = normalize_code(row.get('sku') or "")
+            item = items.get(sku)
+            if item is None:
+                raise RejectedInvoice(f"unknown SKU '{sku}'")
+            qty = _number(row.get('qty'), "qty")
+            rate = _number(row.get('rate'), "rate")
+            if qty <= 0 or rate < 0:
+                raise RejectedInvoice(f"bad qty/rate for {sku}")
+            total = round(qty * rate, 2)
+            given = row.get('total')
+            if given not in (None, "") and abs(_number(given, "total") - total) > 0.01:
+                raise RejectedInvoice(f"total {given} for {sku} is not qty x rate ({total})")
+            lines.append({'id': item[0], 'qty': qty, 'rate': rate, 'total': total, 'hsn': item[2],
+                          'tax': split_line(total, item[1], inter_state)})
+
+        header = {'number': _text(first, 'invoice_number'), 'party_id': party_id, 'date': day,
+                  'status': status, 'total_amount': round(sum(l['total'] for l in lines), 2),
+                  **invoice_totals([l['tax'] for l in lines])}
+        return header, lines
+
+    def write_chunk(self, invoices):
+        """
+        Writes resolved invoices in one transaction. Returns one entry per invoice:
+        None if written, else why not (its number already exists or repeats in the chunk).
+        """
+        with self.db.transaction() as conn:
+            # Checked under the write lock, so a terminal posting meanwhile cannot collide
+            numbers = [h['number'] for h, _ in invoices if h['number']]
+            taken = set()
+            for start in range(0, len(numbers), 500):
+                part = numbers[start:start + 500]
+                taken.update(r[0] for r in conn.execute(
+                    EXISTING_NUMBERS_SQL.format(numbers=", ".join("?" * len(part))), part))
+
+            accepted, outcome = [], []
+            for header, lines in invoices:
+                if header['number'] in taken:
+                    outcome.append(f"invoice number {header['number']} already exists")
+                    continue
+                if header['number']:
+                    taken.add(header['number'])
+                accepted.append((header, lines))
+                outcome.append(None)
+
+            # Numbers from the file that fall in a series are claimed before any is drawn from it
+            for header, _ in accepted:
+                if header['number']:
+                    claim_manual_number(conn, header['number'])
+            next_id = conn.execute(NEXT_INVOICE_ID_SQL).fetchone()[0]
+            headers, line_rows, movements = [], [], []
+            for inv_id, (header, lines) in enumerate(accepted, next_id):
+                number = header['number'] or allocate_invoice_number(conn, header['date'], self.series)
+                headers.append((inv_id, number, header['party_id'], header['date'], header['total_amount'],
+                                header['status'], header['taxable_value'], header['cgst'], header['sgst'],
+                                header['igst']))
+                line_rows += [(inv_id, l['id'], l['qty'], l['rate'], l['total'], l['hsn']) + l['tax'] for l in lines]
+                if self.update_stock and header['status'] == 'final':
+                    movements += sale_movements(inv_id, header['date'], wanted_quantities(lines))
+            self.db.bulk_insert("invoices", ("id", "invoice_number", "party_id", "date", "total_amount", "status",
+                                             "taxable_value", "cgst", "sgst", "igst"), headers)
+            self.db.bulk_insert("invoice_items", ("invoice_id", "item_id", "quantity", "rate", "total", "hsn_code")
+                                + TAX_COLUMNS, line_rows)
+            record_movements(self.db, movements)
+        return outcome
+
+    def run(self, path, rejects_path=None, progress=None, should_stop=None):
+        """
+        Imports path. progress(result) is called every PROGRESS_EVERY lines and once at the end;
+        should_stop() can cancel between chunks (already written chunks stay).
+        Returns a dict of counts: invoices, lines, rejected_invoices, rejected_rows, seconds.
+        """
+        start = time.perf_counter()
+        result = {'invoices': 0, 'lines': 0, 'rejected_invoices': 0, 'rejected_rows': 0, 'seconds': 0.0,
+                  'cancelled': False}
+        rejects = RejectsWriter(rejects_path or default_rejects_path(path))
+        chunk, chunk_rows, chunk_lines, reported = [], [], 0, 0
+        try:
+            for rows in group_invoices(read_rows(path)):
+                try:
+                    chunk.append(self.resolve(rows))
+                    chunk_rows.append(rows)
+                    chunk_lines += len(rows)
+                except RejectedInvoice as e:
+                    rejects.write(rows, str(e))
+                    result['rejected_invoices'] += 1
+                    result['rejected_rows'] += len(rows)
+                if chunk_lines >= self.chunk_lines:
+                    self._flush(chunk, chunk_rows, rejects, result)
+                    chunk, chunk_rows, chunk_lines = [], [], 0
+                    if should_stop and should_stop():
+                        result['cancelled'] = True
+                        break
+                    if progress and result['lines'] - reported >= PROGRESS_EVERY:
+                        reported = result['lines']
+                        progress(dict(result, seconds=time.perf_counter() - start))
+            if chunk and not result['cancelled']:
+                self._flush(chunk, chunk_rows, rejects, result)
+        finally:
+            rejects.close()
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        result['rejects_path'] = rejects.path if rejects.count else None
+        if progress:
+            progress(result)
+        return result
+
+    def _flush(self, chunk, chunk_rows, rejects, result):
+        for (header, lines), rows, reason in zip(chunk, chunk_rows, self.write_chunk(chunk)):
+            if reason:
+                rejects.write(rows, reason)
+                result['rejected_invoices'] += 1
+                result['rejected_rows'] += len(rows)
+            else:
+                result['invoices'] += 1
+                result['lines'] += len(lines)
+
+def default_rejects_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.rejects{ext if ext.lower() == '.csv' else '.jsonl'}"
+
+class RejectsWriter:
+    """Rejected rows with an 'error' column, opened only once something is rejected."""
+    def __init__(self, path, fields=FIELDS):
+        self.path = path
+        self.fields = fields
+        self.count = 0
+        self._file = self._csv = None
+
+    def write(self, rows, reason):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            if self.path.lower().endswith(".csv"):
+                self._csv = csv.DictWriter(self._file, fieldnames=self.fields + ("error",), extrasaction="ignore")
+                self._csv.writeheader()
+        for row in rows:
+            self.count += 1
+            if self._csv:
+                self._csv.writerow(dict(row, error=reason))
+            else:
+                record = {'raw': row['_raw']} if '_raw' in row else row
+                self._file.write(json.dumps(dict(record, error=reason)) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def import_invoices(db, path, rejects_path=None, progress=None, update_stock=True, should_stop=None):
+    return InvoiceImporter(db, update_stock=update_stock).run(path, rejects_path, progress, should_stop)
@@ -0,0 +1,68 @@
+"""
+Invoice number allocation (no Tk imports here).
+
+Numbers come from invoice_sequences, one counter per company, series and
+financial year, bumped by a single UPSERT inside the posting transaction.
+The writer lock that transaction already holds is the only synchronization:
+two terminals can never draw the same value, and a rolled-back posting
+returns its value with everything else, so numbers have no gaps.
+The unique index on invoices.invoice_number backs this up; numbers of any
+company but the default one carry its id, so companies never collide.
+
+A number typed in by hand that has the form of a series number moves that
+series' counter past it (claim_manual_number), so the series never draws it
+later. Only such a number jumping ahead leaves a gap.
+"""
+import re
+from datetime import date
+
+DEFAULT_SERIES = "INV"
+
+NUMBER_RE = re.compile(r"(?P<series>.+)/(?P<year>\d{4}-\d{2})/(?P<value>\d{5,})", re.ASCII)
+
+def fiscal_year(day):
+    """Indian financial year (April to March) of a date or ISO date string, e.g. '2026-27'."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    start = day.year if day.month >= 4 else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+def company_prefix(company_id):
+    return f"{company_id}-" if company_id else ""
+
+def format_number(series, year, value, company_id=None):
+    return f"{company_prefix(company_id)}{series}/{year}/{value:05d}"
+
+def parse_number(number, company_id=None):
+    """(series, fiscal year, value) if number has the form format_number gives company_id's series, else None."""
+    prefix = company_prefix(company_id)
+    match = NUMBER_RE.fullmatch(number[len(prefix):]) if number.startswith(prefix) else None
+    return (match['series'], match['year'], int(match['value'])) if match else None
+
+def allocate_invoice_number(conn, day, series=DEFAULT_SERIES, company_id=None):
+    """
+    Draws the next number for (company, series, financial year of day) on conn,
+    which must be inside the caller's write transaction.
+    """
+    year = fiscal_year(day)
+    value = conn.execute("""
+        INSERT INTO invoice_sequences (company_id, series, fiscal_year, next_value) VALUES (?, ?, ?, 2)
+        ON CONFLICT (company_id, series, fiscal_year) DO UPDATE SET next_value = next_value + 1
+        RETURNING next_value - 1
+    """, (company_id or 0, series, year)).fetchone()[0]
+    return format_number(series, year, value, company_id)
+
+def claim_manual_number(conn, number, company_id=None):
+    """
+    Moves the counter of the series a hand-entered number belongs to (if any) past it,
+    inside the caller's write transaction. Whether the number is free is left to the
+    unique index.
+    """
+    parsed = parse_number(number, company_id)
+    if parsed is None:
+        return
+    series, year, value = parsed
+    conn.execute("""
+        INSERT INTO invoice_sequences (company_id, series, fiscal_year, next_value) VALUES (?, ?, ?, ?)
+        ON CONFLICT (company_id, series, fiscal_year) DO UPDATE SET next_value = MAX(next_value, excluded.next_value)
+    """, (company_id or 0, series, year, value + 1))
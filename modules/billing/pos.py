@@ -0,0 +1,111 @@
+"""
+Point-of-sale cart for keyboard and barcode-scanner billing (no Tk imports here).
+
+The item master is held in memory, keyed by SKU (the code printed on the
+barcode), so a scan resolves with one dict lookup and the cart, total and
+stock warnings update without touching the database. Only checkout writes,
+through post_invoice in a single transaction.
+"""
+
+def normalize_code(code):
+    return str(code).strip().upper()
+
+def parse_scan(text):
+    """
+    Scanner/keyboard input to (code, qty). "3*SKU001" or "3 x SKU001" adds three;
+    a plain code adds one. Raises ValueError for a bad quantity.
+    """
+    text = text.strip()
+    for sep in ("*", " x ", " X "):
+        if sep in text:
+            qty, code = text.split(sep, 1)
+            try:
+                qty = float(qty)
+            except ValueError:
+                raise ValueError(f"Bad quantity '{qty.strip()}'")
+            if qty <= 0:
+                raise ValueError("Quantity must be positive")
+            return normalize_code(code), qty
+    return normalize_code(text), 1.0
+
+def item_version(item):
+    return item[7] if len(item) > 7 else None
+
+class PosCart:
+    """
+    items: records shaped like ITEM_MASTER_SQL rows, (id, name, price, stock_quantity, tax_rate, sku, hsn_code,
+    version).
+    Lines are dicts in the shape post_invoice takes ('id', 'name', 'qty', 'rate', 'tax', 'total'),
+    one per item and in scan order; 'stock' and 'version' are the item's as last seen, so
+    post_invoice can tell a stale line.
+    """
+    def __init__(self, items=()):
+        self.load(items)
+
+    def load(self, items):
+        self.items = {} # item id -> record
+        self.codes = {} # normalized SKU -> item id
+        self.lines = {} # item id -> line
+        for item in items:
+            self.update_item(item)
+
+    def update_item(self, item):
+        """Adds or replaces one item record, e.g. after a stock change elsewhere."""
+        old = self.items.get(item[0])
+        if old is not None and old[5]:
+            self.codes.pop(normalize_code(old[5]), None)
+        self.items[item[0]] = item
+        if item[5]:
+            self.codes[normalize_code(item[5])] = item[0]
+        line = self.lines.get(item[0])
+        if line:
+            line['stock'], line['version'] = item[3] or 0, item_version(item)
+
+    def remove_item(self, item_id):
+        item = self.items.pop(item_id, None)
+        if item is not None and item[5]:
+            self.codes.pop(normalize_code(item[5]), None)
+
+    def lookup(self, code):
+        item_id = self.codes.get(normalize_code(code))
+        return self.items[item_id] if item_id is not None else None
+
+    def scan(self, text):
+        """Adds the scanned item (repeat scans add to its line). Returns the line; raises ValueError."""
+        code, qty = parse_scan(text)
+        item = self.lookup(code)
+        if item is None:
+            raise ValueError(f"Unknown code '{code}'")
+        line = self.lines.get(item[0])
+        if line is None:
+            line = self.lines[item[0]] = {'id': item[0], 'name': item[1], 'qty': 0.0, 'rate': item[2] or 0.0,
+                                          'tax': item[4] or 0.0, 'total': 0.0, 'stock': item[3] or 0,
+                                          'version': item_version(item)}
+        return self.set_qty(item[0], line['qty'] + qty)
+
+    def set_qty(self, item_id, qty):
+        line = self.lines[item_id]
+        if qty <= 0:
+            del self.lines[item_id]
+            line['qty'] = line['total'] = 0.0
+            return line
+        line['qty'] = qty
+        line['total'] = round(qty * line['rate'], 2)
+        return line
+
+    def remove_line(self, item_id):
+        self.lines.pop(item_id, None)
+
+    def short(self, line):
+        """True when the line asks for more than the stock on hand."""
+        return line['qty'] > line['stock']
+
+    @property
+    def total(self):
+        return round(sum(line['total'] for line in self.lines.values()), 2)
+
+    def clear(self):
+        self.lines = {}
+
+    def invoice_lines(self):
+        return [dict(line) for line in self.lines.values()]
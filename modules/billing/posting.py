@@ -0,0 +1,95 @@
+"""
+Headless invoice posting shared by the billing screens (no Tk imports here).
+"""
+from modules.billing.gst import TAX_COLUMNS, invoice_totals, is_inter_state, split_line
+from modules.billing.numbering import DEFAULT_SERIES, allocate_invoice_number, claim_manual_number
+from modules.inventory.ledger import record_movements, sale_movements
+
+STOCK_SQL = "SELECT id, name, stock_quantity, version, tax_rate, hsn_code FROM items WHERE id IN ({ids})"
+OVERSOLD_SQL = "SELECT id, name, stock_quantity FROM items WHERE id IN ({ids}) AND stock_quantity < 0"
+GSTINS_SQL = """
+    SELECT (SELECT gstin FROM parties WHERE id = ?),
+           (SELECT gstin FROM companies WHERE id = ?)
+"""
+
+class StockConflict(Exception):
+    """
+    The invoice asks for more stock than is on hand; nothing was written.
+    shortages: dicts with 'id', 'name', 'wanted', 'available' and 'stale' (the
+    line's item changed after the screen read it).
+    """
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("Insufficient stock: " + ", ".join(
+            f"{s['name']} (wanted {s['wanted']:g}, available {s['available']:g})" for s in shortages))
+
+def wanted_quantities(lines):
+    """Item id -> total quantity over the lines (an item may appear on several)."""
+    wanted = {}
+    for line in lines:
+        wanted[line['id']] = wanted.get(line['id'], 0) + line['qty']
+    return wanted
+
+def post_invoice(db, invoice, lines, status='final', allow_short=False):
+    """
+    Writes the invoice header, all its lines and its sale movements in the stock
+    ledger (one per item, which move stock and bump the item's version) in one
+    transaction, so a 500-line invoice commits exactly once.
+
+    Stock is checked inside that transaction, against the rows as they are
+    then, not against what the screen loaded. If any line falls short (and not
+    allow_short) the whole invoice is rejected with StockConflict. Lines whose
+    'version' is stale but still covered simply post.
+    GST figures (modules/billing/gst.py) are stored on every line and the header.
+
+    invoice: dict with 'party_id', 'date', 'total_amount' and optionally 'number'; without
+             a number, one is allocated in the same transaction from 'series' (default INV)
+             and 'company_id'
+    lines: dicts with 'id' (item id), 'qty', 'rate', 'total' and optionally 'version'
+    Returns (invoice id, invoice number).
+    """
+    wanted = wanted_quantities(lines)
+    seen = {line['id']: line['version'] for line in lines if line.get('version') is not None}
+    with db.transaction() as conn:
+        ids = list(wanted)
+        current = {row[0]: row for row in conn.execute(STOCK_SQL.format(ids=", ".join("?" * len(ids))), ids)}
+        shortages = [{'id': item_id, 'name': current[item_id][1] if item_id in current else f"Item {item_id}",
+                      'wanted': qty, 'available': (current[item_id][2] or 0) if item_id in current else 0,
+                      'stale': item_id in seen and item_id in current and seen[item_id] != current[item_id][3]}
+                     for item_id, qty in wanted.items()
+                     if item_id not in current or (not allow_short and qty > (current[item_id][2] or 0))]
+        if shortages:
+            raise StockConflict(shortages)
+
+        party_gstin, company_gstin = conn.execute(GSTINS_SQL,
+                                                  (invoice['party_id'], invoice.get('company_id'))).fetchone()
+        inter_state = is_inter_state(company_gstin, party_gstin)
+        taxes = [split_line(l['total'], current[l['id']][4], inter_state) for l in lines]
+        totals = invoice_totals(taxes)
+
+        number = invoice.get('number')
+        if number:
+            claim_manual_number(conn, number, invoice.get('company_id'))
+        else:
+            number = allocate_invoice_number(conn, invoice['date'], invoice.get('series', DEFAULT_SERIES),
+                                             invoice.get('company_id'))
+        cur = conn.execute("INSERT INTO invoices (invoice_number, party_id, date, total_amount, status, company_id, "
+                           "taxable_value, cgst, sgst, igst) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (number, invoice['party_id'], invoice['date'], invoice['total_amount'], status,
+                            invoice.get('company_id'), totals['taxable_value'], totals['cgst'], totals['sgst'],
+                            totals['igst']))
+        inv_id = cur.lastrowid
+
+        db.bulk_insert("invoice_items",
+                       ("invoice_id", "item_id", "quantity", "rate", "total", "hsn_code") + TAX_COLUMNS,
+                       [(inv_id, l['id'], l['qty'], l['rate'], l['total'], current[l['id']][5]) + tax
+                        for l, tax in zip(lines, taxes)])
+        record_movements(db, sale_movements(inv_id, invoice['date'], wanted))
+        if not allow_short:
+            # BEGIN IMMEDIATE keeps other writers out between the read above and here; this is the backstop
+            oversold = conn.execute(OVERSOLD_SQL.format(ids=", ".join("?" * len(ids))), ids).fetchall()
+            if oversold:
+                raise StockConflict([{'id': item_id, 'name': name, 'wanted': wanted[item_id],
+                                      'available': stock + wanted[item_id], 'stale': True}
+                                     for item_id, name, stock in oversold])
+    return inv_id, number
@@ -1,7 +1,76 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+from collections import deque
 from datetime import date
 import os
+import threading
+import time
+
+from common.search_index import SearchIndex, normalize
+from core.tree_sync import TreeSync
+from core.typeahead import TypeaheadEntry
+from core.virtual_tree import SqlRowSource, VirtualTreeview
+from modules.billing.batch_pdf import LINE_COLUMNS, can_merge, fetch_batch, invoice_line, render_batch
+from modules.billing.filters import STATUSES, compile_invoice_filter
+from modules.billing.importer import import_invoices
+from modules.billing.pos import PosCart
+from modules.billing.posting import StockConflict, post_invoice
+
+# Paged by VirtualTreeview, newest first; created_at is only there as the sort key
+INVOICE_LIST_SOURCE = dict(
+    columns=(("id", "i.id"), ("number", "i.invoice_number"), ("party", "p.name"), ("date", "i.date"),
+             ("amount", "i.total_amount"), ("status", "i.status"), ("created", "i.created_at")),
+    from_clause="invoices i LEFT JOIN parties p ON i.party_id = p.id",
+    count_from="invoices i", # filters only touch invoices (and parties through a subquery)
+    sort="created", descending=True,
+)
+
+# Typing in the filter bar runs the query once input pauses for this long
+FILTER_DELAY_MS = 250
+
+INVOICE_EXPORT_SQL = """
+    SELECT i.invoice_number, p.name, i.date, i.total_amount, i.status 
+    FROM invoices i
+    LEFT JOIN parties p ON i.party_id = p.id
+    ORDER BY i.date DESC
+"""
+
+INVOICE_LINES_SQL = """
+    SELECT """ + LINE_COLUMNS + """
+    FROM invoice_items ii
+    JOIN items it ON ii.item_id = it.id
+    WHERE ii.invoice_id = ?
+"""
+
+def fetch_invoice_lines(db, inv_id):
+    """The stored lines of an invoice, with their GST figures, as PDFGenerator takes them."""
+    return [invoice_line(r) for r in db.execute_query(INVOICE_LINES_SQL, (inv_id,))]
+
+PARTY_PHONE_SQL = "SELECT phone FROM parties WHERE name=?"
+PARTY_LIST_SQL = "SELECT id, name, phone FROM parties"
+PARTY_ROWS_SQL = "SELECT id, name, phone FROM parties WHERE id IN ({ids})"
+
+# Scan-to-line latencies kept for the POS status bar
+POS_LATENCY_SAMPLES = 200
+POS_SERIES = "POS"
+
+# Master data behind the typeahead lookups on the New Invoice tab
+PARTY_MASTER_SQL = "SELECT id, name, phone, gstin FROM parties"
+PARTY_MASTER_ROWS_SQL = PARTY_MASTER_SQL + " WHERE id IN ({ids})"
+ITEM_MASTER_SQL = "SELECT id, name, price, stock_quantity, tax_rate, sku, hsn_code, version FROM items"
+ITEM_MASTER_ROWS_SQL = ITEM_MASTER_SQL + " WHERE id IN ({ids})"
+
+def party_texts(party):
+    return party[1], party[2], party[3]
+
+def item_texts(item):
+    return item[1], item[5], item[6]
+
+def format_party(party):
+    return f"{party[1]}  ({party[2]})" if party[2] else party[1]
+
+def format_item(item):
+    return f"{item[1]}  [{item[5]}]" if item[5] else item[1]
 
 class BillingModule(ttk.Frame):
     def __init__(self, parent, db):
@@ -23,12 +92,14 @@ class BillingModule(ttk.Frame):
         self.create_invoice_frame = CreateInvoiceFrame(self.notebook, self.db, self.on_invoice_saved)
         self.notebook.add(self.create_invoice_frame, text="New Invoice")
 
+        self.pos_frame = PosFrame(self.notebook, self.db)
+        self.notebook.add(self.pos_frame, text="POS")
+
         self.party_frame = PartyMasterFrame(self.notebook, self.db)
         self.notebook.add(self.party_frame, text="Parties (Customers)")
 
     def on_invoice_saved(self):
         messagebox.showinfo("Success", "Invoice Saved Successfully!")
-        self.invoice_list_frame.refresh_data()
         self.notebook.select(self.invoice_list_frame)
 
 class InvoiceListFrame(ttk.Frame):
@@ -42,93 +113,244 @@ class InvoiceListFrame(ttk.Frame):
         ttk.Button(btn_frame, text="🖨️ Print / Download PDF", command=self.print_pdf).pack(side="left", padx=20)
         ttk.Button(btn_frame, text="📊 Export CSV", command=self.export_csv).pack(side="left", padx=20)
         ttk.Button(btn_frame, text="🔄 Refresh", command=self.refresh_data).pack(side="left", padx=20)
+        self.import_button = ttk.Button(btn_frame, text="📥 Import", command=self.import_file)
+        self.import_button.pack(side="left", padx=20)
+        self._import_stop = None
+        # PDFs for every invoice the filter bar selects; pressed again while running, it cancels
+        self.batch_button = ttk.Button(btn_frame, text="🗂️ Batch PDFs", command=self.batch_pdf)
+        self.batch_button.pack(side="left", padx=20)
+        self._batch_stop = None
+        self.status_label = ttk.Label(btn_frame, text="", foreground="gray")
+        self.status_label.pack(side="left", padx=10)
 
-        # Treeview
-        columns = ("id", "number", "party", "date", "amount", "status")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse")
-        
-        self.tree.heading("id", text="ID")
-        self.tree.heading("number", text="Invoice #")
-        self.tree.heading("party", text="Party")
-        self.tree.heading("date", text="Date")
-        self.tree.heading("amount", text="Amount")
-        self.tree.heading("status", text="Status")
+        # Filter Bar
+        self.filter_vars = {}
+        self._filter_job = None
+        self._filter = ("", ())
+        self._date_sorted = False
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill="x", pady=(0, 10))
+        fields = (("number_prefix", "Invoice #", 12), ("party", "Party", 16), ("status", "Status", 9),
+                  ("date_from", "From", 11), ("date_to", "To", 11), ("min_amount", "Amount ≥", 9),
+                  ("max_amount", "≤", 9))
+        for name, label, width in fields:
+            ttk.Label(filter_frame, text=label).pack(side="left", padx=(10, 2))
+            var = self.filter_vars[name] = tk.StringVar()
+            if name == "status":
+                ttk.Combobox(filter_frame, textvariable=var, values=("",) + STATUSES, width=width,
+                             state="readonly").pack(side="left")
+            else:
+                ttk.Entry(filter_frame, textvariable=var, width=width).pack(side="left")
+            var.trace_add("write", self.on_filter_changed)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).pack(side="left", padx=10)
+        self.count_label = ttk.Label(filter_frame, text="")
+        self.count_label.pack(side="right", padx=10)
+
+        # Only the visible invoices are Tk items; pages load as the list scrolls
+        headings = (("id", "ID"), ("number", "Invoice #"), ("party", "Party"), ("date", "Date"),
+                    ("amount", "Amount"), ("status", "Status"))
+        self.list = VirtualTreeview(self, self.db, SqlRowSource(self.db, **INVOICE_LIST_SOURCE), headings,
+                                    self.format_row, watch=("invoices", "parties"), selectmode="browse",
+                                    on_count=self.show_count)
+        self.tree = self.list.tree
         
         self.tree.column("id", width=50)
         self.tree.column("number", width=120)
         self.tree.column("party", width=200)
         
-        self.tree.pack(fill="both", expand=True)
-        
-        self.refresh_data()
+        self.list.pack(fill="both", expand=True)
 
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        query = """
-            SELECT i.id, i.invoice_number, p.name as party_name, i.date, i.total_amount, i.status 
-            FROM invoices i
-            LEFT JOIN parties p ON i.party_id = p.id
-            ORDER BY i.created_at DESC
-        """
-        rows = self.db.execute_query(query)
-        for row in rows:
-            self.tree.insert("", "end", values=(row[0], row[1], row[2], row[3], f"₹ {row[4]:.2f}", row[5]))
+        self.list.reload()
+
+    def on_filter_changed(self, *args):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self.apply_filters)
+
+    def apply_filters(self):
+        self._filter_job = None
+        values = {name: var.get() for name, var in self.filter_vars.items()}
+        try:
+            where, params = compile_invoice_filter(**values)
+        except ValueError as e:
+            self.count_label.config(text=str(e), foreground="red")
+            return
+        if (where, params) == self._filter:
+            return
+        self._filter = (where, params)
+        self.list.source.set_filter(where, params)
+
+        # A date range is served in date order straight off idx_invoices_date;
+        # entry order would sort the whole range for every page
+        dated = bool(values['date_from'].strip() or values['date_to'].strip())
+        if dated and self.list.source.sort == "created":
+            self.list.set_sort("date", True)
+            self._date_sorted = True
+        elif not dated and self._date_sorted:
+            if self.list.source.sort == "date":
+                self.list.set_sort("created", True)
+            self._date_sorted = False
+        self.list.reload()
+
+    def clear_filters(self):
+        for var in self.filter_vars.values():
+            var.set("")
+
+    def show_count(self, total):
+        noun = "invoice" if total == 1 else "invoices"
+        self.count_label.config(text=f"{total:,} {noun}" + (" (filtered)" if self._filter[0] else ""),
+                                foreground="")
+
+    def format_row(self, row):
+        return (row[0], row[1], row[2], row[3], f"₹ {row[4]:.2f}", row[5])
 
     def print_pdf(self):
         sel = self.tree.selection()
         if not sel: return
         
         inv_id, inv_num, party_name, inv_date, amt, status = self.tree.item(sel[0], "values")
-        
-        # Fetch Full Details
-        items_rows = self.db.execute_query("""
-            SELECT i.name, ii.quantity, ii.rate, ii.total
-            FROM invoice_items ii
-            JOIN items i ON ii.item_id = i.id
-            WHERE ii.invoice_id = ?
-        """, (inv_id,))
-        
-        items = [{'name': r[0], 'qty': r[1], 'rate': r[2], 'total': r[3]} for r in items_rows]
+        invoice = {'number': inv_num, 'party_name': party_name, 'date': inv_date, 'total_amount': float(amt.replace("₹ ",""))}
+        self.db.submit(self.build_pdf, inv_id, invoice, widget=self, on_done=self.on_pdf_ready,
+                       on_error=lambda e: messagebox.showerror("Error", f"PDF Error: {e}"))
+
+    def build_pdf(self, inv_id, invoice):
+        # Runs on the DB worker thread
+        items = fetch_invoice_lines(self.db, inv_id)
         
         # Party Phone
-        party_res = self.db.execute_query("SELECT phone FROM parties WHERE name=?", (party_name,))
-        party_phone = party_res[0][0] if party_res else "N/A"
+        party_res = self.db.execute_query(PARTY_PHONE_SQL, (invoice['party_name'],), cached=True)
+        invoice['party_phone'] = party_res[0][0] if party_res else "N/A"
         
         # Generate
-        from common.pdf_generator import PDFGenerator
-        pdf = PDFGenerator()
-        path = pdf.generate_invoice(
-            {'number': inv_num, 'party_name': party_name, 'party_phone': party_phone, 'date': inv_date, 'total_amount': float(amt.replace("₹ ",""))},
-            items
-        )
-        
+        from common.pdf_generator import shared_generator
+        pdf = shared_generator()
+        return pdf.generate_invoice(invoice, items)
+
+    def on_pdf_ready(self, path):
         if messagebox.askyesno("PDF Created", f"Invoice Saved at:\n{path}\n\nOpen now?"):
             os.startfile(path)
 
+    def batch_pdf(self):
+        if self._batch_stop is not None:
+            self._batch_stop.set()
+            self.status_label.configure(text="Cancelling...")
+            return
+        folder = filedialog.askdirectory(title="Save the invoice PDFs in")
+        if not folder: return
+        merge_path = None
+        if can_merge() and messagebox.askyesno("Batch PDFs", "Also merge them into one PDF?"):
+            merge_path = os.path.join(folder, "invoices.pdf")
+
+        self._batch_stop = threading.Event()
+        self.batch_button.configure(text="⏹ Cancel PDFs")
+        self.status_label.configure(text="Fetching invoices...")
+        where, params = self._filter
+        self.db.submit(fetch_batch, self.db, where, params, widget=self,
+                       on_done=lambda batch: self.render_batch(batch, folder, merge_path),
+                       on_error=self.on_batch_failed)
+
+    def render_batch(self, batch, folder, merge_path):
+        if not batch:
+            self.on_batch_done({'paths': [], 'cancelled': False, 'merged': None})
+            return
+        # The process pool is driven from a thread of its own, so the DB worker stays free meanwhile
+        stop = self._batch_stop
+        notify = lambda func, *args: self.db.notify_ui(self, func, *args)
+        def run():
+            try:
+                result = render_batch(batch, folder, should_stop=stop.is_set, merge_path=merge_path,
+                                      progress=lambda done, total: notify(self.show_batch_progress, done, total))
+            except Exception as e:
+                notify(self.on_batch_failed, e)
+            else:
+                notify(self.on_batch_done, result)
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_batch_progress(self, done, total):
+        self.status_label.configure(text=f"PDFs: {done:,} of {total:,}")
+
+    def on_batch_done(self, result):
+        self._batch_stop = None
+        self.batch_button.configure(text="🗂️ Batch PDFs")
+        self.status_label.configure(text="")
+        message = f"{len(result['paths']):,} invoice PDFs written"
+        if result['cancelled']:
+            message += " before the batch was cancelled"
+        if result['merged']:
+            message += f"\nMerged into {result['merged']}"
+        messagebox.showinfo("Batch PDFs", message)
+
+    def on_batch_failed(self, exc):
+        self._batch_stop = None
+        self.batch_button.configure(text="🗂️ Batch PDFs")
+        self.status_label.configure(text="")
+        messagebox.showerror("Error", f"PDF Error: {exc}")
+
     def export_csv(self):
         try:
             filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
             if not filename: return
             
-            import csv
-            query = """
-                SELECT i.invoice_number, p.name, i.date, i.total_amount, i.status 
-                FROM invoices i
-                LEFT JOIN parties p ON i.party_id = p.id
-                ORDER BY i.date DESC
-            """
-            rows = self.db.execute_query(query)
-            
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Invoice Number", "Party Name", "Date", "Total Amount", "Status"])
-                writer.writerows(rows)
-                
-            messagebox.showinfo("Success", f"Data Exported to {filename}")
+            self.db.submit(self.write_csv, filename, widget=self,
+                           on_done=lambda _: messagebox.showinfo("Success", f"Data Exported to {filename}"),
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def write_csv(self, filename):
+        import csv
+        rows = self.db.iter_query(INVOICE_EXPORT_SQL)
+        
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Invoice Number", "Party Name", "Date", "Total Amount", "Status"])
+            writer.writerows(rows)
+
+    def import_file(self):
+        if self._import_stop is not None:
+            self._import_stop.set()
+            self.status_label.configure(text="Cancelling after this chunk...")
+            return
+        filename = filedialog.askopenfilename(filetypes=[("Invoice lines", "*.csv *.jsonl *.json"),
+                                                         ("All Files", "*.*")])
+        if not filename: return
+
+        # Off the DB worker, so the list (and every other view) keeps loading and picks the
+        # new invoices up through change events as each chunk commits
+        self._import_stop = threading.Event()
+        self.import_button.configure(text="⏹ Cancel Import")
+        self.status_label.configure(text="Importing...")
+        progress = lambda result: self.db.notify_ui(self, self.show_import_progress, result)
+        self.db.submit_long(import_invoices, self.db, filename, progress=progress,
+                            should_stop=self._import_stop.is_set, widget=self,
+                            on_done=self.on_imported, on_error=self.on_import_failed)
+
+    def show_import_progress(self, result):
+        self.status_label.configure(text=f"Imported {result['lines']:,} lines "
+                                         f"({result['rejected_rows']:,} rejected)")
+
+    def import_finished(self):
+        self._import_stop = None
+        self.import_button.configure(text="📥 Import")
+        self.status_label.configure(text="")
+
+    def on_imported(self, result):
+        self.import_finished()
+        message = (f"Imported {result['invoices']:,} invoices ({result['lines']:,} lines) "
+                   f"in {result['seconds']:.1f}s" + (" before the import was cancelled." if result['cancelled']
+                                                     else "."))
+        if result['rejects_path']:
+            messagebox.showwarning("Import", f"{message}\n\n{result['rejected_invoices']:,} invoices "
+                                             f"({result['rejected_rows']:,} rows) were rejected; "
+                                             f"see {result['rejects_path']}")
+        else:
+            messagebox.showinfo("Import", message)
+
+    def on_import_failed(self, exc):
+        self.import_finished()
+        messagebox.showerror("Error", f"Import failed: {exc}")
+
 class CreateInvoiceFrame(ttk.Frame):
     def __init__(self, parent, db, on_save_callback):
         super().__init__(parent)
@@ -142,14 +364,13 @@ class CreateInvoiceFrame(ttk.Frame):
         
         # Top Row
         ttk.Label(form_frame, text="Party:").grid(row=0, column=0, padx=5, sticky="w")
-        self.party_var = tk.StringVar()
-        self.party_combo = ttk.Combobox(form_frame, textvariable=self.party_var)
-        self.party_combo.grid(row=0, column=1, padx=5, sticky="w")
+        self.party_entry = TypeaheadEntry(form_frame, SearchIndex(party_texts), format_party, width=30)
+        self.party_entry.grid(row=0, column=1, padx=5, sticky="w")
         
-        ttk.Label(form_frame, text="Inv #:").grid(row=0, column=2, padx=5, sticky="w")
-        self.inv_num_entry = ttk.Entry(form_frame, width=15)
+        # Left blank, the number is allocated from the INV series when the invoice posts
+        ttk.Label(form_frame, text="Inv # (blank = auto):").grid(row=0, column=2, padx=5, sticky="w")
+        self.inv_num_entry = ttk.Entry(form_frame, width=18)
         self.inv_num_entry.grid(row=0, column=3, padx=5)
-        self.inv_num_entry.insert(0, f"INV-{date.today().strftime('%Y%m%d')}-001")
 
         ttk.Label(form_frame, text="Date:").grid(row=0, column=4, padx=5, sticky="w")
         self.date_entry = ttk.Entry(form_frame, width=12)
@@ -162,11 +383,10 @@ class CreateInvoiceFrame(ttk.Frame):
         item_frame = ttk.LabelFrame(self, text="Add Items")
         item_frame.pack(fill="x", padx=20, pady=10)
         
-        ttk.Label(item_frame, text="Select Item").grid(row=0, column=0)
-        self.item_var = tk.StringVar()
-        self.item_combo = ttk.Combobox(item_frame, textvariable=self.item_var, width=30)
-        self.item_combo.grid(row=1, column=0, padx=5, pady=5)
-        self.item_combo.bind("<<ComboboxSelected>>", self.on_item_select)
+        ttk.Label(item_frame, text="Item (name, SKU or HSN)").grid(row=0, column=0)
+        self.item_entry = TypeaheadEntry(item_frame, SearchIndex(item_texts), format_item,
+                                         on_select=self.on_item_select, width=40)
+        self.item_entry.grid(row=1, column=0, padx=5, pady=5)
         
         ttk.Label(item_frame, text="Qty").grid(row=0, column=1)
         self.qty_entry = ttk.Entry(item_frame, width=10)
@@ -196,62 +416,124 @@ class CreateInvoiceFrame(ttk.Frame):
         self.total_label.pack(side="right", padx=20)
         ttk.Button(footer, text="Save Invoice", command=self.save_invoice).pack(side="right")
 
+        # New parties/items and stock changes are applied to the search indexes row by row
+        self.master_sources = {self.party_entry: (PARTY_MASTER_SQL, party_texts),
+                               self.item_entry: (ITEM_MASTER_SQL, item_texts)}
+        self.compacting = {} # entry -> keys deleted while its fresh index is being built
+        self.db.subscribe("parties", lambda events: self.on_master_changes(self.party_entry, PARTY_MASTER_ROWS_SQL,
+                                                                            events), widget=self)
+        self.db.subscribe("items", lambda events: self.on_master_changes(self.item_entry, ITEM_MASTER_ROWS_SQL,
+                                                                          events), widget=self)
         self.load_master_data()
 
     def load_master_data(self):
-        parties = self.db.execute_query("SELECT id, name FROM parties")
-        self.party_map = {p[1]: p[0] for p in parties}
-        self.party_combo['values'] = list(self.party_map.keys())
-        
-        try:
-             items = self.db.execute_query("SELECT id, name, price, stock_quantity, tax_rate FROM items")
-        except:
-             items = self.db.execute_query("SELECT id, name, price, stock_quantity FROM items")
-             items = [list(i) + [18.0] for i in items] 
-
-        self.product_map = {i[1]: {'id': i[0], 'price': i[2], 'stock': i[3], 'tax': i[4]} for i in items}
-        self.item_combo['values'] = list(self.product_map.keys())
-
-    def on_item_select(self, event):
-        name = self.item_var.get()
-        if name in self.product_map:
-            rate = self.product_map[name]['price']
-            self.rate_entry.delete(0, tk.END)
-            self.rate_entry.insert(0, str(rate))
-            self.qty_entry.delete(0, tk.END)
-            self.qty_entry.insert(0, "1")
+        self.db.submit(self.fetch_master_data, widget=self, on_done=self.show_master_data)
+
+    def fetch_master_data(self):
+        return tuple(self.fetch_index(*self.master_sources[entry]) for entry in (self.party_entry, self.item_entry))
+
+    def fetch_index(self, sql, texts_of):
+        # Indexes are built here on the DB worker; the Tk thread only swaps them in
+        index = SearchIndex(texts_of)
+        index.build(self.db.execute_query(sql, cached=True))
+        return index
+
+    def show_master_data(self, data):
+        self.party_entry.index, self.item_entry.index = data
+
+    def compact_index(self, entry):
+        # Rebuilt from the database rather than the old index: row fetches queued before this
+        # task land on the old index, later ones on the new; deletes are replayed on the swap
+        if entry.index.needs_compaction and entry not in self.compacting:
+            self.compacting[entry] = set()
+            self.db.submit(self.fetch_index, *self.master_sources[entry], widget=self,
+                           on_done=lambda index: self.swap_index(entry, index))
+
+    def swap_index(self, entry, index):
+        for key in self.compacting.pop(entry):
+            index.remove(key)
+        entry.index = index
+
+    def on_master_changes(self, entry, rows_sql, events):
+        changed, deleted = set(), set()
+        for event in events:
+            if event.rowids is None:
+                self.load_master_data()
+                return
+            (deleted if event.op == "delete" else changed).update(event.rowids)
+        changed -= deleted
+
+        for key in deleted:
+            entry.index.remove(key)
+        if entry in self.compacting:
+            self.compacting[entry] |= deleted
+        self.compact_index(entry)
+        if changed:
+            self.db.submit(self.fetch_master_rows, rows_sql, sorted(changed), widget=self,
+                           on_done=lambda result: self.apply_master_rows(entry, result))
+
+    def fetch_master_rows(self, rows_sql, ids):
+        return ids, self.db.execute_query(rows_sql.format(ids=", ".join("?" * len(ids))), tuple(ids))
+
+    def apply_master_rows(self, entry, result):
+        ids, rows = result
+        for row in rows:
+            entry.index.add(row)
+        for key in set(ids) - {row[0] for row in rows}:
+            entry.index.remove(key)
+        self.compact_index(entry)
+
+    def resolve(self, entry):
+        """The current record for what the entry shows: the picked match, or an exact name typed in full."""
+        if entry.selected:
+            return entry.index.get(entry.selected[0])
+        text = normalize(entry.var.get())
+        if not text:
+            return None
+        return next((r for r in entry.index.search(text, 50) if normalize(r[1]) == text), None)
+
+    def on_item_select(self, item):
+        self.rate_entry.delete(0, tk.END)
+        self.rate_entry.insert(0, str(item[2]))
+        self.qty_entry.delete(0, tk.END)
+        self.qty_entry.insert(0, "1")
+        self.qty_entry.focus_set()
 
     def add_line_item(self):
-        name = self.item_var.get()
         qty = self.qty_entry.get()
         rate = self.rate_entry.get()
         
-        if not name or not qty: return
+        if not self.item_entry.var.get() or not qty: return
         
-        info = self.product_map.get(name)
-        if not info:
+        item = self.resolve(self.item_entry)
+        if not item:
              messagebox.showerror("Error", "Invalid Item")
              return
+        item_id, name, _, stock, tax = item[:5]
+        tax = tax or 0.0
 
         try:
             qty = float(qty)
             rate = float(rate)
             total = qty * rate
             
-            if qty > info['stock']:
-                if not messagebox.askyesno("Stock Warning", f"Avail Stock: {info['stock']}. Proceed?"):
+            # Advisory only: posting re-checks stock inside its transaction
+            on_invoice = sum(i['qty'] for i in self.items if i['id'] == item_id)
+            if on_invoice + qty > (stock or 0):
+                if not messagebox.askyesno("Stock Warning", f"Avail Stock: {stock}. Proceed?"):
                     return
             
             self.items.append({
-                "id": info['id'], "name": name, "qty": qty, 
-                "rate": rate, "tax": info['tax'], "total": total
+                "id": item_id, "name": name, "qty": qty, 
+                "rate": rate, "tax": tax, "total": total, "version": item[7]
             })
-            self.tree.insert("", "end", values=(info['id'], name, qty, rate, f"{info['tax']}%", total))
+            self.tree.insert("", "end", values=(item_id, name, qty, rate, f"{tax}%", total))
             self.update_total()
             
-            self.item_var.set('')
+            self.item_entry.clear()
             self.qty_entry.delete(0, tk.END)
             self.rate_entry.delete(0, tk.END)
+            self.item_entry.focus_set()
         except ValueError:
             messagebox.showerror("Error", "Invalid numbers")
 
@@ -260,55 +542,246 @@ class CreateInvoiceFrame(ttk.Frame):
         self.total_label.config(text=f"Total: ₹ {total:.2f}")
 
     def save_invoice(self):
-        party_name = self.party_var.get()
-        if not party_name or not self.items:
+        if not self.party_entry.var.get() or not self.items:
             messagebox.showerror("Error", "Select Party and Add Items")
             return
             
-        party_id = self.party_map.get(party_name)
-        if not party_id:
+        party = self.resolve(self.party_entry)
+        if not party:
              messagebox.showerror("Error", "Invalid Party. Add in Party Master first.")
              return
         
-        conn = self.db.get_connection()
+        invoice = {'number': self.inv_num_entry.get().strip(), 'party_name': party[1], 'party_phone': party[2] or "N/A",
+                   'date': self.date_entry.get(), 'total_amount': sum(i['total'] for i in self.items)}
+        self.post(party[0], invoice, list(self.items))
+
+    def post(self, party_id, invoice, items, allow_short=False):
+        self.db.submit(self.commit_invoice, party_id, invoice, items, allow_short, widget=self,
+                       on_done=self.on_posted,
+                       on_error=lambda e: self.on_post_failed(e, party_id, invoice, items))
+
+    def commit_invoice(self, party_id, invoice, items, allow_short=False):
+        # Runs on the DB worker thread; one transaction for the header, lines and stock
+        inv_id, number = post_invoice(self.db, dict(invoice, party_id=party_id), items, allow_short=allow_short)
+        # The PDF prints the GST figures as stored
+        return dict(invoice, number=number), fetch_invoice_lines(self.db, inv_id)
+
+    def on_post_failed(self, exc, party_id, invoice, items):
+        if not isinstance(exc, StockConflict):
+            messagebox.showerror("Error", f"Save Failed: {exc}")
+            return
+        # Nothing was written; the clerk can post knowingly or fix the quantities
+        details = "\n".join(f"{s['name']}: need {s['wanted']:g}, in stock {s['available']:g}"
+                            + (" (changed since added)" if s['stale'] else "") for s in exc.shortages)
+        if messagebox.askyesno("Stock Conflict", f"Not enough stock:\n\n{details}\n\nPost anyway?"):
+            self.post(party_id, invoice, items, allow_short=True)
+
+    def on_posted(self, result):
+        invoice, items = result
         try:
-            total_amt = sum(i['total'] for i in self.items)
-            
-            # create invoice
-            cur = conn.execute("INSERT INTO invoices (invoice_number, party_id, date, total_amount, status) VALUES (?, ?, ?, ?, ?)",
-                         (self.inv_num_entry.get(), party_id, self.date_entry.get(), total_amt, 'final'))
-            inv_id = cur.lastrowid
-            
-            # invoice items
-            for item in self.items:
-                conn.execute("INSERT INTO invoice_items (invoice_id, item_id, quantity, rate, total) VALUES (?, ?, ?, ?, ?)",
-                             (inv_id, item['id'], item['qty'], item['rate'], item['total']))
-                
-                # update stock
-                conn.execute("UPDATE items SET stock_quantity = stock_quantity - ? WHERE id = ?", (item['qty'], item['id']))
-            
-            conn.commit()
-            
             # PDF
             if messagebox.askyesno("Success", "Invoice Saved! Generate PDF?"):
-                party_phone = "N/A"
-                from common.pdf_generator import PDFGenerator
-                pdf = PDFGenerator()
-                path = pdf.generate_invoice(
-                    {'number': self.inv_num_entry.get(), 'party_name': party_name, 'party_phone': party_phone, 'date': self.date_entry.get(), 'total_amount': total_amt},
-                    self.items
-                )
+                from common.pdf_generator import shared_generator
+                pdf = shared_generator()
+                path = pdf.generate_invoice(invoice, items)
                 os.startfile(path)
-
-            # Clear
-            self.items = []
-            self.tree.delete(*self.tree.get_children())
-            self.update_total()
-            self.on_save_callback()
-            
         except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Error", f"Save Failed: {e}")
+            messagebox.showerror("Error", f"PDF Error: {e}")
+
+        # Clear
+        self.items = []
+        self.inv_num_entry.delete(0, tk.END)
+        self.tree.delete(*self.tree.get_children())
+        self.update_total()
+        self.on_save_callback()
+
+class PosFrame(ttk.Frame):
+    """
+    Keyboard/scanner billing. Scan or type a SKU and press Enter to add it ("3*SKU" adds three);
+    Enter on an empty scan field posts the sale. Delete removes the selected line, +/- adjust it.
+    """
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+        self.cart = PosCart()
+        self.latencies = deque(maxlen=POS_LATENCY_SAMPLES)
+        self.posting = False
+
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=20, pady=15)
+        ttk.Label(top, text="Scan / SKU:", font=("Segoe UI", 12)).pack(side="left")
+        self.scan_var = tk.StringVar()
+        self.scan_entry = ttk.Entry(top, textvariable=self.scan_var, font=("Segoe UI", 14), width=30)
+        self.scan_entry.pack(side="left", padx=10)
+        self.scan_entry.bind("<Return>", self.on_scan)
+        self.scan_entry.bind("<KP_Enter>", self.on_scan)
+        self.latency_label = ttk.Label(top, text="", foreground="gray")
+        self.latency_label.pack(side="right")
+
+        self.tree = ttk.Treeview(self, columns=("name", "qty", "rate", "tax", "total", "stock"), show="headings",
+                                 height=12)
+        for col, text, width in (("name", "Item", 260), ("qty", "Qty", 60), ("rate", "Rate", 80),
+                                 ("tax", "Tax %", 60), ("total", "Total", 90), ("stock", "In Stock", 70)):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width)
+        self.tree.tag_configure("short", foreground="red")
+        self.tree.pack(fill="both", expand=True, padx=20)
+        for key, handler in (("<Delete>", self.remove_selected), ("<plus>", lambda e: self.adjust_selected(1)),
+                             ("<minus>", lambda e: self.adjust_selected(-1))):
+            self.tree.bind(key, handler)
+            self.scan_entry.bind(key, handler)
+
+        footer = ttk.Frame(self)
+        footer.pack(fill="x", padx=20, pady=15)
+        self.status_label = ttk.Label(footer, text="Loading items...")
+        self.status_label.pack(side="left")
+        self.total_label = ttk.Label(footer, text="Total: ₹ 0.00", font=("Segoe UI", 18, "bold"))
+        self.total_label.pack(side="right")
+
+        self.db.subscribe("items", self.on_item_changes, widget=self)
+        self.load_items()
+        self.scan_entry.focus_set()
+
+    def load_items(self):
+        self.db.submit(self.fetch_items, widget=self, on_done=self.show_items)
+
+    def fetch_items(self):
+        return PosCart(self.db.execute_query(ITEM_MASTER_SQL, cached=True))
+
+    def show_items(self, cart):
+        # Keep the open sale; only the item master is replaced
+        cart.lines = self.cart.lines
+        for item_id, line in list(cart.lines.items()):
+            if item_id in cart.items:
+                cart.update_item(cart.items[item_id])
+        self.cart = cart
+        self.render()
+        self.status_label.config(text=f"{len(cart.items):,} items ready")
+
+    def on_item_changes(self, events):
+        changed, deleted = set(), set()
+        for event in events:
+            if event.rowids is None:
+                self.load_items()
+                return
+            (deleted if event.op == "delete" else changed).update(event.rowids)
+        changed -= deleted
+        for item_id in deleted:
+            self.cart.remove_item(item_id)
+        if changed:
+            ids = sorted(changed)
+            self.db.submit(lambda: self.db.execute_query(ITEM_MASTER_ROWS_SQL.format(ids=", ".join("?" * len(ids))),
+                                                         tuple(ids)),
+                           widget=self, on_done=self.apply_items)
+
+    def apply_items(self, rows):
+        for row in rows:
+            self.cart.update_item(row)
+        self.render()
+
+    def on_scan(self, event=None):
+        start = time.perf_counter()
+        text = self.scan_var.get()
+        if not text.strip():
+            self.checkout()
+            return "break"
+        try:
+            line = self.cart.scan(text)
+        except ValueError as e:
+            self.bell()
+            self.status_label.config(text=str(e), foreground="red")
+            self.scan_entry.select_range(0, tk.END)
+            return "break"
+        self.scan_var.set("")
+        self.show_line(line)
+        self.status_label.config(text=f"Stock low: only {line['stock']:g} of {line['name']}" if self.cart.short(line)
+                                 else f"Added {line['name']}", foreground="red" if self.cart.short(line) else "")
+        self.record_latency(start)
+        return "break"
+
+    def show_line(self, line):
+        iid = str(line['id'])
+        if not line['qty']:
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+        else:
+            values = (line['name'], f"{line['qty']:g}", f"{line['rate']:.2f}", f"{line['tax']:g}",
+                      f"{line['total']:.2f}", f"{line['stock']:g}")
+            tags = ("short",) if self.cart.short(line) else ()
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values, tags=tags)
+            else:
+                self.tree.insert("", "end", iid=iid, values=values, tags=tags)
+            self.tree.see(iid)
+            self.tree.selection_set(iid)
+        self.total_label.config(text=f"Total: ₹ {self.cart.total:.2f}")
+
+    def render(self):
+        self.tree.delete(*self.tree.get_children())
+        for line in self.cart.lines.values():
+            self.show_line(line)
+        self.total_label.config(text=f"Total: ₹ {self.cart.total:.2f}")
+
+    def record_latency(self, start):
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        ordered = sorted(self.latencies)
+        p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) >= 20 else ordered[-1]
+        self.latency_label.config(text=f"scan→line {self.latencies[-1]:.2f} ms (p95 {p95:.2f} ms)")
+
+    def selected_id(self):
+        selection = self.tree.selection()
+        return int(selection[0]) if selection else None
+
+    def remove_selected(self, event=None):
+        item_id = self.selected_id()
+        if item_id is not None:
+            self.cart.remove_line(item_id)
+            self.tree.delete(str(item_id))
+            self.total_label.config(text=f"Total: ₹ {self.cart.total:.2f}")
+        return "break"
+
+    def adjust_selected(self, step):
+        item_id = self.selected_id()
+        if item_id is None or self.scan_var.get().strip():
+            return None # typing into the scan field, not adjusting
+        line = self.cart.lines[item_id]
+        self.show_line(self.cart.set_qty(item_id, line['qty'] + step))
+        return "break"
+
+    def checkout(self):
+        if self.posting or not self.cart.lines:
+            return
+        lines = self.cart.invoice_lines()
+        invoice = {'series': POS_SERIES, 'party_id': None, 'party_name': "Cash Sale",
+                   'party_phone': "N/A", 'date': date.today().isoformat(), 'total_amount': self.cart.total}
+        self.status_label.config(text="Posting...", foreground="")
+        self.post(invoice, lines)
+
+    def post(self, invoice, lines, allow_short=False):
+        self.posting = True
+        self.db.submit(post_invoice, self.db, invoice, lines, allow_short=allow_short, widget=self,
+                       on_done=self.on_posted, on_error=lambda e: self.on_post_failed(e, invoice, lines))
+
+    def on_posted(self, result):
+        self.posting = False
+        total = self.cart.total
+        self.cart.clear()
+        self.render()
+        self.status_label.config(text=f"{result[1]} posted (₹ {total:.2f}). Next customer.", foreground="green")
+        self.scan_entry.focus_set()
+
+    def on_post_failed(self, exc, invoice, lines):
+        self.posting = False
+        if not isinstance(exc, StockConflict):
+            messagebox.showerror("Error", f"Save Failed: {exc}")
+            return
+        # The goods are at the counter, so the book stock is what's wrong; let the cashier decide
+        details = "\n".join(f"{s['name']}: selling {s['wanted']:g}, book stock {s['available']:g}"
+                            for s in exc.shortages)
+        if messagebox.askyesno("Stock Conflict", f"{details}\n\nPost the sale anyway?"):
+            self.post(invoice, lines, allow_short=True)
+        else:
+            self.scan_entry.focus_set()
 
 class PartyMasterFrame(ttk.Frame):
     def __init__(self, parent, db):
@@ -335,21 +808,24 @@ class PartyMasterFrame(ttk.Frame):
         self.tree.heading("name", text="Name")
         self.tree.heading("phone", text="Phone")
         self.tree.pack(fill="both", expand=True, padx=10, pady=10)
-        
+
+        TreeSync(self.db, self.tree, "parties", PARTY_ROWS_SQL, tuple, self.refresh_list)
         self.refresh_list()
 
     def add_party(self):
         name = self.name_entry.get()
         phone = self.phone_entry.get()
         if name:
-            self.db.execute_query("INSERT INTO parties (name, phone) VALUES (?, ?)", (name, phone), commit=True)
+            self.db.submit_query("INSERT INTO parties (name, phone) VALUES (?, ?)", (name, phone), commit=True,
+                                 widget=self, on_error=lambda e: messagebox.showerror("Error", str(e)))
             self.name_entry.delete(0, tk.END)
             self.phone_entry.delete(0, tk.END)
-            self.refresh_list()
 
     def refresh_list(self):
+        self.db.submit_query(PARTY_LIST_SQL, widget=self, on_done=self.show_rows, cached=True)
+
+    def show_rows(self, rows):
         for item in self.tree.get_children():
             self.tree.delete(item)
-        rows = self.db.execute_query("SELECT id, name, phone FROM parties")
         for row in rows:
-            self.tree.insert("", "end", values=row)
+            self.tree.insert("", "end", iid=str(row[0]), values=tuple(row))
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import date
 
+COMPLIANCE_LIST_SQL = "SELECT id, title, due_date, status FROM compliance_events ORDER BY due_date"
+
 class ComplianceModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -15,7 +17,7 @@ class ComplianceModule(ttk.Frame):
         frame = ttk.LabelFrame(self, text="Upcoming Deadlines")
         frame.pack(fill="both", expand=True, padx=20, pady=10)
         
-        # Ensure Table Exists
+        # Seed standard deadlines on first run
         self.init_db()
         
         # List of Standard Indian SME Compliances
@@ -36,15 +38,10 @@ class ComplianceModule(ttk.Frame):
         ttk.Button(add_frame, text="Add Custom Reminder", command=self.add_custom).pack(side="left")
 
     def init_db(self):
-        self.db.execute_query("""
-            CREATE TABLE IF NOT EXISTS compliance_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                due_date DATE,
-                status TEXT DEFAULT 'pending'
-            )
-        """, commit=True)
-        
+        self.db.submit(self.seed_events)
+
+    def seed_events(self):
+        # Runs on the DB worker thread, ahead of the first refresh_tasks query
         # Seed Data if Empty
         count = self.db.execute_query("SELECT COUNT(*) FROM compliance_events")[0][0]
         if count == 0:
@@ -54,14 +51,14 @@ class ComplianceModule(ttk.Frame):
                 ("TDS Payment", "2026-01-07"),
                 ("ESI/PF Deposit", "2026-01-15")
             ]
-            for name, date_str in seed_data:
-                self.db.execute_query("INSERT INTO compliance_events (name, due_date) VALUES (?, ?)", (name, date_str), commit=True)
+            self.db.bulk_insert("compliance_events", ("title", "due_date"), seed_data)
 
     def refresh_tasks(self):
+        self.db.submit_query(COMPLIANCE_LIST_SQL, widget=self, on_done=self.show_tasks)
+
+    def show_tasks(self, rows):
         for widget in self.task_container.winfo_children():
             widget.destroy()
-            
-        rows = self.db.execute_query("SELECT id, name, due_date, status FROM compliance_events ORDER BY due_date")
         
         for r in rows:
             obj_id, name, due, status = r
@@ -87,12 +84,12 @@ class ComplianceModule(ttk.Frame):
 
     def toggle_task(self, obj_id, var_obj):
         new_status = 'done' if var_obj.get() == 1 else 'pending'
-        self.db.execute_query("UPDATE compliance_events SET status=? WHERE id=?", (new_status, obj_id), commit=True)
+        self.db.submit_query("UPDATE compliance_events SET status=? WHERE id=?", (new_status, obj_id), commit=True)
         self.refresh_tasks()
 
     def add_custom(self):
         txt = self.task_entry.get()
         if txt:
-            self.db.execute_query("INSERT INTO compliance_events (name, due_date) VALUES (?, ?)", (txt, date.today().isoformat()), commit=True)
+            self.db.submit_query("INSERT INTO compliance_events (title, due_date) VALUES (?, ?)", (txt, date.today().isoformat()), commit=True)
             self.task_entry.delete(0, tk.END)
             self.refresh_tasks()
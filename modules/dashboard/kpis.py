@@ -0,0 +1,54 @@
+"""
+Dashboard KPIs from the kpi_counters row (no Tk imports here).
+
+Triggers on invoices, parties and low_stock_items keep that one row current
+as the data changes (migration 10), so the dashboard reads every figure with
+a single primary-key lookup however large the tables grow. verify_kpis()
+recounts them from the tables themselves and reports any drift;
+rebuild_kpis() writes the recount back.
+"""
+
+KPI_NAMES = ("final_sales", "invoice_count", "party_count", "low_stock_count")
+
+KPI_SQL = "SELECT " + ", ".join(KPI_NAMES) + " FROM kpi_counters WHERE id = 1"
+
+# The full-table aggregates the counters stand in for
+KPI_RECOUNT_SQL = """
+    SELECT COALESCE((SELECT SUM(total_amount) FROM invoices WHERE status = 'final'), 0),
+           (SELECT COUNT(*) FROM invoices),
+           (SELECT COUNT(*) FROM parties),
+           (SELECT COUNT(*) FROM low_stock_items)
+"""
+
+# The counter adds invoices one at a time, the recount in its own order: the unrounded
+# sums can differ in the last float bits, never by half a paisa
+SALES_TOLERANCE = 0.005
+
+def _stored_kpis(db):
+    rows = db.execute_query(KPI_SQL)
+    return dict(zip(KPI_NAMES, rows[0] if rows else (0.0, 0, 0, 0)))
+
+def fetch_kpis(db):
+    """{name: value} for KPI_NAMES, zeros if the row is missing. Sales are rounded to paise."""
+    kpis = _stored_kpis(db)
+    kpis['final_sales'] = round(kpis['final_sales'], 2)
+    return kpis
+
+def recount_kpis(db):
+    return dict(zip(KPI_NAMES, db.execute_query(KPI_RECOUNT_SQL)[0]))
+
+def verify_kpis(db):
+    """(name, stored, recounted) for every counter that disagrees with a recount."""
+    with db.transaction(): # the write lock: no commit can land between the two reads
+        stored, actual = _stored_kpis(db), recount_kpis(db)
+    tolerance = {'final_sales': SALES_TOLERANCE}
+    return [(name, stored[name], actual[name]) for name in KPI_NAMES
+            if abs(stored[name] - actual[name]) > tolerance.get(name, 0)]
+
+def rebuild_kpis(db):
+    """Replaces the counters with a recount. Returns the new values."""
+    with db.transaction() as conn:
+        actual = dict(zip(KPI_NAMES, conn.execute(KPI_RECOUNT_SQL).fetchone()))
+        conn.execute(f"INSERT OR REPLACE INTO kpi_counters (id, {', '.join(KPI_NAMES)}) VALUES (1, ?, ?, ?, ?)",
+                     [actual[name] for name in KPI_NAMES])
+    return actual
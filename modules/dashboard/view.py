@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 
+from modules.dashboard.kpis import fetch_kpis
+
+# Commits arriving within this window are folded into one KPI reload
+REFRESH_DELAY_MS = 500
+
 class DashboardModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -21,7 +26,10 @@ class DashboardModule(ttk.Frame):
         
         # Refresh Button
         ttk.Button(self, text="Refresh Data", command=self.refresh_data).pack(pady=20)
-        
+
+        self._refresh_job = None
+        # The counters' triggers follow invoices, parties and stock, so their row is all to watch
+        self.db.subscribe("kpi_counters", self.on_changes, widget=self)
         self.refresh_data()
 
     def create_card(self, parent, title, value, col):
@@ -32,28 +40,24 @@ class DashboardModule(ttk.Frame):
         parent.grid_columnconfigure(col, weight=1)
         return label
 
+    def on_changes(self, events):
+        if self._refresh_job is None:
+            self._refresh_job = self.after(REFRESH_DELAY_MS, self.refresh_data)
+
     def refresh_data(self):
-        # 1. Total Sales (Sum of finalised invoices)
-        # Handle NULL result if no invoices
-        res = self.db.execute_query("SELECT SUM(total_amount) FROM invoices WHERE status='final'")
-        total_sales = res[0][0] if res and res[0][0] else 0.0
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self.db.submit(self.fetch_kpis, widget=self, on_done=self.show_kpis)
+
+    def fetch_kpis(self):
+        # One primary-key lookup on the trigger-maintained kpi_counters row
+        kpis = fetch_kpis(self.db)
+        return kpis['final_sales'], kpis['invoice_count'], kpis['low_stock_count'], kpis['party_count']
+
+    def show_kpis(self, kpis):
+        total_sales, count_inv, low_stock, count_parties = kpis
         self.card_sales.config(text=f"₹ {total_sales:,.2f}")
-        
-        # 2. Invoice Count
-        res = self.db.execute_query("SELECT COUNT(*) FROM invoices")
-        count_inv = res[0][0] if res else 0
         self.card_invoices.config(text=str(count_inv))
-        
-        # 3. Low Stock (< 10 units)
-        # Ensure stock_quantity column exists (we added it in migration)
-        try:
-            res = self.db.execute_query("SELECT COUNT(*) FROM items WHERE stock_quantity < 10")
-            low_stock = res[0][0] if res else 0
-            self.card_stock.config(text=str(low_stock), foreground="red" if low_stock > 0 else "green")
-        except Exception:
-            self.card_stock.config(text="Err") # Fallback if migration failed
-
-        # 4. Total Parties
-        res = self.db.execute_query("SELECT COUNT(*) FROM parties")
-        count_parties = res[0][0] if res else 0
+        self.card_stock.config(text=str(low_stock), foreground="red" if low_stock > 0 else "green")
         self.card_parties.config(text=str(count_parties))
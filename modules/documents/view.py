@@ -5,6 +5,16 @@ import os
 import shutil
 from datetime import datetime
 
+from core.virtual_tree import SqlRowSource, VirtualTreeview
+
+DOCUMENT_LIST_SOURCE = dict(
+    columns=(("id", "id"), ("name", "filename"), ("type", "doc_type"), ("date", "upload_date")),
+    from_clause="documents",
+    sort="date", descending=True,
+)
+DOCUMENT_SEARCH_FILTER = "filename LIKE ?"
+DOCUMENT_PATH_SQL = "SELECT filepath FROM documents WHERE id=?"
+
 class DocumentsModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -28,17 +38,14 @@ class DocumentsModule(ttk.Frame):
         ttk.Button(filter_frame, text="Go", command=self.refresh).pack(side="left")
         
         # List
-        self.tree = ttk.Treeview(self, columns=("id", "name", "type", "date"), show="headings")
-        self.tree.heading("id", text="ID")
-        self.tree.heading("name", text="Filename")
-        self.tree.heading("type", text="Type")
-        self.tree.heading("date", text="Upload Date")
+        self.source = SqlRowSource(self.db, **DOCUMENT_LIST_SOURCE)
+        headings = (("id", "ID"), ("name", "Filename"), ("type", "Type"), ("date", "Upload Date"))
+        self.list = VirtualTreeview(self, self.db, self.source, headings, tuple, watch=("documents",))
+        self.tree = self.list.tree
         self.tree.column("id", width=50)
-        self.tree.pack(fill="both", expand=True, padx=20, pady=10)
+        self.list.pack(fill="both", expand=True, padx=20, pady=10)
         
         self.tree.bind("<Double-1>", self.open_file) # Open on double click
-        
-        self.refresh()
 
     def upload_file(self):
         filepath = filedialog.askopenfilename()
@@ -49,19 +56,21 @@ class DocumentsModule(ttk.Frame):
         
         # Copy file
         dest_path = os.path.join(self.storage_dir, f"{int(datetime.now().timestamp())}_{filename}")
-        try:
-            shutil.copy(filepath, dest_path)
-            
-            # Save to DB
-            self.db.execute_query("""
-                INSERT INTO documents (filename, filepath, doc_type) VALUES (?, ?, ?)
-            """, (filename, dest_path, doc_type), commit=True)
-            
-            self.refresh()
-            messagebox.showinfo("Success", "File Uploaded Securely")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Upload Failed: {e}")
+        self.db.submit(self.store_file, filepath, dest_path, filename, doc_type, widget=self,
+                       on_done=self.on_uploaded,
+                       on_error=lambda e: messagebox.showerror("Error", f"Upload Failed: {e}"))
+
+    def store_file(self, filepath, dest_path, filename, doc_type):
+        # Runs on the DB worker thread; large files copy without blocking the UI
+        shutil.copy(filepath, dest_path)
+        
+        # Save to DB
+        self.db.execute_query("""
+            INSERT INTO documents (filename, filepath, doc_type) VALUES (?, ?, ?)
+        """, (filename, dest_path, doc_type), commit=True)
+
+    def on_uploaded(self, _):
+        messagebox.showinfo("Success", "File Uploaded Securely")
 
     def open_file(self, event):
         item = self.tree.selection()
@@ -69,7 +78,10 @@ class DocumentsModule(ttk.Frame):
         doc_id = self.tree.item(item[0], "values")[0]
         
         # Fetch path
-        res = self.db.execute_query("SELECT filepath FROM documents WHERE id=?", (doc_id,))
+        self.db.submit_query(DOCUMENT_PATH_SQL, (doc_id,), widget=self,
+                             on_done=self.open_path)
+
+    def open_path(self, res):
         if res:
             path = res[0][0]
             if os.path.exists(path):
@@ -78,21 +90,9 @@ class DocumentsModule(ttk.Frame):
                 messagebox.showerror("Error", "File not found on disk!")
 
     def refresh(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
         search = self.search_entry.get()
-        query = "SELECT id, filename, doc_type, upload_date FROM documents"
-        params = ()
         if search:
-            query += " WHERE filename LIKE ?"
-            params = (f"%{search}%",)
-            
-        query += " ORDER BY upload_date DESC"
-            
-        try:
-            rows = self.db.execute_query(query, params)
-            for row in rows:
-                self.tree.insert("", "end", values=tuple(row))
-        except:
-            pass # Table might missing if schema not init (it is in schema.sql though)
+            self.source.set_filter(DOCUMENT_SEARCH_FILTER, (f"%{search}%",))
+        else:
+            self.source.set_filter()
+        self.list.reload()
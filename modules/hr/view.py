@@ -4,6 +4,15 @@ import csv
 from datetime import date
 import os
 
+from core.virtual_tree import SqlRowSource, VirtualTreeview
+
+EMPLOYEE_LIST_SQL = "SELECT id, name, role, base_salary FROM employees"
+EMPLOYEE_EXPORT_SQL = "SELECT * FROM employees"
+EMPLOYEE_LIST_SOURCE = dict(
+    columns=(("id", "id"), ("name", "name"), ("role", "role"), ("salary", "base_salary")),
+    from_clause="employees",
+)
+
 class HRModule(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -51,14 +60,11 @@ class EmployeeListFrame(ttk.Frame):
         ttk.Button(tool, text="🗑️ Delete", command=self.delete_emp, style="Danger.TButton").pack(side="right")
         
         # List
-        self.tree = ttk.Treeview(self, columns=("id", "name", "role", "salary"), show="headings")
-        self.tree.heading("id", text="ID")
-        self.tree.heading("name", text="Name")
-        self.tree.heading("role", text="Role")
-        self.tree.heading("salary", text="Salary")
-        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        self.refresh()
+        headings = (("id", "ID"), ("name", "Name"), ("role", "Role"), ("salary", "Salary"))
+        self.list = VirtualTreeview(self, self.db, SqlRowSource(self.db, **EMPLOYEE_LIST_SOURCE), headings,
+                                    tuple, watch=("employees",))
+        self.tree = self.list.tree
+        self.list.pack(fill="both", expand=True, padx=10, pady=10)
 
     def add_emp(self):
         name = self.name_entry.get()
@@ -68,18 +74,9 @@ class EmployeeListFrame(ttk.Frame):
         if not name: return
         
         try:
-            self.db.execute_query("""
-                CREATE TABLE IF NOT EXISTS employees (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    role TEXT,
-                    base_salary REAL
-                )
-            """, commit=True)
-            
-            self.db.execute_query("INSERT INTO employees (name, role, base_salary) VALUES (?, ?, ?)", 
-                                  (name, role, float(salary) if salary else 0), commit=True)
-            self.refresh()
+            self.db.submit_query("INSERT INTO employees (name, role, base_salary) VALUES (?, ?, ?)", 
+                                 (name, role, float(salary) if salary else 0), commit=True,
+                                 widget=self, on_error=lambda e: messagebox.showerror("Error", str(e)))
             self.name_entry.delete(0, tk.END)
             self.role_entry.delete(0, tk.END)
             self.salary_entry.delete(0, tk.END)
@@ -88,31 +85,27 @@ class EmployeeListFrame(ttk.Frame):
              messagebox.showerror("Error", str(e))
 
     def refresh(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        try:
-            rows = self.db.execute_query("SELECT id, name, role, base_salary FROM employees")
-            for row in rows:
-                self.tree.insert("", "end", values=tuple(row))
-        except:
-            pass 
+        self.list.reload(keep_position=True)
 
     def delete_emp(self):
         sel = self.tree.selection()
         if not sel: return
         if messagebox.askyesno("Delete", "Remove Employee?"):
             eid = self.tree.item(sel[0], "values")[0]
-            self.db.execute_query("DELETE FROM employees WHERE id=?", (eid,), commit=True)
-            self.refresh()
+            self.db.submit_query("DELETE FROM employees WHERE id=?", (eid,), commit=True,
+                                 widget=self, on_error=lambda e: messagebox.showerror("Error", str(e)))
 
     def export_csv(self):
         filename = filedialog.asksaveasfilename(defaultextension=".csv")
         if not filename: return
-        rows = self.db.execute_query("SELECT * FROM employees")
+        self.db.submit(self.write_csv, filename, widget=self,
+                       on_done=lambda _: messagebox.showinfo("Done", "Exported"),
+                       on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    def write_csv(self, filename):
+        rows = self.db.iter_query(EMPLOYEE_EXPORT_SQL)
         with open(filename, 'w', newline='') as f:
             csv.writer(f).writerows(rows)
-        messagebox.showinfo("Done", "Exported")
 
 class PayrollFrame(ttk.Frame):
     def __init__(self, parent, db):
@@ -164,12 +157,12 @@ class PayrollFrame(ttk.Frame):
         self.current_emp_data = None
 
     def load_emps(self, event=None):
-        try:
-            rows = self.db.execute_query("SELECT id, name, role, base_salary FROM employees")
-            self.emp_map = {r[1]: {'id': r[0], 'role': r[2], 'salary': r[3]} for r in rows}
-            self.emp_combo['values'] = list(self.emp_map.keys())
-        except:
-            pass
+        self.db.submit_query(EMPLOYEE_LIST_SQL, widget=self, cached=True,
+                             on_done=self.show_emps, on_error=lambda e: None)
+
+    def show_emps(self, rows):
+        self.emp_map = {r[1]: {'id': r[0], 'role': r[2], 'salary': r[3]} for r in rows}
+        self.emp_combo['values'] = list(self.emp_map.keys())
 
     def on_select(self, event):
         name = self.emp_var.get()
@@ -229,8 +222,8 @@ Click 'Generate PDF' to save.
         }
         
         try:
-            from common.pdf_generator import PDFGenerator
-            gen = PDFGenerator(output_dir="payslips")
+            from common.pdf_generator import shared_generator
+            gen = shared_generator(output_dir="payslips")
             path = gen.generate_salary_slip(slip_data)
             
             if messagebox.askyesno("Success", f"Payslip Generated:\n{path}\n\nOpen now?"):
@@ -0,0 +1,219 @@
+"""
+Bulk item catalog import from CSV or XLSX, upserting by SKU (no Tk imports here).
+
+Input is one row per item, with a header row:
+
+    sku, name[, price][, tax_rate][, hsn_code][, unit][, opening_stock]
+        [, reorder_level][, reorder_qty][, supplier]
+
+A new SKU is inserted (name required; opening_stock becomes its opening
+movement in the stock ledger). A known SKU gets the non-blank values of the
+row; stock is never overwritten, stock counts go through adjustments. Rows
+that change nothing are left alone, so they raise no change events and the
+stock list only refreshes for what moved. supplier is a party's GSTIN or
+name.
+
+The file is streamed and written in chunks, each one transaction with one
+INSERT ... ON CONFLICT(sku) DO UPDATE executemany. XLSX needs openpyxl.
+"""
+import csv
+import os
+import time
+
+from modules.billing.importer import RejectsWriter
+from modules.billing.pos import normalize_code
+from modules.inventory.reorder import DEFAULT_REORDER_LEVEL
+
+FIELDS = ("sku", "name", "price", "tax_rate", "hsn_code", "unit", "opening_stock", "reorder_level", "reorder_qty",
+          "supplier")
+CHUNK_ROWS = 20_000
+PROGRESS_EVERY = 20_000
+
+# Insert defaults for blank cells of a new item; for a known one, blank means "keep"
+NEW_ITEM_DEFAULTS = {'price': 0.0, 'tax_rate': 0.0, 'unit': "pcs", 'opening_stock': 0.0,
+                     'reorder_level': DEFAULT_REORDER_LEVEL}
+UPDATED_COLUMNS = ("name", "price", "tax_rate", "hsn_code", "unit", "reorder_level", "reorder_qty", "supplier_id")
+
+# A known SKU's blank in a NOT NULL column is sent as '' to get past the constraint, then kept as is
+NOT_NULL_COLUMNS = ("name", "reorder_level")
+_INCOMING = {c: f"NULLIF(excluded.{c}, '')" if c in NOT_NULL_COLUMNS else f"excluded.{c}" for c in UPDATED_COLUMNS}
+UPSERT_SQL = """
+    INSERT INTO items (sku, name, price, tax_rate, hsn_code, unit, reorder_level, reorder_qty, supplier_id,
+                       stock_quantity)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sku) DO UPDATE SET """ + ", ".join(
+        f"{c} = COALESCE({new}, {c})" for c, new in _INCOMING.items()) + """
+    WHERE """ + " OR ".join(f"({new} IS NOT NULL AND {new} IS NOT {c})" for c, new in _INCOMING.items())
+
+EXISTING_SKUS_SQL = "SELECT sku FROM items WHERE sku IN ({skus})"
+PARTY_MAP_SQL = "SELECT id, name, gstin FROM parties"
+
+class RejectedItem(ValueError):
+    pass
+
+def can_read_xlsx():
+    try:
+        import openpyxl # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _cell(value):
+    # Spreadsheets hand back whole numbers as floats ("12345.0" is not the SKU 12345)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value).strip()
+
+def read_catalog(path):
+    """Yields one dict per item row (header names lower-cased) from a .csv or .xlsx file."""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        if not can_read_xlsx():
+            raise RuntimeError("Reading .xlsx catalogs needs the openpyxl package (pip install openpyxl)")
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_cell(name).lower() for name in next(rows, ())]
+            for values in rows:
+                if any(value is not None for value in values):
+                    yield dict(zip(header, map(_cell, values)))
+        finally:
+            workbook.close()
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader, [])]
+            for values in reader:
+                if values:
+                    yield dict(zip(header, (value.strip() for value in values)))
+
+def _number(row, field, low=0.0, high=None):
+    value = row.get(field) or ""
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise RejectedItem(f"{field} '{value}' is not a number")
+    if number < low or (high is not None and number > high):
+        raise RejectedItem(f"{field} {value} is out of range")
+    return number
+
+def parse_item(row):
+    """A catalog row -> {field: value or None}, sku normalized. Raises RejectedItem."""
+    sku = normalize_code(row.get('sku') or "")
+    if not sku:
+        raise RejectedItem("missing SKU")
+    return {'sku': sku, 'name': row.get('name') or None, 'price': _number(row, 'price'),
+            'tax_rate': _number(row, 'tax_rate', high=100.0), 'hsn_code': row.get('hsn_code') or None,
+            'unit': row.get('unit') or None, 'opening_stock': _number(row, 'opening_stock'),
+            'reorder_level': _number(row, 'reorder_level'), 'reorder_qty': _number(row, 'reorder_qty'),
+            'supplier': row.get('supplier') or None}
+
+class CatalogImporter:
+    """Streams a catalog file into items, a chunk per transaction."""
+    def __init__(self, db, chunk_rows=CHUNK_ROWS):
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.suppliers = {}
+        for party_id, name, gstin in db.execute_query(PARTY_MAP_SQL):
+            self.suppliers.setdefault(name.strip().lower(), party_id)
+            if gstin:
+                self.suppliers[gstin.strip().upper()] = party_id
+
+    def parse(self, row):
+        """parse_item, with the supplier resolved to a party id. Raises RejectedItem."""
+        item = parse_item(row)
+        supplier = item.pop('supplier')
+        item['supplier_id'] = None
+        if supplier:
+            item['supplier_id'] = self.suppliers.get(supplier.upper(), self.suppliers.get(supplier.lower()))
+            if item['supplier_id'] is None:
+                raise RejectedItem(f"no party '{supplier}' to buy from")
+        return item
+
+    def write_chunk(self, items):
+        """
+        Upserts parsed items in one transaction. Returns (inserted, updated, outcome),
+        outcome holding one entry per item: None if written, else why not.
+        """
+        with self.db.transaction() as conn:
+            skus = list({item['sku'] for item in items})
+            known = set()
+            for start in range(0, len(skus), 500):
+                part = skus[start:start + 500]
+                known.update(r[0] for r in conn.execute(EXISTING_SKUS_SQL.format(skus=", ".join("?" * len(part))),
+                                                       part))
+            rows, outcome, inserted = [], [], 0
+            for item in items:
+                if item['sku'] not in known:
+                    if not item['name']:
+                        outcome.append(f"new SKU {item['sku']} needs a name")
+                        continue
+                    item = {field: NEW_ITEM_DEFAULTS.get(field) if value is None else value
+                            for field, value in item.items()}
+                    known.add(item['sku'])
+                    inserted += 1
+                for column in NOT_NULL_COLUMNS:
+                    if item[column] is None:
+                        item[column] = ""
+                rows.append((item['sku'], item['name'], item['price'], item['tax_rate'], item['hsn_code'],
+                             item['unit'], item['reorder_level'], item['reorder_qty'], item['supplier_id'],
+                             item['opening_stock']))
+                outcome.append(None)
+            # Counts inserts plus the updates that changed something
+            changed = conn.executemany(UPSERT_SQL, rows).rowcount if rows else 0
+        return inserted, changed - inserted, outcome
+
+    def run(self, path, rejects_path=None, progress=None, should_stop=None):
+        """
+        Imports path. progress(result) is called every PROGRESS_EVERY rows and once at the end;
+        should_stop() can cancel between chunks (already written chunks stay).
+        Returns a dict of counts: rows, inserted, updated, unchanged, rejected, seconds.
+        """
+        start = time.perf_counter()
+        result = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'seconds': 0.0,
+                  'cancelled': False}
+        root, _ = os.path.splitext(path)
+        rejects = RejectsWriter(rejects_path or f"{root}.rejects.csv", FIELDS)
+        chunk, chunk_rows, reported = [], [], 0
+        try:
+            for row in read_catalog(path):
+                result['rows'] += 1
+                try:
+                    chunk.append(self.parse(row))
+                    chunk_rows.append(row)
+                except RejectedItem as e:
+                    rejects.write([row], str(e))
+                    result['rejected'] += 1
+                if len(chunk) >= self.chunk_rows:
+                    self._flush(chunk, chunk_rows, rejects, result)
+                    chunk, chunk_rows = [], []
+                    if should_stop and should_stop():
+                        result['cancelled'] = True
+                        break
+                    if progress and result['rows'] - reported >= PROGRESS_EVERY:
+                        reported = result['rows']
+                        progress(dict(result, seconds=time.perf_counter() - start))
+            if chunk and not result['cancelled']:
+                self._flush(chunk, chunk_rows, rejects, result)
+        finally:
+            rejects.close()
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        result['rejects_path'] = rejects.path if rejects.count else None
+        if progress:
+            progress(result)
+        return result
+
+    def _flush(self, chunk, chunk_rows, rejects, result):
+        inserted, updated, outcome = self.write_chunk(chunk)
+        for row, reason in zip(chunk_rows, outcome):
+            if reason:
+                rejects.write([row], reason)
+                result['rejected'] += 1
+        result['inserted'] += inserted
+        result['updated'] += updated
+        result['unchanged'] += outcome.count(None) - inserted - updated
+
+def import_catalog(db, path, rejects_path=None, progress=None, should_stop=None):
+    return CatalogImporter(db).run(path, rejects_path, progress, should_stop)
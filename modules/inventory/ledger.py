@@ -0,0 +1,112 @@
+"""
+Stock movement ledger (no Tk imports here).
+
+Every change to stock is a row in stock_movements: a signed quantity of one
+kind (sale, purchase, adjustment, return; 'opening' is written by the database
+when an item is created with stock). Rows are never updated or deleted; a
+correction is another movement.
+
+Triggers keep items.stock_quantity equal to the sum of an item's movements and
+bump items.version with it, so current stock stays one indexed row per item
+however long the history grows. Stock on an earlier date is the item's latest
+snapshot on or before it plus the movements since; snapshots are taken per
+period (see take_snapshot and stock_snapshot.py), so that sum stays short.
+"""
+from datetime import date, timedelta
+
+KINDS = ("sale", "purchase", "adjustment", "return")
+MOVEMENT_COLUMNS = ("item_id", "date", "kind", "quantity", "unit_cost", "invoice_id", "note")
+
+# :day is inclusive; the latest snapshot on or before it, then the movements after that snapshot
+STOCK_AS_OF_SQL = """
+    SELECT i.id,
+           COALESCE(s.quantity, 0) + COALESCE((
+               SELECT SUM(m.quantity) FROM stock_movements m
+               WHERE m.item_id = i.id AND m.date > COALESCE(s.as_of, '') AND m.date <= :day), 0) AS quantity
+    FROM items i
+    LEFT JOIN stock_snapshots s ON s.item_id = i.id
+        AND s.as_of = (SELECT MAX(as_of) FROM stock_snapshots WHERE item_id = i.id AND as_of <= :day)
+    {where}
+"""
+
+TAKE_SNAPSHOT_SQL = """
+    INSERT OR REPLACE INTO stock_snapshots (item_id, as_of, quantity)
+    SELECT id, :day, quantity FROM (""" + STOCK_AS_OF_SQL.format(where="") + """)
+"""
+
+# The balance the triggers kept against the full ledger, for items where they disagree
+BALANCE_MISMATCH_SQL = """
+    SELECT i.id, i.stock_quantity, COALESCE(SUM(m.quantity), 0) AS ledger
+    FROM items i
+    LEFT JOIN stock_movements m ON m.item_id = i.id
+    GROUP BY i.id
+    HAVING ABS(COALESCE(i.stock_quantity, 0) - ledger) > 1e-9
+"""
+
+def movement(item_id, day, kind, quantity, unit_cost=None, invoice_id=None, note=None):
+    """One stock_movements row (MOVEMENT_COLUMNS order). quantity is signed: negative takes stock out."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown stock movement kind '{kind}'")
+    return (item_id, day, kind, quantity, unit_cost, invoice_id, note)
+
+def sale_movements(inv_id, day, wanted):
+    """Movements for an invoice: one per item, from wanted_quantities() (item id -> quantity sold)."""
+    return [movement(item_id, day, "sale", -qty, invoice_id=inv_id) for item_id, qty in wanted.items()]
+
+def record_movements(db, rows):
+    """Appends movement rows with one executemany (joining an open transaction). Returns the count."""
+    return db.bulk_insert("stock_movements", MOVEMENT_COLUMNS, rows) if rows else 0
+
+def receive_purchase(db, item_id, quantity, unit_cost, day=None, note=None):
+    """Records stock bought in at unit_cost (what valuation.py costs it at). Returns the movement id."""
+    if quantity <= 0:
+        raise ValueError("Quantity received must be positive")
+    if unit_cost is None or unit_cost < 0:
+        raise ValueError("Unit cost must be zero or more")
+    with db.transaction() as conn:
+        return conn.execute(f"INSERT INTO stock_movements ({', '.join(MOVEMENT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            movement(item_id, day or date.today().isoformat(), "purchase", quantity,
+                                     unit_cost=unit_cost, note=note)).lastrowid
+
+def adjust_stock(db, targets, day=None, note="stock count"):
+    """
+    Brings items to counted quantities ({item id: quantity}) with one adjustment
+    movement each for the difference. Returns the number of items adjusted.
+    """
+    day = day or date.today().isoformat()
+    with db.transaction() as conn:
+        ids = list(targets)
+        current = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            current.update(conn.execute(f"SELECT id, COALESCE(stock_quantity, 0) FROM items "
+                                        f"WHERE id IN ({', '.join('?' * len(part))})", part).fetchall())
+        rows = [movement(item_id, day, "adjustment", targets[item_id] - qty, note=note)
+                for item_id, qty in current.items() if targets[item_id] != qty]
+        return record_movements(db, rows)
+
+def stock_as_of(db, day, item_ids=None):
+    """{item id: quantity on hand at the end of day} for the given items (default: all)."""
+    params = {'day': day}
+    where = ""
+    if item_ids is not None:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return {}
+        params.update({f"id{n}": item_id for n, item_id in enumerate(item_ids)})
+        where = f"WHERE i.id IN ({', '.join(f':id{n}' for n in range(len(item_ids)))})"
+    return {item_id: qty for item_id, qty in db.execute_query(STOCK_AS_OF_SQL.format(where=where), params)}
+
+def last_month_end(today=None):
+    today = today or date.today()
+    return (today.replace(day=1) - timedelta(days=1)).isoformat()
+
+def take_snapshot(db, as_of=None):
+    """Stores every item's balance at the end of as_of (default: the last month end). Returns the row count."""
+    as_of = as_of or last_month_end()
+    with db.transaction() as conn:
+        return conn.execute(TAKE_SNAPSHOT_SQL, {'day': as_of}).rowcount
+
+def balance_mismatches(db):
+    """(item id, stock_quantity, ledger sum) for items whose balance drifted from their movements."""
+    return db.execute_query(BALANCE_MISMATCH_SQL)
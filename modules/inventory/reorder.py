@@ -0,0 +1,81 @@
+"""
+Reorder suggestions from the low-stock set (no Tk imports here).
+
+low_stock_items holds the items below their reorder level. Triggers on items
+keep it as stock moves (migration 9), so the dashboard and the reorder list
+read that small set instead of scanning the catalog. Suggested purchase
+orders group those items by supplier party; each line orders the item's
+reorder_qty (default: its reorder level), or more when that would not bring
+stock back up to the level.
+"""
+import csv
+import os
+import re
+from datetime import date
+from itertools import groupby
+
+DEFAULT_REORDER_LEVEL = 10.0
+
+LOW_STOCK_COUNT_SQL = "SELECT COUNT(*) FROM low_stock_items"
+
+REORDER_LIST_SOURCE = dict(
+    columns=(("id", "l.item_id"), ("sku", "i.sku"), ("name", "i.name"), ("supplier", "p.name"),
+             ("stock", "l.stock_quantity"), ("level", "l.reorder_level"), ("since", "l.since")),
+    from_clause="low_stock_items l JOIN items i ON i.id = l.item_id LEFT JOIN parties p ON p.id = i.supplier_id",
+    count_from="low_stock_items l",
+)
+
+# Priced at the item's last purchase cost, else its average cost at the last valuation
+SUGGESTIONS_SQL = """
+    SELECT i.supplier_id, p.name, i.id, i.sku, i.name, l.stock_quantity, l.reorder_level,
+           MAX(COALESCE(i.reorder_qty, l.reorder_level), l.reorder_level - l.stock_quantity) AS order_qty,
+           COALESCE((SELECT m.unit_cost FROM stock_movements m
+                     WHERE m.item_id = i.id AND m.kind = 'purchase' AND m.unit_cost IS NOT NULL
+                     ORDER BY m.date DESC, m.id DESC LIMIT 1), v.avg_cost, 0) AS unit_cost
+    FROM low_stock_items l
+    JOIN items i ON i.id = l.item_id
+    LEFT JOIN parties p ON p.id = i.supplier_id
+    LEFT JOIN item_valuations v ON v.item_id = i.id
+    ORDER BY i.supplier_id IS NULL, p.name, i.supplier_id, i.name
+"""
+
+PO_HEADER = ["SKU", "Item", "In Stock", "Reorder Level", "Order Qty", "Unit Cost", "Amount"]
+
+def suggest_purchase_orders(db):
+    """
+    One suggested order per supplier (items without one come last, under supplier None):
+    dicts with supplier_id, supplier, lines and total. Lines are dicts with item_id, sku,
+    name, stock, reorder_level, qty, unit_cost and amount.
+    """
+    orders = []
+    for supplier_id, rows in groupby(db.execute_query(SUGGESTIONS_SQL), key=lambda r: r[0]):
+        lines, supplier = [], None
+        for _, supplier, item_id, sku, name, stock, level, qty, unit_cost in rows:
+            if qty > 0:
+                lines.append({'item_id': item_id, 'sku': sku, 'name': name, 'stock': stock, 'reorder_level': level,
+                              'qty': qty, 'unit_cost': unit_cost, 'amount': round(qty * unit_cost, 2)})
+        if lines:
+            orders.append({'supplier_id': supplier_id, 'supplier': supplier, 'lines': lines,
+                           'total': round(sum(line['amount'] for line in lines), 2)})
+    return orders
+
+def purchase_order_filename(order, day):
+    name = re.sub(r"[^A-Za-z0-9]+", "-", order['supplier'] or "no-supplier").strip("-")
+    return f"PO-{day}-{order['supplier_id'] or 0}-{name}.csv"
+
+def write_purchase_orders(orders, output_dir, day=None):
+    """Writes each suggested order to its own CSV in output_dir. Returns the paths."""
+    day = day or date.today().isoformat()
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for order in orders:
+        path = os.path.join(output_dir, purchase_order_filename(order, day))
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([f"Supplier: {order['supplier'] or 'None set'}", f"Date: {day}"])
+            writer.writerow(PO_HEADER)
+            writer.writerows([line['sku'], line['name'], line['stock'], line['reorder_level'], line['qty'],
+                              line['unit_cost'], line['amount']] for line in order['lines'])
+            writer.writerow(["", "", "", "", "", "Total", order['total']])
+        paths.append(path)
+    return paths
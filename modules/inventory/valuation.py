@@ -0,0 +1,241 @@
+"""
+Stock valued at cost, FIFO and weighted average (no Tk imports here).
+
+Both methods replay an item's stock_movements in date order: purchases (and
+any inbound movement with a unit_cost) add a cost layer and move the average;
+sales and other outbound movements use up the oldest layers and leave the
+average alone. Inbound stock with no recorded cost (opening stock, returns) is
+taken in at the current average, or at the selling price for an item that has
+none yet.
+
+revalue() keeps item_valuations current: it replays only the movements
+recorded since its last run, on top of each touched item's stored layers, and
+rebuilds an item from its full history only when a backdated movement lands
+before what was already valued. valuation_as_of() values every item at a past
+date in one streamed pass over the ledger. RevalueRunner keeps revalue() off
+the shared DB worker: a first run over a large ledger takes seconds.
+"""
+import json
+import threading
+from collections import deque
+from itertools import groupby
+
+# Items per history query
+VALUATION_BATCH = 2000
+# Runs overlapping from two threads could store an item's older state after a newer watermark
+_REVALUE_LOCK = threading.Lock()
+# Quantities smaller than this are rounding left over from fractional stock
+EPSILON = 1e-9
+
+VALUATION_COLUMNS = ("item_id", "quantity", "fifo_value", "avg_cost", "avg_value", "layers", "last_date",
+                     "last_movement_id")
+
+HISTORY_SQL = """
+    SELECT item_id, id, date, quantity, unit_cost FROM stock_movements
+    WHERE item_id IN ({ids}) AND id > ? AND id <= ?
+    ORDER BY item_id, date, id
+"""
+
+# (item_id, date) index order; the ORDER BY needs no sort
+AS_OF_HISTORY_SQL = """
+    SELECT item_id, id, date, quantity, unit_cost FROM stock_movements
+    WHERE date <= ?
+    ORDER BY item_id, date, id
+"""
+
+# Movements recorded since the last run and the earliest date they touch, per item
+TOUCHED_SQL = """
+    SELECT item_id, MIN(date) FROM stock_movements
+    WHERE id > ? AND id <= ?
+    GROUP BY item_id
+"""
+
+class ItemCost:
+    """One item's FIFO cost layers ([quantity, unit cost], oldest first) and moving average."""
+    __slots__ = ("quantity", "avg_cost", "layers")
+
+    def __init__(self, quantity=0.0, avg_cost=0.0, layers=()):
+        self.quantity = quantity
+        self.avg_cost = avg_cost
+        self.layers = deque([list(layer) for layer in layers])
+
+    def receive(self, quantity, unit_cost):
+        total = self.quantity + quantity
+        if self.quantity <= 0 or total <= 0:
+            self.avg_cost = unit_cost
+        else:
+            self.avg_cost = (self.quantity * self.avg_cost + quantity * unit_cost) / total
+        self.quantity = total
+        layers = self.layers
+        # Stock sold before it arrived is settled first
+        while quantity > EPSILON and layers and layers[0][0] < 0:
+            layer = layers[0]
+            if -layer[0] > quantity:
+                layer[0] += quantity
+                quantity = 0
+            else:
+                quantity += layer[0]
+                layers.popleft()
+        if quantity > EPSILON:
+            layers.append([quantity, unit_cost])
+
+    def issue(self, quantity):
+        self.quantity -= quantity
+        layers = self.layers
+        while quantity > EPSILON and layers and layers[0][0] > 0:
+            layer = layers[0]
+            if layer[0] > quantity:
+                layer[0] -= quantity
+                quantity = 0
+            else:
+                quantity -= layer[0]
+                layers.popleft()
+        if quantity > EPSILON:
+            # Oversold: carried as one negative layer at the last known cost until stock arrives
+            if layers:
+                layers[0][0] -= quantity
+            else:
+                layers.append([-quantity, self.avg_cost])
+
+    def apply(self, quantity, unit_cost, fallback_cost):
+        if quantity > 0:
+            if unit_cost is None:
+                unit_cost = self.avg_cost if self.quantity > 0 else fallback_cost
+            self.receive(quantity, unit_cost)
+        elif quantity < 0:
+            self.issue(-quantity)
+
+    def fifo_value(self):
+        return sum(qty * cost for qty, cost in self.layers)
+
+def valuation_row(item_id, cost, last_date, last_movement_id):
+    """An item_valuations row (VALUATION_COLUMNS order)."""
+    return (item_id, cost.quantity, round(cost.fifo_value(), 2), cost.avg_cost,
+            round(cost.quantity * cost.avg_cost, 2), json.dumps(list(cost.layers)), last_date, last_movement_id)
+
+def replay(movements, cost, fallback_cost):
+    """
+    Feeds (item_id, id, date, quantity, unit_cost) rows of one item, in date order, into
+    cost. Returns (last date, highest movement id) of what it replayed.
+    """
+    last_date, last_id = None, 0
+    apply = cost.apply
+    for _, movement_id, day, quantity, unit_cost in movements:
+        apply(quantity, unit_cost, fallback_cost)
+        last_date = day
+        if movement_id > last_id:
+            last_id = movement_id
+    return last_date, last_id
+
+def item_prices(db, item_ids=None):
+    """Selling prices: the cost of last resort for stock that arrived without one."""
+    if item_ids is None:
+        return dict(db.iter_query("SELECT id, COALESCE(price, 0) FROM items", batch_size=10_000))
+    placeholders = ', '.join('?' * len(item_ids))
+    return dict(db.execute_query(f"SELECT id, COALESCE(price, 0) FROM items WHERE id IN ({placeholders})",
+                                 item_ids))
+
+def valuation_as_of(db, day):
+    """
+    Every item with stock history, valued at the end of day: a list of
+    (item_id, quantity, fifo_value, avg_cost, avg_value) tuples in item order.
+    """
+    prices = item_prices(db)
+    result = []
+    for item_id, movements in groupby(db.iter_query(AS_OF_HISTORY_SQL, (day,), batch_size=10_000),
+                                      key=lambda row: row[0]):
+        cost = ItemCost()
+        replay(movements, cost, prices.get(item_id, 0))
+        result.append((item_id, cost.quantity, round(cost.fifo_value(), 2), cost.avg_cost,
+                       round(cost.quantity * cost.avg_cost, 2)))
+    return result
+
+def revalue(db, progress=None):
+    """
+    Brings item_valuations up to date with the movement ledger, replaying only
+    what was recorded since the last run. progress(done, total) follows each
+    batch of items. Returns the number of items revalued.
+    """
+    with _REVALUE_LOCK:
+        return _revalue(db, progress)
+
+def _revalue(db, progress):
+    # A run values every movement up to the newest one and stores the result in one
+    # transaction, so the highest id any item was valued through is where the next run starts
+    start = db.execute_query("SELECT COALESCE(MAX(last_movement_id), 0) FROM item_valuations")[0][0]
+    end = db.execute_query("SELECT COALESCE(MAX(id), 0) FROM stock_movements")[0][0]
+    touched = db.execute_query(TOUCHED_SQL, (start, end))
+    rows = []
+    for offset in range(0, len(touched), VALUATION_BATCH):
+        batch = dict(touched[offset:offset + VALUATION_BATCH])
+        ids = list(batch)
+        placeholders = ', '.join('?' * len(ids))
+        stored = {row[0]: row[1:] for row in db.execute_query(
+            f"SELECT item_id, quantity, avg_cost, layers, last_date FROM item_valuations "
+            f"WHERE item_id IN ({placeholders})", ids)}
+        # Items whose new movements all fall on or after what was valued carry on from their layers;
+        # a backdated movement sends its item back to the start of its history
+        extend = [item_id for item_id in ids if item_id in stored and batch[item_id] >= stored[item_id][3]]
+        rebuild = [item_id for item_id in ids if item_id not in stored or batch[item_id] < stored[item_id][3]]
+        prices = item_prices(db, ids)
+        for group, extending in ((extend, True), (rebuild, False)):
+            if not group:
+                continue
+            history = db.execute_query(HISTORY_SQL.format(ids=', '.join('?' * len(group))),
+                                       (*group, start if extending else 0, end))
+            for item_id, movements in groupby(history, key=lambda row: row[0]):
+                if extending:
+                    quantity, avg_cost, layers = stored[item_id][:3]
+                    cost = ItemCost(quantity, avg_cost, json.loads(layers))
+                else:
+                    cost = ItemCost()
+                last_date, last_id = replay(movements, cost, prices.get(item_id, 0))
+                rows.append(valuation_row(item_id, cost, last_date, last_id))
+        if progress:
+            progress(offset + len(ids), len(touched))
+    with db.transaction() as conn:
+        conn.executemany(f"INSERT OR REPLACE INTO item_valuations ({', '.join(VALUATION_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(VALUATION_COLUMNS))})", rows)
+    return len(rows)
+
+class RevalueRunner:
+    """
+    Runs revalue() on a thread of its own, one run at a time. Requests made
+    while a run is going coalesce into a single follow-up run, so a burst of
+    commits costs at most two. on_error(exc) is called on that thread.
+    """
+    def __init__(self, db, on_error=None):
+        self.db = db
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._running = self._pending = False
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def request(self):
+        with self._lock:
+            if self._running:
+                self._pending = True
+                return
+            self._running = True
+            self._idle.clear()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Blocks until no run is going or pending. Returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        with self.db.read_connection():
+            while True:
+                try:
+                    revalue(self.db)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(e)
+                with self._lock:
+                    if not self._pending:
+                        self._running = False
+                        self._idle.set()
+                        return
+                    self._pending = False
@@ -1,6 +1,31 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import csv
+import os
+import threading
+from datetime import date
+
+from core.virtual_tree import SqlRowSource, VirtualTreeview
+from modules.billing.pos import normalize_code
+from modules.inventory.catalog import import_catalog
+from modules.inventory.ledger import receive_purchase
+from modules.inventory.reorder import (DEFAULT_REORDER_LEVEL, REORDER_LIST_SOURCE, suggest_purchase_orders,
+                                       write_purchase_orders)
+from modules.inventory.valuation import RevalueRunner
+
+# Stock is valued at cost (FIFO) from item_valuations, which revalue() keeps up to date
+STOCK_LIST_SOURCE = dict(
+    columns=(("id", "i.id"), ("sku", "i.sku"), ("name", "i.name"), ("price", "i.price"),
+             ("stock", "i.stock_quantity"), ("value", "v.fifo_value")),
+    from_clause="items i LEFT JOIN item_valuations v ON v.item_id = i.id",
+    count_from="items i",
+)
+STOCK_EXPORT_SQL = """
+    SELECT i.name, i.sku, i.price, i.stock_quantity, COALESCE(v.fifo_value, 0), COALESCE(v.avg_cost, 0),
+           COALESCE(v.avg_value, 0)
+    FROM items i
+    LEFT JOIN item_valuations v ON v.item_id = i.id
+"""
 
 class InventoryModule(ttk.Frame):
     def __init__(self, parent, db):
@@ -16,7 +41,13 @@ class InventoryModule(ttk.Frame):
         btn_frame = ttk.Frame(header)
         btn_frame.pack(side="right")
         ttk.Button(btn_frame, text="+ Add Item", command=self.show_add_item).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="📦 Receive Stock", command=self.show_receive_stock).pack(side="left", padx=5)
+        self.import_button = ttk.Button(btn_frame, text="📥 Import Catalog", command=self.import_file)
+        self.import_button.pack(side="left", padx=5)
+        self._import_stop = None
         ttk.Button(btn_frame, text="📊 Export CSV", command=self.export_csv).pack(side="left", padx=5)
+        self.status_label = ttk.Label(header, text="")
+        self.status_label.pack(side="right", padx=10)
         
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill="both", expand=True, padx=20, pady=10)
@@ -24,37 +55,101 @@ class InventoryModule(ttk.Frame):
         # Pass self to StockListFrame so it can callback to notebook
         self.stock_list_frame = StockListFrame(self.notebook, self.db)
         self.notebook.add(self.stock_list_frame, text="Current Stock")
+        self.reorder_frame = ReorderFrame(self.notebook, self.db)
+        self.notebook.add(self.reorder_frame, text="Reorder")
         
         self.add_item_frame = AddItemFrame(self.notebook, self.db, self.on_item_saved)
+        self.receive_frame = ReceiveStockFrame(self.notebook, self.db, self.on_stock_received)
+
+    def show_tab(self, frame, text):
+        if text not in [self.notebook.tab(i, "text") for i in range(self.notebook.index("end"))]:
+            self.notebook.add(frame, text=text)
+        self.notebook.select(frame)
 
     def show_add_item(self):
-        if "Add Item" not in [self.notebook.tab(i, "text") for i in range(self.notebook.index("end"))]:
-            self.notebook.add(self.add_item_frame, text="Add Item")
-        self.notebook.select(self.add_item_frame)
+        self.show_tab(self.add_item_frame, "Add Item")
+
+    def show_receive_stock(self):
+        self.show_tab(self.receive_frame, "Receive Stock")
 
     def on_item_saved(self):
         messagebox.showinfo("Success", "Item Saved Successfully!")
-        self.stock_list_frame.refresh_data()
         self.notebook.forget(self.add_item_frame)
 
+    def on_stock_received(self):
+        messagebox.showinfo("Success", "Stock Received!")
+        self.notebook.forget(self.receive_frame)
+
+    def import_file(self):
+        if self._import_stop is not None:
+            self._import_stop.set()
+            self.status_label.configure(text="Cancelling after this chunk...")
+            return
+        filename = filedialog.askopenfilename(filetypes=[("Item catalogs", "*.csv *.xlsx"), ("All Files", "*.*")])
+        if not filename: return
+
+        # Off the DB worker, so the stock list keeps loading; only rows that changed raise
+        # change events, so it refreshes just for those as each chunk commits
+        self._import_stop = threading.Event()
+        self.import_button.configure(text="⏹ Cancel Import")
+        self.status_label.configure(text="Importing...")
+        progress = lambda result: self.db.notify_ui(self, self.show_import_progress, result)
+        self.db.submit_long(import_catalog, self.db, filename, progress=progress,
+                            should_stop=self._import_stop.is_set, widget=self,
+                            on_done=self.on_imported, on_error=self.on_import_failed)
+
+    def show_import_progress(self, result):
+        self.status_label.configure(text=f"Read {result['rows']:,} rows ({result['rejected']:,} rejected)")
+
+    def import_finished(self):
+        self._import_stop = None
+        self.import_button.configure(text="📥 Import Catalog")
+        self.status_label.configure(text="")
+
+    def on_imported(self, result):
+        self.import_finished()
+        rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+        message = (f"{result['inserted']:,} items added, {result['updated']:,} updated, "
+                   f"{result['unchanged']:,} unchanged in {result['seconds']:.1f}s ({rate:,.0f} rows/s)"
+                   + (" before the import was cancelled." if result['cancelled'] else "."))
+        if result['rejects_path']:
+            messagebox.showwarning("Import", f"{message}\n\n{result['rejected']:,} rows were rejected; "
+                                             f"see {result['rejects_path']}")
+        else:
+            messagebox.showinfo("Import", message)
+
+    def on_import_failed(self, exc):
+        self.import_finished()
+        messagebox.showerror("Error", f"Import failed: {exc}")
+
     def export_csv(self):
         try:
             filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
             if not filename: return
             
-            # Calculated Export: Value = Price * Stock
-            query = "SELECT name, sku, price, stock_quantity, (price * stock_quantity) as value FROM items"
-            rows = self.db.execute_query(query)
-            
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Item Name", "SKU", "Price", "Stock Qty", "Total Value"])
-                writer.writerows(rows)
-                
-            messagebox.showinfo("Success", f"Inventory Exported to {filename}")
+            # Values are brought up to date by the stock list's revaluer and waited for off the
+            # DB worker; only the export's own read goes to the worker
+            revaluer = self.stock_list_frame.revaluer
+            revaluer.request()
+            self.status_label.configure(text="Valuing stock...")
+            self.db.submit_long(revaluer.wait, widget=self, on_done=lambda _: self.write_export(filename))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def write_export(self, filename):
+        self.status_label.configure(text="")
+        self.db.submit(self.write_csv, filename, widget=self,
+                       on_done=lambda _: messagebox.showinfo("Success", f"Inventory Exported to {filename}"),
+                       on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    def write_csv(self, filename):
+        rows = self.db.iter_query(STOCK_EXPORT_SQL)
+        
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Item Name", "SKU", "Price", "Stock Qty", "FIFO Value", "Avg Cost", "Avg Value"])
+            writer.writerows(rows)
+
 class StockListFrame(ttk.Frame):
     def __init__(self, parent, db):
         super().__init__(parent)
@@ -65,30 +160,31 @@ class StockListFrame(ttk.Frame):
         tool_frame.pack(fill="x", pady=5)
         ttk.Button(tool_frame, text="🗑️ Delete Selected", command=self.delete_item, style="Danger.TButton").pack(side="right", padx=5)
         
-        self.tree = ttk.Treeview(self, columns=("id", "sku", "name", "price", "stock", "value"), show="headings")
-        self.tree.heading("id", text="ID")
-        self.tree.heading("sku", text="SKU")
-        self.tree.heading("name", text="Item Name")
-        self.tree.heading("price", text="Price")
-        self.tree.heading("stock", text="Stock Qty")
-        self.tree.heading("value", text="Stock Value")
+        headings = (("id", "ID"), ("sku", "SKU"), ("name", "Item Name"), ("price", "Price"),
+                    ("stock", "Stock Qty"), ("value", "Value at Cost"))
+        self.list = VirtualTreeview(self, self.db, SqlRowSource(self.db, **STOCK_LIST_SOURCE), headings,
+                                    self.format_row, watch=("items", "item_valuations"))
+        self.tree = self.list.tree
         
         self.tree.column("id", width=50)
-        self.tree.pack(fill="both", expand=True)
-        
-        self.refresh_data()
+        self.list.pack(fill="both", expand=True)
+
+        # New movements are valued on a thread of their own, so other tabs' queries do not queue
+        # behind a long run; the list reloads when item_valuations changes
+        self.revaluer = RevalueRunner(self.db, on_error=lambda e: self.db.notify_ui(
+            self, messagebox.showerror, "Error", f"Stock valuation failed: {e}"))
+        self.db.subscribe("stock_movements", lambda events: self.revalue(), widget=self)
+        self.revalue()
+
+    def revalue(self):
+        self.revaluer.request()
 
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        query = "SELECT id, sku, name, price, stock_quantity FROM items"
-        rows = self.db.execute_query(query)
-        for row in rows:
-            r = list(row)
-            try:
-                val = r[3] * r[4]
-            except: val = 0
-            self.tree.insert("", "end", values=(r[0], r[1], r[2], f"₹ {r[3]}", r[4], f"₹ {val:.2f}"))
+        self.revalue()
+        self.list.reload(keep_position=True)
+
+    def format_row(self, r):
+        return (r[0], r[1], r[2], f"₹ {r[3]}", r[4], f"₹ {r[5] or 0:.2f}")
 
     def delete_item(self):
         sel = self.tree.selection()
@@ -97,12 +193,60 @@ class StockListFrame(ttk.Frame):
         if not messagebox.askyesno("Confirm", "Delete selected item? This cannot be undone."):
             return
             
-        try:
-            item_id = self.tree.item(sel[0], "values")[0]
-            self.db.execute_query("DELETE FROM items WHERE id=?", (item_id,), commit=True)
-            self.refresh_data()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed: {e}")
+        item_id = self.tree.item(sel[0], "values")[0]
+        self.db.submit_query("DELETE FROM items WHERE id=?", (item_id,), commit=True, widget=self,
+                             on_error=lambda e: messagebox.showerror("Error", f"Failed: {e}"))
+
+class ReorderFrame(ttk.Frame):
+    """Items below their reorder level, read from the trigger-maintained low-stock set."""
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+
+        tool_frame = ttk.Frame(self)
+        tool_frame.pack(fill="x", pady=5)
+        self.po_button = ttk.Button(tool_frame, text="🧾 Suggest Purchase Orders", command=self.suggest_orders)
+        self.po_button.pack(side="right", padx=5)
+        self.count_label = ttk.Label(tool_frame, text="")
+        self.count_label.pack(side="left", padx=5)
+
+        headings = (("id", "ID"), ("sku", "SKU"), ("name", "Item Name"), ("supplier", "Supplier"),
+                    ("stock", "Stock Qty"), ("level", "Reorder Level"), ("since", "Low Since"))
+        self.list = VirtualTreeview(self, self.db, SqlRowSource(self.db, **REORDER_LIST_SOURCE), headings,
+                                    self.format_row, watch=("low_stock_items",), sortable=("id", "stock"),
+                                    on_count=lambda n: self.count_label.configure(text=f"{n:,} items to reorder"))
+        self.list.tree.column("id", width=50)
+        self.list.pack(fill="both", expand=True)
+
+    def format_row(self, r):
+        return (r[0], r[1], r[2], r[3] or "-", f"{r[4]:g}", f"{r[5]:g}", r[6])
+
+    def suggest_orders(self):
+        output_dir = filedialog.askdirectory(title="Folder for the purchase orders")
+        if not output_dir: return
+
+        self.po_button.configure(state="disabled")
+        self.db.submit(self.write_orders, output_dir, widget=self, on_done=self.on_orders_written,
+                       on_error=self.on_orders_failed)
+
+    def write_orders(self, output_dir):
+        orders = suggest_purchase_orders(self.db)
+        return orders, write_purchase_orders(orders, output_dir)
+
+    def on_orders_written(self, result):
+        self.po_button.configure(state="normal")
+        orders, paths = result
+        if not orders:
+            messagebox.showinfo("Reorder", "Nothing to reorder.")
+            return
+        lines = sum(len(order['lines']) for order in orders)
+        total = sum(order['total'] for order in orders)
+        messagebox.showinfo("Reorder", f"{len(orders)} purchase orders ({lines:,} lines, ₹ {total:,.2f}) "
+                                       f"written to {os.path.dirname(paths[0])}")
+
+    def on_orders_failed(self, exc):
+        self.po_button.configure(state="normal")
+        messagebox.showerror("Error", f"Could not write purchase orders: {exc}")
 
 class AddItemFrame(ttk.Frame):
     def __init__(self, parent, db, on_save):
@@ -133,16 +277,70 @@ class AddItemFrame(ttk.Frame):
         self.tax = ttk.Entry(form)
         self.tax.grid(row=2, column=1, padx=5, pady=5)
         self.tax.insert(0, "18.0")
+
+        ttk.Label(form, text="Reorder Level:").grid(row=2, column=2, padx=5, pady=5)
+        self.reorder_level = ttk.Entry(form)
+        self.reorder_level.grid(row=2, column=3, padx=5, pady=5)
+        self.reorder_level.insert(0, f"{DEFAULT_REORDER_LEVEL:g}")
         
         ttk.Button(self, text="Save Item", command=self.save).pack(pady=20)
 
     def save(self):
         try:
-            self.db.execute_query(
-                "INSERT INTO items (name, sku, price, stock_quantity, tax_rate) VALUES (?, ?, ?, ?, ?)",
-                (self.name.get(), self.sku.get(), float(self.price.get()), float(self.stock.get()), float(self.tax.get())),
-                commit=True
+            self.db.submit_query(
+                "INSERT INTO items (name, sku, price, stock_quantity, tax_rate, reorder_level) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.name.get(), normalize_code(self.sku.get()) or None, float(self.price.get()),
+                 float(self.stock.get()), float(self.tax.get()), float(self.reorder_level.get())),
+                commit=True, widget=self, on_done=lambda _: self.on_save(),
+                on_error=lambda e: messagebox.showerror("Error", str(e))
             )
-            val = self.on_save()
         except Exception as e:
             messagebox.showerror("Error", str(e))
+
+class ReceiveStockFrame(ttk.Frame):
+    def __init__(self, parent, db, on_save):
+        super().__init__(parent)
+        self.db = db
+        self.on_save = on_save
+
+        form = ttk.LabelFrame(self, text="Purchase Receipt")
+        form.pack(fill="x", padx=20, pady=20)
+
+        ttk.Label(form, text="SKU Code:").grid(row=0, column=0, padx=5, pady=5)
+        self.sku = ttk.Entry(form)
+        self.sku.grid(row=0, column=1, padx=5, pady=5)
+
+        ttk.Label(form, text="Date (YYYY-MM-DD):").grid(row=0, column=2, padx=5, pady=5)
+        self.date = ttk.Entry(form)
+        self.date.grid(row=0, column=3, padx=5, pady=5)
+        self.date.insert(0, date.today().isoformat())
+
+        ttk.Label(form, text="Quantity:").grid(row=1, column=0, padx=5, pady=5)
+        self.qty = ttk.Entry(form)
+        self.qty.grid(row=1, column=1, padx=5, pady=5)
+
+        ttk.Label(form, text="Unit Cost:").grid(row=1, column=2, padx=5, pady=5)
+        self.cost = ttk.Entry(form)
+        self.cost.grid(row=1, column=3, padx=5, pady=5)
+
+        ttk.Label(form, text="Note:").grid(row=2, column=0, padx=5, pady=5)
+        self.note = ttk.Entry(form)
+        self.note.grid(row=2, column=1, columnspan=3, sticky="ew", padx=5, pady=5)
+
+        ttk.Button(self, text="Receive", command=self.save).pack(pady=20)
+
+    def save(self):
+        try:
+            args = (normalize_code(self.sku.get()), float(self.qty.get()), float(self.cost.get()),
+                    date.fromisoformat(self.date.get().strip()).isoformat(), self.note.get().strip() or None)
+            self.db.submit(self.receive, *args, widget=self, on_done=lambda _: self.on_save(),
+                           on_error=lambda e: messagebox.showerror("Error", str(e)))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def receive(self, sku, quantity, unit_cost, day, note):
+        rows = self.db.execute_query("SELECT id FROM items WHERE sku = ?", (sku,))
+        if not rows:
+            raise ValueError(f"No item with SKU '{sku}'")
+        return receive_purchase(self.db, rows[0][0], quantity, unit_cost, day, note)
@@ -0,0 +1,35 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.db_manager import DBManager
+from modules.inventory.ledger import balance_mismatches, last_month_end, take_snapshot
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot every item's stock at a period end")
+    parser.add_argument("--db", default="biz_app.db")
+    parser.add_argument("--as-of", help="YYYY-MM-DD, inclusive (default: the last month end)")
+    parser.add_argument("--verify", action="store_true",
+                        help="also check items.stock_quantity against the full movement ledger")
+    args = parser.parse_args(argv)
+
+    db = DBManager(db_path=args.db, slow_query_ms=None)
+    try:
+        as_of = args.as_of or last_month_end()
+        count = take_snapshot(db, as_of)
+        print(f"Snapshot of {count:,} items as of {as_of}.")
+        mismatches = balance_mismatches(db) if args.verify else []
+    finally:
+        db.close()
+
+    for item_id, balance, ledger in mismatches:
+        print(f"  item {item_id}: stock_quantity {balance} but movements sum to {ledger}")
+    if args.verify:
+        print(f"{len(mismatches):,} items out of balance." if mismatches else "All balances match the ledger.")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from db.db_manager import DBManager
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh database at the latest migration. Test files seed it by overriding db(db)."""
+    db = DBManager(db_path=str(tmp_path / "test.db"))
+    yield db
+    db.close()
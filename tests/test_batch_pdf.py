@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from reportlab import rl_config
+from modules.billing import batch_pdf
+from modules.billing.batch_pdf import fetch_batch, render_batch
+from modules.billing.filters import compile_invoice_filter
+from modules.billing.posting import post_invoice
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name", "phone"), [("Acme", "111"), ("Zen", None)])
+    db.bulk_insert("items", ("name", "price", "stock_quantity", "tax_rate"),
+                   [("Bolt", 118.0, 1000, 18.0), ("Rice", 105.0, 1000, 5.0)])
+    for day in range(1, 6):
+        party = 1 if day % 2 else 2
+        post_invoice(db, {'party_id': party, 'date': f'2026-05-0{day}', 'total_amount': 118.0 + 105.0 * day},
+                     [{'id': 1, 'qty': 1, 'rate': 118.0, 'total': 118.0},
+                      {'id': 2, 'qty': day, 'rate': 105.0, 'total': 105.0 * day}])
+    return db
+
+def test_fetch_batch_applies_the_list_filter(db):
+    batch = fetch_batch(db, *compile_invoice_filter(party="acme", date_from="2026-05-02"))
+    assert [(inv['party_name'], inv['party_phone'], inv['date']) for inv, _ in batch] == \
+        [("Acme", "111", "2026-05-03"), ("Acme", "111", "2026-05-05")]
+    assert [(line['name'], line['qty'], line['tax_rate']) for line in batch[0][1]] == \
+        [("Bolt", 1, 18.0), ("Rice", 3, 5.0)]
+    assert len(fetch_batch(db)) == 5 and fetch_batch(db)[1][0]['party_phone'] == "N/A"
+
+def test_render_batch_writes_every_invoice_and_can_stop(db, tmp_path, monkeypatch):
+    batch = fetch_batch(db)
+    reports = []
+    result = render_batch(batch, str(tmp_path / "out"), workers=2, progress=lambda *p: reports.append(p))
+    assert len(result['paths']) == 5 and all(os.path.getsize(p) > 0 for p in result['paths'])
+    assert reports[-1] == (5, 5) and not result['cancelled']
+    assert os.path.basename(result['paths'][0]).startswith("INV-") # '/' in series numbers
+    with open(result['paths'][0], "rb") as f:
+        pdf = f.read()
+    assert b"/FlateDecode" in pdf # compressed, set per canvas
+    assert rl_config.useA85 # ReportLab's global defaults are left alone
+
+    monkeypatch.setattr(batch_pdf, "RENDER_CHUNK", 1)
+    result = render_batch(batch, str(tmp_path / "stopped"), workers=1, should_stop=lambda: True)
+    assert result['cancelled'] and len(result['paths']) < 5
+
+    if not batch_pdf.can_merge():
+        with pytest.raises(RuntimeError):
+            render_batch(batch, str(tmp_path / "merged"), merge_path=str(tmp_path / "all.pdf"))
@@ -0,0 +1,35 @@
+from benchmarks.run import compare, run, table_counts
+from benchmarks.seed import seed
+from db.db_manager import DBManager
+
+def test_seed_and_run_tiny_scale(tmp_path):
+    db = DBManager(db_path=str(tmp_path / "bench.db"), slow_query_ms=None)
+    try:
+        seed(db, parties=20, items=50, invoices=200, invoice_items=1000, documents=10, employees=5,
+             batch_size=64, progress=lambda msg: None)
+        assert table_counts(db) == {'parties': 20, 'items': 50, 'invoices': 200, 'invoice_items': 1000,
+                                    'documents': 10, 'employees': 5}
+        # Headers agree with their lines
+        mismatched = db.execute_query("""
+            SELECT COUNT(*) FROM invoices i
+            WHERE ABS(i.total_amount - (SELECT SUM(total) FROM invoice_items WHERE invoice_id = i.id)) > 0.01
+        """)[0][0]
+        assert mismatched == 0
+
+        results = run(db, repeat=1, pdf_invoices=2, progress=lambda msg: None)
+        assert results['invoice_list']['rows'] == 200
+        assert results['invoice_list_scroll']['rows'] == 200
+        assert results['pdf_generate_invoice']['invoices'] == 2 and results['pdf_batch']['invoices'] == 2
+        assert results['pdf_salary_slip']['documents'] == 2
+        assert results['pos_load_items']['items'] == 50 and results['pos_scan']['scans'] == 1000
+        assert results['stock_as_of']['items'] == 50 and 0 < results['stock_valuation']['items'] <= 50
+        assert results['reorder_suggestions']['lines'] == db.execute_query("SELECT COUNT(*) FROM low_stock_items")[0][0]
+        assert {'dashboard_kpis', 'analytics_top_products_annual', 'export_invoices_csv'} <= set(results)
+    finally:
+        db.close()
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'benchmarks': {'fast': {'median_ms': 1.0}, 'slow': {'median_ms': 100.0}}}
+    results = {'fast': {'median_ms': 1.5}, 'slow': {'median_ms': 150.0}, 'new': {'median_ms': 5.0}}
+    _, regressions = compare(results, baseline, tolerance=0.2, min_delta_ms=2.0)
+    assert regressions == ['slow'] # 'fast' is +50% but within the noise floor
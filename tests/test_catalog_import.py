@@ -0,0 +1,55 @@
+import csv
+import sqlite3
+import pytest
+from modules.inventory import catalog
+from modules.inventory.catalog import import_catalog
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("items", ("name", "sku", "price", "stock_quantity", "tax_rate"),
+                   [("Bolt", "BOLT", 10.0, 5, 18.0), ("Nut", "NUT", 2.0, 0, 18.0)])
+    return db
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+def test_catalog_upserts_by_sku(db, tmp_path):
+    path = write_csv(tmp_path / "cat.csv", ["SKU", "Name", "Price", "Tax_Rate", "Opening_Stock"], [
+        (" bolt ", "", "12.5", "", "99"), # known: new price only, stock left alone
+        ("NUT", "Nut", "2.0", "18", ""), # nothing changes
+        ("washer", "Washer", "", "12", "40"),
+        ("SPRING", "", "3", "", ""),
+        ("", "No SKU", "1", "", ""),
+        ("PIN", "Pin", "abc", "", ""),
+    ])
+    reports = []
+    result = catalog.CatalogImporter(db, chunk_rows=2).run(path, progress=reports.append)
+    assert {k: result[k] for k in ("rows", "inserted", "updated", "unchanged", "rejected")} == \
+        {'rows': 6, 'inserted': 1, 'updated': 1, 'unchanged': 1, 'rejected': 3}
+    assert reports[-1] == result
+
+    items = db.execute_query("SELECT sku, name, price, stock_quantity, tax_rate, unit FROM items ORDER BY id")
+    assert [tuple(r) for r in items] == [("BOLT", "Bolt", 12.5, 5, 18.0, "pcs"), ("NUT", "Nut", 2.0, 0, 18.0, "pcs"),
+                                         ("WASHER", "Washer", 0.0, 40, 12.0, "pcs")]
+    assert db.execute_query("SELECT m.quantity FROM stock_movements m JOIN items i ON m.item_id = i.id "
+                            "WHERE m.kind = 'opening' AND i.sku = 'WASHER'")[0][0] == 40
+    with open(result['rejects_path'], newline="") as f:
+        errors = [row['error'] for row in csv.DictReader(f)]
+    assert errors == ["new SKU SPRING needs a name", "missing SKU", "price 'abc' is not a number"]
+
+def test_only_changed_items_raise_change_events(db, tmp_path):
+    events = []
+    db.subscribe("items", events.extend)
+    import_catalog(db, write_csv(tmp_path / "cat.csv", ["sku", "price"], [("BOLT", "10"), ("NUT", "3")]))
+    assert [(e.op, e.rowids) for e in events] == [("update", (2,))]
+
+def test_skus_are_unique(db, tmp_path):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.bulk_insert("items", ("name", "sku"), [("Another bolt", "BOLT")])
+    if not catalog.can_read_xlsx():
+        with pytest.raises(RuntimeError):
+            import_catalog(db, str(tmp_path / "cat.xlsx"))
@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+import pytest
+
+from db.db_manager import DBManager
+
+def test_submit_query_runs_off_caller_thread(db):
+    db.submit_query("INSERT INTO parties (name, phone) VALUES (?, ?)", ("Acme", "123"), commit=True)
+    rows = db.submit_query("SELECT name, phone FROM parties").result(timeout=5)
+    assert [tuple(r) for r in rows] == [("Acme", "123")]
+
+    # The write made on the worker is visible to the caller's own connection
+    assert db.execute_query("SELECT COUNT(*) FROM parties")[0][0] == 1
+
+def test_submit_propagates_errors(db):
+    future = db.submit_query("SELECT * FROM no_such_table")
+    assert future.exception(timeout=5) is not None
+
+def test_long_jobs_do_not_hold_up_the_worker(db):
+    release = threading.Event()
+    def long_job():
+        release.wait(5)
+        return db.execute_query("SELECT COUNT(*) FROM parties")[0][0]
+    job = db.submit_long(long_job)
+    db.submit_query("INSERT INTO parties (name) VALUES ('Acme')", commit=True).result(timeout=5)
+    assert not job.done() # the worker ran the insert while the long job was still going
+    release.set()
+    assert job.result(timeout=5) == 1
+    assert db.submit_long(lambda: 1 / 0).exception(timeout=5) is not None
+
+def test_wal_and_concurrent_readers(db):
+    assert db.execute_query("PRAGMA journal_mode")[0][0] == "wal"
+
+    errors = []
+    def reader():
+        try:
+            with db.read_connection() as conn:
+                for _ in range(50):
+                    conn.execute("SELECT COUNT(*) FROM parties").fetchone()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    # Writer keeps going while readers hold their own connections
+    with db.write_connection() as conn:
+        conn.executemany("INSERT INTO parties (name) VALUES (?)", [(f"P{i}",) for i in range(100)])
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert db.execute_query("SELECT COUNT(*) FROM parties")[0][0] == 100
+
+def test_reader_pool_is_bounded(tmp_path):
+    db = DBManager(db_path=str(tmp_path / "bounded.db"), busy_timeout=100, max_readers=1)
+    try:
+        db.get_connection() # Main thread holds the only slot
+        result = []
+        t = threading.Thread(target=lambda: result.append(pytest.raises(sqlite3.OperationalError, db.get_connection)))
+        t.start()
+        t.join()
+        assert result
+
+        db.release_connection()
+        with db.read_connection() as conn:
+            assert conn.execute("SELECT 1").fetchone()[0] == 1
+    finally:
+        db.close()
+
+def test_query_stats_and_slow_log(tmp_path, caplog):
+    db = DBManager(db_path=str(tmp_path / "stats.db"), slow_query_ms=0)
+    try:
+        db.execute_query("INSERT INTO parties (name) VALUES (?)", ("Acme",), commit=True)
+        with caplog.at_level("WARNING", logger="bizapp.slow_queries"):
+            db.execute_query("SELECT id, name FROM parties WHERE name = ?", ("Acme",))
+            db.submit_query("SELECT COUNT(*) FROM parties").result(timeout=5)
+
+        summary = {s['sql']: s for s in db.stats.summary()}
+        select = summary["SELECT id, name FROM parties WHERE name = ?"]
+        assert select['count'] == 1 and select['rows'] == 1
+        assert sum(select['histogram'].values()) == 1
+        assert select['callers'] == {"test_db_manager.test_query_stats_and_slow_log": 1}
+
+        # Worker queries are attributed to the code that submitted them
+        assert "test_db_manager.test_query_stats_and_slow_log" in summary["SELECT COUNT(*) FROM parties"]['callers']
+
+        assert any("idx_parties_name" in r.getMessage() for r in caplog.records)
+        assert "SELECT id, name FROM parties" in db.stats.format_summary(limit=len(summary))
+    finally:
+        db.close()
+
+def test_iter_query_streams_in_batches(db):
+    with db.write_connection() as conn:
+        conn.executemany("INSERT INTO parties (name) VALUES (?)", [(f"P{i:04d}",) for i in range(2500)])
+
+    rows = db.iter_query("SELECT name FROM parties ORDER BY name", batch_size=1000)
+    assert next(rows)[0] == "P0000"
+    assert [r[0] for r in rows] == [f"P{i:04d}" for i in range(1, 2500)]
+
+    stats = {s['sql']: s for s in db.stats.summary()}["SELECT name FROM parties ORDER BY name"]
+    assert stats['rows'] == 2500
+
+def test_transaction_commits_once_and_rolls_back(db):
+    with db.transaction():
+        db.bulk_insert("parties", ("name", "phone"), [(f"P{i}", "1") for i in range(10)])
+        db.execute_query("INSERT INTO parties (name) VALUES ('Solo')", commit=True)
+        # Not visible to readers until the outer block commits
+        assert db.execute_query("SELECT COUNT(*) FROM parties")[0][0] == 0
+    assert db.execute_query("SELECT COUNT(*) FROM parties")[0][0] == 11
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.bulk_update("parties", "phone = ?", [("2", 1), ("2", 2)])
+            raise RuntimeError("abort")
+    assert db.execute_query("SELECT COUNT(*) FROM parties WHERE phone = '2'")[0][0] == 0
+
+    # A failing nested block only undoes its own savepoint
+    with db.transaction():
+        db.bulk_update("parties", "phone = ?", [("3", 1)])
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction():
+                db.bulk_update("parties", "phone = ?", [("4", 2)])
+                db.bulk_insert("parties", ("id", "name"), [(1, "Duplicate id")])
+    rows = db.execute_query("SELECT id, phone FROM parties WHERE id IN (1, 2) ORDER BY id")
+    assert [tuple(r) for r in rows] == [(1, "3"), (2, "1")]
+
+def test_master_data_cache_invalidates_on_write(db):
+    sql = "SELECT id, name FROM parties"
+    assert db.execute_query(sql, cached=True) == []
+    db.execute_query("INSERT INTO parties (name) VALUES ('Acme')", commit=True)
+    assert [r[1] for r in db.execute_query(sql, cached=True)] == ["Acme"]
+
+    hits = db.cache.hits
+    db.execute_query(sql, cached=True)
+    assert db.cache.hits == hits + 1
+
+    # Writes to other tables leave the entry alone; a rolled back write does too
+    db.execute_query("INSERT INTO items (name) VALUES ('Widget')", commit=True)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.execute_query("DELETE FROM parties", commit=True)
+            raise RuntimeError("abort")
+    db.execute_query(sql, cached=True)
+    assert db.cache.hits == hits + 2
+
+    with db.transaction():
+        db.bulk_update("parties", "name = ?", [("Acme Ltd", 1)])
+    assert [r[1] for r in db.execute_query(sql, cached=True)] == ["Acme Ltd"]
+
+def test_cache_is_bounded():
+    from db.cache import QueryCache
+    cache = QueryCache(max_entries=2)
+    for i in range(3):
+        cache.put(f"SELECT {i} FROM parties", (), cache.versions({"parties"}), [i])
+    assert cache.get("SELECT 0 FROM parties", ()) is None
+    assert cache.get("SELECT 2 FROM parties", ()) == [2]
+
+def test_change_events_follow_commits(db):
+    from db.changes import MAX_EVENT_ROWIDS
+    received = []
+    db.subscribe(("items",), received.append)
+
+    db.execute_query("INSERT INTO items (name) VALUES ('Widget')", commit=True)
+    db.execute_query("INSERT INTO parties (name) VALUES ('Acme')", commit=True) # not subscribed
+    with db.transaction():
+        db.execute_query("UPDATE items SET price = 5 WHERE id = 1", commit=True)
+        db.execute_query("INSERT INTO items (name) VALUES ('Gadget')", commit=True)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.execute_query("DELETE FROM items", commit=True)
+            raise RuntimeError("abort")
+    db.bulk_insert("items", ("name",), [(f"Bulk {i}",) for i in range(MAX_EVENT_ROWIDS + 1)])
+
+    assert [[tuple(e) for e in events] for events in received] == [
+        [("items", "insert", (1,))],
+        [("items", "update", (1,)), ("items", "insert", (2,))],
+        [("items", "insert", None)], # too many rows to list
+    ]
@@ -0,0 +1,62 @@
+import pytest
+from modules.billing.gst import backfill, hsn_summary, is_inter_state, round2, split_line
+from modules.billing.posting import post_invoice
+
+def test_split_line_adds_up():
+    assert split_line(118.0, 18.0, False) == (100.0, 18.0, 18.0, 9.0, 9.0, 0.0)
+    assert split_line(118.0, 18.0, True) == (100.0, 18.0, 18.0, 0.0, 0.0, 18.0)
+    assert split_line(50.0, None, False) == (50.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    for total in (0.01, 0.03, 99.99, 1234.57, 10.05):
+        for rate in (0.0, 5.0, 12.0, 18.0, 28.0):
+            taxable, _, tax, cgst, sgst, _ = split_line(total, rate, False)
+            assert round2(taxable + tax) == total and round2(cgst + sgst) == tax
+
+def test_rounding_is_half_up():
+    assert round2(2.675) == 2.68 and round2(0.125) == 0.13 and round2(-0.125) == -0.13
+
+def test_inter_state_needs_both_states():
+    assert is_inter_state("29AAAAA0000A1Z5", "27AAACA1234A1Z5")
+    assert not is_inter_state("29AAAAA0000A1Z5", "29BBBBB1111B1Z5")
+    assert not is_inter_state(None, None) # unregistered buyer in the default company's state
+    assert is_inter_state(None, "07AAACA1234A1Z5")
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name", "gstin"), [("Local", "29LOCAL0000A1Z5"), ("Delhi", "07DELHI0000A1Z5")])
+    db.bulk_insert("items", ("name", "price", "stock_quantity", "tax_rate", "hsn_code"),
+                   [("Bolt", 118.0, 100, 18.0, "7318"), ("Rice", 105.0, 100, 5.0, "1006")])
+    return db
+
+LINES = [{'id': 1, 'qty': 2, 'rate': 118.0, 'total': 236.0}, {'id': 2, 'qty': 1, 'rate': 105.0, 'total': 105.0}]
+
+def test_posting_stores_line_and_header_tax(db):
+    inv_id, _ = post_invoice(db, {'party_id': 1, 'date': '2026-05-01', 'total_amount': 341.0}, LINES)
+    lines = db.execute_query("SELECT hsn_code, taxable_value, tax_amount, cgst, sgst, igst FROM invoice_items "
+                             "WHERE invoice_id = ? ORDER BY id", (inv_id,))
+    assert [tuple(r) for r in lines] == [("7318", 200.0, 36.0, 18.0, 18.0, 0.0), ("1006", 100.0, 5.0, 2.5, 2.5, 0.0)]
+    header = db.execute_query("SELECT taxable_value, cgst, sgst, igst FROM invoices WHERE id = ?", (inv_id,))[0]
+    assert tuple(header) == (300.0, 20.5, 20.5, 0.0)
+
+    inv_id, _ = post_invoice(db, {'party_id': 2, 'date': '2026-05-02', 'total_amount': 341.0}, LINES)
+    header = db.execute_query("SELECT taxable_value, cgst, sgst, igst FROM invoices WHERE id = ?", (inv_id,))[0]
+    assert tuple(header) == (300.0, 0.0, 0.0, 41.0)
+
+    summary = {r[0]: tuple(r[1:]) for r in hsn_summary(db, "2026-05-01", "2026-05-31")}
+    assert summary["7318"] == (18.0, 4.0, 400.0, 18.0, 18.0, 36.0, 472.0)
+
+def test_backfill_matches_posting(db):
+    inv_id, _ = post_invoice(db, {'party_id': 2, 'date': '2026-05-01', 'total_amount': 341.0}, LINES)
+    posted = db.execute_query("SELECT taxable_value, tax_rate, tax_amount, cgst, sgst, igst, hsn_code "
+                              "FROM invoice_items ORDER BY id")
+    header = tuple(db.execute_query("SELECT taxable_value, cgst, sgst, igst FROM invoices")[0])
+
+    # Forget the figures, as for invoices posted before the engine existed
+    db.execute_query("UPDATE invoice_items SET taxable_value = NULL, tax_rate = NULL, tax_amount = NULL, cgst = NULL, "
+                     "sgst = NULL, igst = NULL, hsn_code = NULL", commit=True)
+    db.execute_query("UPDATE invoices SET taxable_value = NULL, cgst = NULL, sgst = NULL, igst = NULL", commit=True)
+
+    assert backfill(db, batch_size=1) == 2
+    assert db.execute_query("SELECT taxable_value, tax_rate, tax_amount, cgst, sgst, igst, hsn_code "
+                            "FROM invoice_items ORDER BY id") == posted
+    assert tuple(db.execute_query("SELECT taxable_value, cgst, sgst, igst FROM invoices")[0]) == header
+    assert backfill(db) == 0
@@ -0,0 +1,50 @@
+import pytest
+from core.virtual_tree import SqlRowSource
+from modules.billing.filters import compile_invoice_filter, prefix_range
+from modules.billing.view import INVOICE_LIST_SOURCE
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name",), [("Acme Traders",), ("Bharat 100% Steel",), ("Zed",)])
+    db.bulk_insert("invoices", ("invoice_number", "party_id", "date", "total_amount", "status"), [
+        ("INV-001", 1, "2026-01-05", 100.0, "final"),
+        ("INV-002", 2, "2026-02-10", 2500.0, "paid"),
+        ("INV-010", 1, "2026-02-28", 999.5, "draft"),
+        ("INW-001", 3, "2026-03-01", 50.0, "final"),
+    ])
+    return db
+
+def numbers(db, **fields):
+    where, params = compile_invoice_filter(**fields)
+    source = SqlRowSource(db, where=where, params=params, **INVOICE_LIST_SOURCE)
+    rows = source.page(0, 100)
+    assert source.count() == len(rows)
+    return sorted(r[1] for r in rows)
+
+def test_each_field_filters(db):
+    assert numbers(db) == ["INV-001", "INV-002", "INV-010", "INW-001"]
+    assert numbers(db, number_prefix="INV-0") == ["INV-001", "INV-002", "INV-010"]
+    assert numbers(db, number_prefix=" INV-01 ") == ["INV-010"]
+    assert numbers(db, number_prefix="inv-0") == ["INV-001", "INV-002", "INV-010"]
+    assert numbers(db, number_prefix="iNw") == ["INW-001"]
+    assert numbers(db, party="acme") == ["INV-001", "INV-010"]
+    assert numbers(db, party="100%") == ["INV-002"] # LIKE wildcards are literal
+    assert numbers(db, status="Final") == ["INV-001", "INW-001"]
+    assert numbers(db, date_from="2026-02-01", date_to="2026-02-28") == ["INV-002", "INV-010"]
+    assert numbers(db, min_amount="100", max_amount="1000") == ["INV-001", "INV-010"]
+    assert numbers(db, party="acme", status="draft") == ["INV-010"]
+
+def test_bad_input_is_reported():
+    with pytest.raises(ValueError, match="From date"):
+        compile_invoice_filter(date_from="05/01/2026")
+    with pytest.raises(ValueError, match="Max amount"):
+        compile_invoice_filter(max_amount="lots")
+    with pytest.raises(ValueError, match="status"):
+        compile_invoice_filter(status="void")
+
+def test_prefix_range():
+    low, high = prefix_range("INV-9")
+    assert low <= "INV-9" < high and low <= "INV-99999" < high
+    assert not (low <= "INV-A" < high)
+    assert prefix_range("Inv-9", nocase=True) == ("inv-9", "inv-:")
+    assert prefix_range("X@", nocase=True) == ("x@", "x[") # NOCASE puts "[" right after "@"
@@ -0,0 +1,84 @@
+import csv
+import json
+import pytest
+from modules.billing.importer import import_invoices
+from modules.billing.posting import post_invoice
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name", "gstin"), [("Local", "29LOCAL0000A1Z5"), ("Delhi", "07DELHI0000A1Z5")])
+    db.bulk_insert("items", ("name", "sku", "price", "stock_quantity", "tax_rate", "hsn_code"),
+                   [("Bolt", "BOLT", 118.0, 100, 18.0, "7318"), ("Rice", "RICE", 105.0, 100, 5.0, "1006")])
+    return db
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["invoice_number", "date", "party_gstin", "party_name", "sku", "qty", "rate"])
+        writer.writerows(rows)
+    return str(path)
+
+def test_csv_import_writes_invoices_stock_and_tax(db, tmp_path):
+    path = write_csv(tmp_path / "in.csv", [
+        ("A-1", "2026-05-01", "29LOCAL0000A1Z5", "", "bolt", 2, 118.0),
+        ("A-1", "2026-05-01", "29LOCAL0000A1Z5", "", "RICE", 1, 105.0),
+        ("A-2", "2026-05-02", "", "Delhi", "BOLT", 1, 118.0),
+        ("", "2026-05-03", "", "", "RICE", 3, 105.0),
+    ])
+    reports = []
+    result = import_invoices(db, path, progress=reports.append)
+    assert (result['invoices'], result['lines'], result['rejected_rows']) == (3, 4, 0)
+    assert result['rejects_path'] is None and reports[-1] == result
+
+    headers = db.execute_query("SELECT invoice_number, total_amount, taxable_value, cgst, sgst, igst "
+                               "FROM invoices ORDER BY id")
+    assert [tuple(h) for h in headers[:2]] == [("A-1", 341.0, 300.0, 20.5, 20.5, 0.0),
+                                               ("A-2", 118.0, 100.0, 0.0, 0.0, 18.0)]
+    assert headers[2][0].startswith("INV/") # no number in the file: allocated from the series
+    stock = db.execute_query("SELECT stock_quantity, version FROM items ORDER BY id")
+    assert [tuple(r) for r in stock] == [(97, 2), (96, 2)] # one sale movement per invoice and item
+
+def test_bad_invoices_are_rejected_whole(db, tmp_path):
+    post_invoice(db, {'number': 'TAKEN', 'party_id': 1, 'date': '2026-05-01', 'total_amount': 118.0},
+                 [{'id': 1, 'qty': 1, 'rate': 118.0, 'total': 118.0}])
+    path = write_csv(tmp_path / "in.csv", [
+        ("B-1", "2026-05-01", "", "Local", "BOLT", 1, 118.0),
+        ("B-1", "2026-05-01", "", "Local", "NOPE", 1, 10.0),
+        ("B-2", "01/05/2026", "", "Local", "BOLT", 1, 118.0),
+        ("TAKEN", "2026-05-01", "", "Local", "BOLT", 1, 118.0),
+        ("B-3", "2026-05-01", "", "Local", "RICE", 1, 105.0),
+    ])
+    result = import_invoices(db, path)
+    assert (result['invoices'], result['rejected_invoices'], result['rejected_rows']) == (1, 3, 4)
+    with open(result['rejects_path'], newline="") as f:
+        errors = [(row['invoice_number'], row['error']) for row in csv.DictReader(f)]
+    assert errors[0] == ("B-1", "unknown SKU 'NOPE'") and errors[1][0] == "B-1"
+    assert "YYYY-MM-DD" in errors[2][1] and "already exists" in errors[3][1]
+    assert db.execute_query("SELECT COUNT(*) FROM invoice_items")[0][0] == 2 # TAKEN's line and B-3's
+
+def test_jsonl_import_with_nested_lines_and_bad_json(db, tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"invoice_number": "J-1", "date": "2026-05-01", "party_name": "Local",
+                    "lines": [{"sku": "BOLT", "qty": 1, "rate": 118.0}, {"sku": "RICE", "qty": 2, "rate": 105.0}]}),
+        "{not json",
+        "[1, 2]",
+        json.dumps({"invoice_number": "J-3", "date": "2026-05-01", "lines": ["BOLT"]}),
+        json.dumps({"invoice_number": "J-2", "date": "2026-05-01", "sku": "RICE", "qty": 1, "rate": 105.0}),
+    ]))
+    result = import_invoices(db, str(path), update_stock=False)
+    assert (result['invoices'], result['lines'], result['rejected_rows']) == (2, 3, 3)
+    assert db.execute_query("SELECT SUM(stock_quantity) FROM items")[0][0] == 200
+    with open(result['rejects_path']) as f:
+        rejects = [json.loads(line) for line in f]
+    assert [r['raw'] for r in rejects[:2]] == ["{not json", "[1, 2]"]
+    assert rejects[2]['error'] == "Not an invoice object"
+
+def test_only_final_invoices_move_stock(db, tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("invoice_number,date,party_name,sku,qty,rate,status\n"
+                    "S-1,2026-05-01,Local,BOLT,5,118,final\nS-2,2026-05-01,Local,BOLT,7,118,draft\n"
+                    "S-3,2026-05-01,Local,BOLT,11,118,cancelled\n")
+    assert import_invoices(db, str(path))['invoices'] == 3
+    assert db.execute_query("SELECT stock_quantity FROM items WHERE sku = 'BOLT'")[0][0] == 95
+    assert db.execute_query("SELECT COUNT(*) FROM stock_movements WHERE kind = 'sale'")[0][0] == 1
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+from benchmarks.concurrent_posting import run_stress
+from db.db_manager import DBManager
+from db.migrations import MIGRATIONS
+from modules.billing.numbering import allocate_invoice_number, fiscal_year, parse_number
+from modules.billing.posting import post_invoice
+
+@pytest.fixture
+def db(db):
+    db.execute_query("INSERT INTO parties (name) VALUES ('Acme')", commit=True)
+    db.execute_query("INSERT INTO items (name, price, stock_quantity) VALUES ('Widget', 10, 100)", commit=True)
+    return db
+
+LINES = [{'id': 1, 'qty': 1, 'rate': 10.0, 'total': 10.0}]
+
+def post(db, **invoice):
+    return post_invoice(db, dict({'party_id': 1, 'date': '2026-05-01', 'total_amount': 10.0}, **invoice), LINES)[1]
+
+def test_fiscal_year():
+    assert fiscal_year("2026-03-31") == "2025-26"
+    assert fiscal_year("2026-04-01") == "2026-27"
+    assert fiscal_year("1999-12-01") == "1999-00"
+
+def test_numbers_follow_series_year_and_company(db):
+    assert post(db) == "INV/2026-27/00001"
+    assert post(db) == "INV/2026-27/00002"
+    assert post(db, series="POS") == "POS/2026-27/00001"
+    assert post(db, date="2027-04-02") == "INV/2027-28/00001"
+    assert post(db, company_id=2, series="B2") == "2-B2/2026-27/00001"
+    assert post(db, number="MANUAL-7") == "MANUAL-7"
+    assert post(db) == "INV/2026-27/00003"
+
+def test_failed_posting_leaves_no_gap(db):
+    post(db)
+    with pytest.raises(sqlite3.IntegrityError):
+        post(db, number="INV/2026-27/00001") # duplicates are refused by the unique index
+    with pytest.raises(KeyError):
+        post_invoice(db, {'party_id': 1, 'date': '2026-05-01', 'total_amount': 1.0}, [{'id': 1}])
+    assert post(db) == "INV/2026-27/00002"
+
+def test_companies_share_a_series_without_colliding(db):
+    db.execute_query("INSERT INTO companies (id, name) VALUES (1, 'One'), (2, 'Two')", commit=True)
+    assert post(db, company_id=1) == "1-INV/2026-27/00001"
+    assert post(db, company_id=2) == "2-INV/2026-27/00001"
+    assert post(db, company_id=2) == "2-INV/2026-27/00002"
+    assert post(db) == "INV/2026-27/00001"
+    assert parse_number("2-INV/2026-27/00002", 2) == ("INV", "2026-27", 2)
+    assert parse_number("INV/2026-27/00002", 2) is None
+
+def test_manual_numbers_in_a_series_move_its_counter(db):
+    assert post(db) == "INV/2026-27/00001"
+    assert post(db, number="INV/2026-27/00003") == "INV/2026-27/00003" # typed ahead of the series
+    assert post(db) == "INV/2026-27/00004" # the counter skipped past it instead of colliding later
+    assert post(db, number="INV/2027-28/00001") == "INV/2027-28/00001"
+    assert post(db, date="2027-05-01") == "INV/2027-28/00002"
+    with pytest.raises(sqlite3.IntegrityError):
+        post(db, number="INV/2026-27/00001") # already used: refused, and the series carries on
+    assert post(db) == "INV/2026-27/00005"
+
+def test_allocation_needs_no_invoice(db):
+    with db.transaction() as conn:
+        assert allocate_invoice_number(conn, "2026-05-01", "X") == "X/2026-27/00001"
+        assert allocate_invoice_number(conn, "2026-05-01", "X") == "X/2026-27/00002"
+
+def test_migration_renames_existing_duplicates(tmp_path):
+    path = str(tmp_path / "dupes.db")
+    conn = sqlite3.connect(path)
+    for _, _, apply in MIGRATIONS[:2]:
+        apply(conn)
+    conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, description TEXT, applied_at TIMESTAMP)")
+    conn.executemany("INSERT INTO schema_version (version) VALUES (?)", [(1,), (2,)])
+    conn.executemany("INSERT INTO invoices (invoice_number) VALUES (?)",
+                     [("INV-20260101-001",), ("INV-20260101-001",), ("INV-20260101-002",)])
+    conn.commit()
+    conn.close()
+
+    db = DBManager(db_path=path)
+    try:
+        numbers = [r[0] for r in db.execute_query("SELECT invoice_number FROM invoices ORDER BY id")]
+        assert numbers == ["INV-20260101-001", "INV-20260101-001#2", "INV-20260101-002"]
+    finally:
+        db.close()
+
+def test_concurrent_posters_get_unique_gap_free_numbers(tmp_path):
+    report = run_stress(str(tmp_path / "stress.db"), processes=4, invoices=25, series="ST")
+    assert report['invoices'] == 100
+    assert report['duplicates'] == 0 and report['gaps'] == []
+    assert sorted(report['numbers'])[-1].endswith("/00100")
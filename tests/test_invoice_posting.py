@@ -0,0 +1,70 @@
+import pytest
+from modules.billing.posting import StockConflict, post_invoice
+
+@pytest.fixture
+def db(db):
+    with db.transaction():
+        db.execute_query("INSERT INTO parties (name) VALUES ('Acme')", commit=True)
+        db.bulk_insert("items", ("name", "sku", "price", "stock_quantity", "tax_rate"),
+                       [(f"Item {i}", f"SKU{i}", 10.0, 100.0, 18.0) for i in range(500)])
+    return db
+
+def make_lines(count, qty=2):
+    return [{'id': i + 1, 'name': f"Item {i}", 'qty': qty, 'rate': 10.0, 'total': qty * 10.0} for i in range(count)]
+
+def test_post_invoice_writes_everything_in_one_commit(db):
+    lines = make_lines(500)
+    inv_id, _ = post_invoice(db, {'number': 'INV-1', 'party_id': 1, 'date': '2026-04-01', 'total_amount': 10000.0}, lines)
+
+    assert db.execute_query("SELECT COUNT(*) FROM invoice_items WHERE invoice_id = ?", (inv_id,))[0][0] == 500
+    assert db.execute_query("SELECT SUM(stock_quantity) FROM items")[0][0] == 500 * 98
+
+    # Header, one executemany for lines and one for stock movements: no per-line statements
+    calls = {s['sql']: s['count'] for s in db.stats.summary()}
+    assert [count for sql, count in calls.items() if sql.startswith("INSERT INTO invoice_items")] == [1]
+    assert calls["INSERT INTO stock_movements (item_id, date, kind, quantity, unit_cost, invoice_id, note) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)"] == 1
+    assert db.execute_query("SELECT COUNT(*), SUM(quantity) FROM stock_movements WHERE kind = 'sale'")[0][:] == \
+        (500, -1000.0)
+
+def test_post_invoice_rolls_back_on_failure(db):
+    lines = make_lines(3) + [{'id': 1, 'name': 'Bad', 'qty': 1, 'rate': 1, 'total': 1}]
+    lines[-1].pop('qty')
+    with pytest.raises(KeyError):
+        post_invoice(db, {'number': 'INV-2', 'party_id': 1, 'date': '2026-04-01', 'total_amount': 61.0}, lines)
+    assert db.execute_query("SELECT COUNT(*) FROM invoices")[0][0] == 0
+    assert db.execute_query("SELECT SUM(stock_quantity) FROM items")[0][0] == 500 * 100
+
+def stock(db, item_id):
+    return db.execute_query("SELECT stock_quantity, version FROM items WHERE id = ?", (item_id,))[0]
+
+def test_short_stock_rejects_the_whole_invoice(db):
+    lines = make_lines(3) + [{'id': 2, 'name': 'Item 1', 'qty': 99, 'rate': 10.0, 'total': 990.0}]
+    with pytest.raises(StockConflict) as info:
+        post_invoice(db, {'number': 'INV-3', 'party_id': 1, 'date': '2026-04-01', 'total_amount': 1050.0}, lines)
+    assert [(s['id'], s['wanted'], s['available']) for s in info.value.shortages] == [(2, 101, 100.0)]
+    assert db.execute_query("SELECT COUNT(*) FROM invoices")[0][0] == 0
+    assert tuple(stock(db, 1)) == (100.0, 0)
+
+    # The cashier can still post it knowingly
+    post_invoice(db, {'number': 'INV-3', 'party_id': 1, 'date': '2026-04-01', 'total_amount': 1050.0}, lines,
+                 allow_short=True)
+    assert tuple(stock(db, 2)) == (-1.0, 1)
+
+def test_stale_lines_recheck_against_current_stock(db):
+    # Two screens loaded item 1 at version 0; both sales fit, so both post
+    line = {'id': 1, 'name': 'Item 0', 'qty': 40, 'rate': 10.0, 'total': 400.0, 'version': 0}
+    for number in ('A-1', 'A-2'):
+        post_invoice(db, {'number': number, 'party_id': 1, 'date': '2026-04-01', 'total_amount': 400.0}, [line])
+    assert tuple(stock(db, 1)) == (20.0, 2)
+
+    # The third no longer fits and is reported as stale
+    with pytest.raises(StockConflict) as info:
+        post_invoice(db, {'number': 'A-3', 'party_id': 1, 'date': '2026-04-01', 'total_amount': 400.0}, [line])
+    assert info.value.shortages[0]['stale'] and info.value.shortages[0]['available'] == 20.0
+
+def test_parallel_posters_never_oversell(tmp_path):
+    from benchmarks.concurrent_posting import run_stress
+    report = run_stress(str(tmp_path / "oversell.db"), processes=4, invoices=15, series="OS", stock=30)
+    assert report['invoices'] == 30 and report['rejected'] == 30
+    assert report['min_stock'] == 0 and report['duplicates'] == 0 and report['gaps'] == []
@@ -0,0 +1,51 @@
+import pytest
+import verify_kpis
+from modules.billing.posting import post_invoice
+from modules.dashboard.kpis import fetch_kpis, rebuild_kpis, verify_kpis as check
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name",), [("Acme",), ("Zen",)])
+    db.bulk_insert("items", ("name", "price", "stock_quantity", "reorder_level"), [("Bolt", 10.0, 12, 10)])
+    return db
+
+def test_counters_follow_every_write(db):
+    post_invoice(db, {'party_id': 1, 'date': '2026-05-01', 'total_amount': 30.1},
+                 [{'id': 1, 'qty': 3, 'rate': 10.0, 'total': 30.1}])
+    post_invoice(db, {'party_id': 2, 'date': '2026-05-01', 'total_amount': 10.0},
+                 [{'id': 1, 'qty': 1, 'rate': 10.0, 'total': 10.0}], status='draft')
+    assert fetch_kpis(db) == {'final_sales': 30.1, 'invoice_count': 2, 'party_count': 2, 'low_stock_count': 1}
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE invoices SET status = 'final' WHERE status = 'draft'")
+        conn.execute("UPDATE invoices SET status = 'cancelled' WHERE id = 1")
+        conn.execute("UPDATE items SET reorder_level = 5")
+        conn.execute("INSERT INTO parties (name) VALUES ('New')")
+    assert fetch_kpis(db) == {'final_sales': 10.0, 'invoice_count': 2, 'party_count': 3, 'low_stock_count': 0}
+
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM invoice_items")
+        conn.execute("DELETE FROM invoices WHERE id = 2")
+        conn.execute("DELETE FROM parties WHERE name = 'New'")
+    assert fetch_kpis(db) == {'final_sales': 0.0, 'invoice_count': 1, 'party_count': 2, 'low_stock_count': 0}
+    assert check(db) == []
+
+def test_verify_finds_and_rebuild_fixes_drift(db):
+    with db.transaction() as conn:
+        conn.execute("UPDATE kpi_counters SET invoice_count = 7, final_sales = 99")
+    assert check(db) == [('final_sales', 99.0, 0.0), ('invoice_count', 7, 0)]
+    assert rebuild_kpis(db)['invoice_count'] == 0 and check(db) == []
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE kpi_counters SET party_count = 0")
+    path = db.db_path
+    assert verify_kpis.main(["--db", path]) == 1
+    assert verify_kpis.main(["--db", path, "--rebuild"]) == 0
+    assert verify_kpis.main(["--db", path]) == 0
+
+def test_sales_do_not_drift_on_sub_paisa_totals(db):
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO invoices (invoice_number, party_id, date, total_amount, status) "
+                         "VALUES (?, 1, '2026-05-01', 15.4995, 'final')", [(f"T-{i}",) for i in range(200)])
+    assert fetch_kpis(db)['final_sales'] == 3099.9
+    assert check(db) == []
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+from db.db_manager import DBManager
+from db.migrations import apply_migrations, current_version, MIGRATIONS, LATEST_VERSION
+
+def test_fresh_database_is_at_latest_version(db):
+    rows = db.execute_query("SELECT version FROM schema_version ORDER BY version")
+    assert [r[0] for r in rows] == [m[0] for m in MIGRATIONS]
+    # Stock changes write no index on items.stock_quantity
+    assert not db.execute_query("SELECT 1 FROM sqlite_master WHERE name = 'idx_items_stock'")
+
+def test_current_database_skips_schema_work(tmp_path):
+    path = str(tmp_path / "current.db")
+    DBManager(db_path=path).close()
+
+    conn = sqlite3.connect(path)
+    try:
+        assert apply_migrations(conn) == []
+        assert conn.total_changes == 0
+    finally:
+        conn.close()
+
+def test_legacy_database_is_adopted(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    # Shape of a database from before stock/tax columns and with the old compliance table
+    conn.executescript("""
+        CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, sku TEXT, price REAL);
+        CREATE TABLE compliance_events (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, due_date DATE,
+                                        status TEXT DEFAULT 'pending');
+        INSERT INTO items (name, sku, price) VALUES ('Widget', 'W1', 10), ('Copy', ' w1', 10), ('Blank', '', 1);
+        INSERT INTO compliance_events (name, due_date) VALUES ('GSTR-1 Filling', '2026-01-11');
+    """)
+    conn.close()
+
+    db = DBManager(db_path=path)
+    try:
+        assert db.execute_query("SELECT name, stock_quantity, tax_rate, hsn_code FROM items")[0][0] == "Widget"
+        # SKUs made unique: the oldest keeps it, later copies are marked, blanks become NULL
+        assert [r[0] for r in db.execute_query("SELECT sku FROM items ORDER BY id")] == ["W1", "W1#2", None]
+        assert db.execute_query("SELECT title FROM compliance_events")[0][0] == "GSTR-1 Filling"
+        assert db.execute_query("SELECT MAX(version) FROM schema_version")[0][0] == LATEST_VERSION
+    finally:
+        db.close()
+
+def test_failed_migration_rolls_back_everything(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "broken.db"))
+
+    def create_table(c):
+        c.execute("CREATE TABLE first_step (id INTEGER)")
+
+    def explode(c):
+        raise RuntimeError("boom")
+
+    try:
+        with pytest.raises(RuntimeError):
+            apply_migrations(conn, [(1, "first", create_table), (2, "broken", explode)])
+        assert current_version(conn) == 0
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name='first_step'").fetchone()[0] == 0
+    finally:
+        conn.close()
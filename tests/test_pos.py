@@ -0,0 +1,65 @@
+import time
+import pytest
+from modules.billing.pos import PosCart, parse_scan
+from modules.billing.posting import post_invoice
+from modules.billing.view import ITEM_MASTER_SQL
+
+ITEMS = [
+    (1, "Milk 1L", 60.0, 3, 5.0, "SKU001", None),
+    (2, "Bread", 40.0, 50, 0.0, "sku002", None),
+    (3, "No Code", 10.0, 5, 0.0, None, None),
+]
+
+def test_parse_scan():
+    assert parse_scan(" sku001 ") == ("SKU001", 1.0)
+    assert parse_scan("3*SKU001") == ("SKU001", 3.0)
+    assert parse_scan("2 x sku002") == ("SKU002", 2.0)
+    with pytest.raises(ValueError):
+        parse_scan("a*SKU001")
+    with pytest.raises(ValueError):
+        parse_scan("0*SKU001")
+
+def test_repeat_scans_add_to_one_line():
+    cart = PosCart(ITEMS)
+    cart.scan("SKU001")
+    cart.scan("sku002")
+    line = cart.scan("sku001")
+    assert line['qty'] == 2 and line['total'] == 120.0
+    assert [l['id'] for l in cart.invoice_lines()] == [1, 2]
+    assert cart.total == 160.0
+
+    assert not cart.short(line)
+    assert cart.short(cart.scan("2*SKU001")) # 4 wanted, 3 in stock
+    with pytest.raises(ValueError):
+        cart.scan("NOPE")
+
+    cart.set_qty(1, 0)
+    assert cart.total == 40.0 and list(cart.lines) == [2]
+
+def test_item_updates_reach_codes_and_lines():
+    cart = PosCart(ITEMS)
+    cart.scan("SKU001")
+    cart.update_item((1, "Milk 1L", 60.0, 10, 5.0, "MILK1", None))
+    assert cart.lookup("SKU001") is None and cart.lookup("milk1")[0] == 1
+    assert cart.lines[1]['stock'] == 10
+    cart.remove_item(2)
+    assert cart.lookup("SKU002") is None
+
+def test_checkout_posts_the_cart(db):
+    db.bulk_insert("items", ("name", "sku", "price", "stock_quantity", "tax_rate"),
+                   [(name, sku, price, stock, tax) for _, name, price, stock, tax, sku, _ in ITEMS])
+    cart = PosCart(db.execute_query(ITEM_MASTER_SQL))
+    for code in ("SKU001", "SKU002", "SKU001"):
+        cart.scan(code)
+    post_invoice(db, {'number': 'POS-1', 'party_id': None, 'date': '2026-04-01', 'total_amount': cart.total},
+                 cart.invoice_lines())
+    assert db.execute_query("SELECT total_amount FROM invoices")[0][0] == 160.0
+    assert [r[0] for r in db.execute_query("SELECT stock_quantity FROM items ORDER BY id")] == [1.0, 49.0, 5.0]
+    assert db.execute_query("SELECT COUNT(*) FROM invoice_items")[0][0] == 2
+
+def test_scan_latency_with_200k_items():
+    cart = PosCart((i, f"Item {i}", 10.0, 100, 18.0, f"SKU{i:07d}", None) for i in range(1, 200_001))
+    start = time.perf_counter()
+    for i in range(1, 1001):
+        cart.scan(f"SKU{i * 199:07d}")
+    assert (time.perf_counter() - start) / 1000 < 0.010
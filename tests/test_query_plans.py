@@ -0,0 +1,131 @@
+import re
+import importlib
+import random
+
+import pytest
+from core.virtual_tree import SqlRowSource
+from db.db_manager import DBManager
+
+VIEW_MODULES = [
+    "modules.analytics.view",
+    "modules.approvals.view",
+    "modules.billing.view",
+    "modules.compliance.view",
+    "modules.dashboard.view",
+    "modules.documents.view",
+    "modules.hr.view",
+    "modules.inventory.view",
+]
+
+# Queries that read every row by design (master lists and exports)
+FULL_READS = {
+    "PARTY_MASTER_SQL",
+    "PARTY_LIST_SQL",
+    "ITEM_MASTER_SQL",
+    "STOCK_EXPORT_SQL",
+    "EMPLOYEE_LIST_SQL",
+    "EMPLOYEE_EXPORT_SQL",
+}
+
+# "SCAN invoices" / "SCAN i" without "USING ... INDEX" is a full table scan
+TABLE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+def collect_queries():
+    queries = []
+    for name in VIEW_MODULES:
+        module = importlib.import_module(name)
+        for attr, value in vars(module).items():
+            if attr.endswith("_SQL") and isinstance(value, str):
+                queries.append((f"{name}.{attr}", attr, value))
+    return queries
+
+def collect_list_sources():
+    sources = []
+    for name in VIEW_MODULES:
+        module = importlib.import_module(name)
+        for attr, value in vars(module).items():
+            if attr.endswith("_LIST_SOURCE") and isinstance(value, dict):
+                sources.append((f"{name}.{attr}", value))
+    return sources
+
+def seed(db, invoices=5000):
+    rnd = random.Random(42)
+    with db.write_connection() as conn:
+        conn.executemany("INSERT INTO parties (name, phone) VALUES (?, ?)",
+                         [(f"Party {i}", f"98{i:08d}") for i in range(300)])
+        conn.executemany("INSERT INTO items (name, sku, price, stock_quantity) VALUES (?, ?, ?, ?)",
+                         [(f"Item {i}", f"SKU{i}", rnd.uniform(10, 500), rnd.randint(0, 100)) for i in range(500)])
+        conn.executemany("INSERT INTO invoices (invoice_number, party_id, date, total_amount, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         [(f"INV-{i}", rnd.randint(1, 300), f"20{rnd.randint(20, 26)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                           rnd.uniform(100, 10000), rnd.choice(["draft", "final", "paid"]), f"2026-01-01 00:00:{i % 60:02d}")
+                          for i in range(invoices)])
+        conn.executemany("INSERT INTO invoice_items (invoice_id, item_id, quantity, rate, total) VALUES (?, ?, ?, ?, ?)",
+                         [(rnd.randint(1, invoices), rnd.randint(1, 500), 1, 10, 10) for _ in range(invoices * 3)])
+        conn.executemany("INSERT INTO documents (filename, filepath, doc_type) VALUES (?, ?, ?)",
+                         [(f"doc{i}.pdf", f"/tmp/doc{i}.pdf", ".PDF") for i in range(500)])
+        conn.executemany("INSERT INTO approval_requests (module, reference_id) VALUES (?, ?)",
+                         [("Expense > 5000", i) for i in range(500)])
+        conn.executemany("INSERT INTO employees (name, role, base_salary) VALUES (?, ?, ?)",
+                         [(f"Emp {i}", "Staff", 20000) for i in range(100)])
+        conn.execute("ANALYZE")
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    db = DBManager(db_path=str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    seed(db)
+    yield db
+    db.close()
+
+@pytest.mark.parametrize("label,attr,sql", collect_queries(), ids=lambda v: v if "." in str(v) else "")
+def test_no_table_scans(seeded_db, label, attr, sql):
+    sql = sql.replace("{ids}", "?") # Change-event row lookups, shown for a single id
+    params = (None,) * sql.count("?")
+    plan = [row[3] for row in seeded_db.execute_query("EXPLAIN QUERY PLAN " + sql, params)]
+
+    if attr not in FULL_READS:
+        scans = [step for step in plan if TABLE_SCAN.match(step)]
+        assert not scans, f"{label} falls back to a table scan: {plan}"
+
+        # An ORDER BY on its own (not over an aggregate) should come straight off an index
+        if "GROUP BY" not in sql.upper():
+            assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{label} sorts without an index: {plan}"
+
+@pytest.mark.parametrize("label,spec", collect_list_sources(), ids=lambda v: v if isinstance(v, str) else "")
+def test_list_pages_seek_by_index(seeded_db, label, spec):
+    # Every page a VirtualTreeview asks for in its default order, and the statements behind them
+    source = SqlRowSource(seeded_db, **spec)
+    first = source.page(0, 50)
+    seeded_db.stats.reset()
+    source.after(first[-1], 50)
+    source.before(first[-1], 50)
+
+    for statement in seeded_db.stats.summary():
+        plan = [row[3] for row in seeded_db.execute_query("EXPLAIN QUERY PLAN " + statement['sql'],
+                                                          (None,) * statement['sql'].count("?"))]
+        assert not [step for step in plan if TABLE_SCAN.match(step)], f"{label} scans for a page: {plan}"
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{label} sorts every page: {plan}"
+
+INVOICE_FILTERS = [
+    dict(number_prefix="INV-12"),
+    dict(party="Party 4"),
+    dict(date_from="2024-01-01", date_to="2024-01-31"),
+    dict(status="paid", min_amount="9000"),
+]
+
+@pytest.mark.parametrize("fields", INVOICE_FILTERS, ids=lambda f: ",".join(f))
+def test_invoice_filters_use_indexes(seeded_db, fields):
+    from modules.billing.filters import compile_invoice_filter
+    from modules.billing.view import INVOICE_LIST_SOURCE
+
+    where, params = compile_invoice_filter(**fields)
+    source = SqlRowSource(seeded_db, where=where, params=params, **INVOICE_LIST_SOURCE)
+    if "date_from" in fields:
+        source.set_sort("date", True) # as InvoiceListFrame does for date ranges
+    seeded_db.stats.reset()
+    source.count()
+    source.page(0, 50)
+
+    for statement in seeded_db.stats.summary():
+        plan = [row[3] for row in seeded_db.execute_query("EXPLAIN QUERY PLAN " + statement['sql'], params + (50, 0)
+                                                          if "LIMIT" in statement['sql'] else params)]
+        assert not [step for step in plan if TABLE_SCAN.match(step)], f"{fields} scans: {plan}"
@@ -0,0 +1,55 @@
+import csv
+import os
+import pytest
+from modules.billing.posting import post_invoice
+from modules.inventory.catalog import import_catalog
+from modules.inventory.ledger import receive_purchase
+from modules.inventory.reorder import LOW_STOCK_COUNT_SQL, suggest_purchase_orders, write_purchase_orders
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name", "gstin"), [("Acme Supply", "29ACME0000A1Z5"), ("Zen Traders", None)])
+    db.bulk_insert("items", ("name", "sku", "price", "stock_quantity", "reorder_level", "reorder_qty", "supplier_id"),
+                   [("Bolt", "BOLT", 10.0, 12, 10, 50, 1), ("Nut", "NUT", 1.0, 3, 5, None, 1),
+                    ("Rice", "RICE", 60.0, 100, 20, None, 2), ("Glue", "GLUE", 5.0, 0, 10, None, None)])
+    return db
+
+def low_stock(db):
+    return [tuple(r) for r in db.execute_query(
+        "SELECT item_id, stock_quantity, reorder_level FROM low_stock_items ORDER BY item_id")]
+
+def test_low_stock_set_follows_stock_and_levels(db):
+    assert low_stock(db) == [(2, 3, 5), (4, 0, 10)] # from the items' insert
+    post_invoice(db, {'party_id': 2, 'date': '2026-05-01', 'total_amount': 30.0},
+                 [{'id': 1, 'qty': 3, 'rate': 10.0, 'total': 30.0}])
+    receive_purchase(db, 2, 10, 0.4)
+    with db.transaction() as conn:
+        conn.execute("UPDATE items SET reorder_level = 200 WHERE id = 3")
+        conn.execute("DELETE FROM items WHERE id = 4")
+    assert low_stock(db) == [(1, 9, 10), (3, 100, 200)]
+    assert db.execute_query(LOW_STOCK_COUNT_SQL)[0][0] == 2
+
+def test_suggested_orders_group_by_supplier(db, tmp_path):
+    receive_purchase(db, 2, 1, 0.4, '2026-04-01') # stock 4, still low; its last purchase price is used
+    orders = suggest_purchase_orders(db)
+    assert [(o['supplier'], [(l['name'], l['qty'], l['unit_cost']) for l in o['lines']]) for o in orders] == \
+        [("Acme Supply", [("Nut", 5, 0.4)]), (None, [("Glue", 10, 0)])] # no cost known for Glue yet
+    assert orders[0]['total'] == 2.0
+
+    paths = write_purchase_orders(orders, str(tmp_path / "po"), day='2026-05-01')
+    assert [os.path.basename(p) for p in paths] == ["PO-2026-05-01-1-Acme-Supply.csv",
+                                                    "PO-2026-05-01-0-no-supplier.csv"]
+    with open(paths[0], newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[1][4] == "Order Qty" and rows[2][:2] == ["NUT", "Nut"] and rows[-1][-1] == "2.0"
+
+def test_catalog_sets_levels_and_suppliers(db, tmp_path):
+    path = tmp_path / "cat.csv"
+    path.write_text("sku,name,reorder_level,reorder_qty,supplier\n"
+                    "RICE,,150,40,29acme0000a1z5\nTAPE,Tape,,,zen traders\nPIN,Pin,,,Nobody\n")
+    result = import_catalog(db, str(path))
+    assert (result['inserted'], result['updated'], result['rejected']) == (1, 1, 1)
+    items = db.execute_query("SELECT sku, reorder_level, reorder_qty, supplier_id FROM items "
+                             "WHERE sku IN ('RICE', 'TAPE') ORDER BY sku")
+    assert [tuple(r) for r in items] == [("RICE", 150, 40, 1), ("TAPE", 10, None, 2)]
+    assert (3, 100, 150) in low_stock(db)
@@ -0,0 +1,79 @@
+import time
+import pytest
+from common.search_index import SearchIndex
+from modules.billing.view import item_texts, party_texts
+
+ITEMS = [
+    (1, "Steel Bolt 10mm", 12.0, 100, 18.0, "SKU0001", "7318"),
+    (2, "Cement Bag", 380.0, 40, 28.0, "CEM-50", "2523"),
+    (3, "Stainless Steel Pipe", 950.0, 5, 18.0, "SKU0003", "7306"),
+    (4, "Paint 1L", 250.0, 0, None, None, None),
+]
+
+@pytest.fixture
+def items():
+    index = SearchIndex(item_texts)
+    index.build(ITEMS)
+    return index
+
+def keys(records):
+    return [r[0] for r in records]
+
+def test_prefix_matches_rank_before_substring_matches(items):
+    assert keys(items.search("steel")) == [1, 3]
+    assert keys(items.search("st")) == [3, 1]
+    assert keys(items.search("eel")) == [1, 3]
+    assert items.search("  STEEL   bolt ") == [ITEMS[0]]
+    assert items.search("xyz") == [] and items.search("") == []
+
+def test_lookup_by_sku_hsn_and_phone(items):
+    assert keys(items.search("cem-50")) == [2]
+    assert keys(items.search("7306")) == [3]
+    assert keys(items.search("0003")) == [3]
+
+    parties = SearchIndex(party_texts)
+    parties.build([(1, "Acme Traders", "9876543210", "27AAACA1234A1Z5"), (2, "Bharat Steel", None, None)])
+    assert keys(parties.search("98765")) == [1]
+    assert keys(parties.search("aaaca")) == [1]
+    assert keys(parties.search("bha")) == [2]
+
+def test_updates_and_removals(items):
+    items.add((2, "Portland Cement", 390.0, 35, 28.0, "CEM-50", "2523"))
+    assert keys(items.search("portland")) == [2]
+    assert items.search("cement bag") == []
+    assert items.get(2)[3] == 35
+
+    items.remove(3)
+    assert keys(items.search("steel")) == [1]
+    assert items.search("7306") == [] and len(items) == 3
+
+    items.add((5, "Steel Wire", 60.0, 10, 18.0, "SKU0005", "7217"))
+    assert keys(items.search("steel")) == [1, 5]
+
+def test_keystroke_search_is_fast():
+    index = SearchIndex(item_texts)
+    index.build((i, f"Item {i:06d} steel", 1.0, 1, 18.0, f"SKU{i:07d}", f"{1000 + i % 9000}")
+                for i in range(1, 20_001))
+    start = time.perf_counter()
+    for query in ("i", "item 01", "sku00012", "0042", "eel", "zzz"):
+        assert len(index.search(query)) <= 10
+    assert (time.perf_counter() - start) / 6 < 0.005
+
+def test_renamed_records_stop_matching_old_words(items):
+    items.add((4, "Apple Paint", 250.0, 0, None, None, None))
+    items.add((5, "Apple Juice", 90.0, 10, 12.0, None, None))
+    items.add((4, "Pineapple", 250.0, 0, None, None, None))
+    assert keys(items.search("app")) == [5, 4] # "pineapple" is only a substring match now
+    assert items.search("paint") == []
+
+def test_stock_changes_leave_the_index_alone(items):
+    terms = list(items._terms)
+    for stock in range(5000):
+        items.add((1, "Steel Bolt 10mm", 12.0, stock, 18.0, "SKU0001", "7318"))
+    assert items._terms == terms and items.get(1)[3] == 4999
+    assert not items.needs_compaction
+
+    for i in range(1500):
+        items.add((1, f"Steel Bolt {i}", 12.0, 0, 18.0, "SKU0001", "7318"))
+    assert items.needs_compaction # left to the owner, which rebuilds off the UI thread
+    assert keys(items.search("steel bolt 1499")) == [1]
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+from modules.billing.posting import post_invoice
+from modules.inventory.ledger import (adjust_stock, balance_mismatches, movement, record_movements,
+                                      stock_as_of, take_snapshot)
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("parties", ("name",), [("Acme",)])
+    db.bulk_insert("items", ("name", "price", "stock_quantity"), [("Bolt", 10.0, 50), ("Nut", 1.0, 0)])
+    return db
+
+def test_movements_drive_the_stock_balance(db):
+    opening = db.execute_query("SELECT item_id, kind, quantity FROM stock_movements")
+    assert [tuple(r) for r in opening] == [(1, "opening", 50)] # written when the item was created
+
+    post_invoice(db, {'party_id': 1, 'date': '2026-05-02', 'total_amount': 30.0},
+                 [{'id': 1, 'qty': 3, 'rate': 10.0, 'total': 30.0}])
+    record_movements(db, [movement(2, '2026-05-03', "purchase", 40, unit_cost=0.5)])
+    assert adjust_stock(db, {1: 45, 2: 40}, day='2026-05-04') == 1 # the nut count already matches
+
+    stock = db.execute_query("SELECT stock_quantity, version FROM items ORDER BY id")
+    assert [tuple(r) for r in stock] == [(45, 2), (40, 1)]
+    assert balance_mismatches(db) == []
+    with pytest.raises(ValueError):
+        movement(1, '2026-05-04', "theft", -1)
+
+def test_stock_as_of_uses_snapshots_and_backdated_movements(db):
+    record_movements(db, [movement(1, '2026-04-10', "sale", -5), movement(1, '2026-05-10', "sale", -7),
+                          movement(2, '2026-04-20', "purchase", 9)])
+    assert take_snapshot(db, '2026-04-30') == 2
+    assert stock_as_of(db, '2026-04-30') == {1: -5, 2: 9} # opening stock is dated today
+    assert stock_as_of(db, '2026-05-31', [1]) == {1: -12}
+
+    # A late entry for April moves the stored snapshot along with it
+    record_movements(db, [movement(1, '2026-04-15', "return", 2)])
+    assert db.execute_query("SELECT quantity FROM stock_snapshots WHERE item_id = 1")[0][0] == -3
+    assert stock_as_of(db, '2026-05-31', [1]) == {1: -10}
+    assert stock_as_of(db, '2026-05-31', []) == {}
+
+def test_ledger_is_append_only(db):
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        with db.transaction() as conn:
+            conn.execute("UPDATE stock_movements SET quantity = 1")
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM stock_movements")
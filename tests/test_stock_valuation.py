@@ -0,0 +1,66 @@
+import pytest
+from modules.inventory.ledger import movement, receive_purchase, record_movements
+from modules.inventory.valuation import ItemCost, RevalueRunner, revalue, valuation_as_of
+
+@pytest.fixture
+def db(db):
+    db.bulk_insert("items", ("name", "price", "stock_quantity"), [("Bolt", 20.0, 0), ("Nut", 3.0, 0), ("Idle", 1.0, 0)])
+    return db
+
+def valuations(db):
+    rows = db.execute_query("SELECT item_id, quantity, fifo_value, avg_cost, avg_value FROM item_valuations "
+                            "ORDER BY item_id")
+    return [tuple(r) for r in rows]
+
+def test_fifo_and_average_cost():
+    cost = ItemCost()
+    cost.apply(10, 5.0, 99.0)
+    cost.apply(10, 8.0, 99.0)
+    cost.apply(-15, None, 99.0) # all of the first layer and half the second
+    assert (cost.quantity, cost.fifo_value(), cost.avg_cost) == (5, 40.0, 6.5)
+    cost.apply(-7, None, 99.0) # oversold by 2, owed at the average
+    assert list(cost.layers) == [[-2, 6.5]]
+    cost.apply(4, 9.0, 99.0)
+    assert (cost.quantity, list(cost.layers), cost.avg_cost) == (2, [[2, 9.0]], 9.0)
+    cost.apply(1, None, 99.0) # a return with no cost comes back at the average
+    assert cost.fifo_value() == 27.0
+
+def test_revalue_replays_only_new_movements(db):
+    receive_purchase(db, 1, 10, 5.0, '2026-05-01')
+    receive_purchase(db, 2, 100, 0.5, '2026-05-01')
+    record_movements(db, [movement(1, '2026-05-02', "sale", -4), movement(2, '2026-05-03', "return", 10)])
+    assert revalue(db) == 2
+    assert valuations(db) == [(1, 6, 30.0, 5.0, 30.0), (2, 110, 55.0, 0.5, 55.0)]
+    assert revalue(db) == 0
+
+    receive_purchase(db, 1, 6, 10.0, '2026-05-05')
+    assert revalue(db) == 1
+    assert valuations(db)[0] == (1, 12, 90.0, 7.5, 90.0)
+
+    # Backdated: item 1 is rebuilt from the start, so the May 2 sale now comes out of the April stock
+    receive_purchase(db, 1, 4, 1.0, '2026-04-01')
+    assert revalue(db) == 1
+    assert valuations(db)[0][:3] == (1, 16, 110.0)
+    assert valuations(db)[0][1] == db.execute_query("SELECT stock_quantity FROM items WHERE id = 1")[0][0]
+
+def test_valuation_as_of_a_past_date(db):
+    db.bulk_insert("items", ("name", "price", "stock_quantity"), [("Opening", 7.0, 3)]) # no cost: the price
+    receive_purchase(db, 1, 10, 5.0, '2026-04-10')
+    record_movements(db, [movement(1, '2026-05-10', "sale", -2)])
+    assert valuation_as_of(db, '2026-04-30') == [(1, 10, 50.0, 5.0, 50.0)]
+    assert valuation_as_of(db, '2099-12-31') == [(1, 8, 40.0, 5.0, 40.0), (4, 3, 21.0, 7.0, 21.0)]
+    with pytest.raises(ValueError):
+        receive_purchase(db, 1, -1, 5.0)
+
+def test_revalue_runner_coalesces_requests(db):
+    receive_purchase(db, 1, 10, 5.0, '2026-05-01')
+    errors = []
+    runner = RevalueRunner(db, on_error=errors.append)
+    for _ in range(20):
+        runner.request()
+    assert runner.wait(10) and errors == []
+    assert valuations(db) == [(1, 10, 50.0, 5.0, 50.0)]
+
+    receive_purchase(db, 2, 4, 1.0, '2026-05-02')
+    runner.request()
+    assert runner.wait(10) and [v[0] for v in valuations(db)] == [1, 2]
@@ -0,0 +1,68 @@
+import pytest
+from core.virtual_tree import RowWindow, SqlRowSource
+
+@pytest.fixture
+def db(db):
+    # Duplicate and NULL sort values exercise the (sort, id) tie-break and the NULL run (SKUs are unique)
+    db.bulk_insert("items", ("name", "hsn_code", "price"),
+                   [(f"Item {i}", None if i % 7 == 0 else f"HSN{i % 13:02d}", i % 5) for i in range(500)])
+    return db
+
+def make_source(db, sort, descending):
+    return SqlRowSource(db, (("id", "id"), ("name", "name"), ("hsn_code", "hsn_code"), ("price", "price")), "items",
+                        sort=sort, descending=descending, where="price > ?", params=(0,))
+
+def expected_ids(db, sort, descending):
+    direction = "DESC" if descending else "ASC"
+    order = f"{sort} {direction}, id {direction}" if sort != "id" else f"id {direction}"
+    return [r[0] for r in db.execute_query(f"SELECT id FROM items WHERE price > 0 ORDER BY {order}")]
+
+@pytest.mark.parametrize("sort", ["id", "hsn_code", "price"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_walk_matches_full_order(db, sort, descending):
+    source = make_source(db, sort, descending)
+    expected = expected_ids(db, sort, descending)
+    assert source.count() == len(expected)
+
+    rows = source.page(0, 37)
+    while True:
+        more = source.after(rows[-1], 37)
+        if not more:
+            break
+        rows += more
+    assert [r[0] for r in rows] == expected
+
+    # And back again from the last row
+    back = [rows[-1]]
+    while True:
+        more = source.before(back[0], 37)
+        if not more:
+            break
+        back = more + back
+    assert [r[0] for r in back] == expected
+
+def test_window_scrolls_through_source(db):
+    source = make_source(db, "hsn_code", True)
+    expected = expected_ids(db, "hsn_code", True)
+    total, visible = len(expected), 15
+    window = RowWindow(page_size=50, max_rows=120)
+
+    def show(top):
+        fetches = 0
+        while not window.covers(top, visible, total):
+            kind, anchor, limit = window.plan(top, visible)
+            rows = {"page": source.page, "after": source.after, "before": source.before}[kind](anchor, limit)
+            window.apply(kind, anchor, limit, rows)
+            fetches += 1
+        assert [r[0] for r in window.rows_at(top, visible)] == expected[top:top + visible]
+        return fetches
+
+    # Scrolling down and back up line by line needs only occasional keyset fetches
+    steps = list(range(0, total - visible, 3))
+    assert sum(show(top) for top in steps + steps[::-1]) < len(steps) // 5
+    assert len(window.rows) <= window.max_rows
+
+    # A jump goes straight to an OFFSET page
+    window.clear()
+    assert window.plan(300, visible)[0] == "page"
+    show(300)
@@ -0,0 +1,32 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.db_manager import DBManager
+from modules.dashboard.kpis import rebuild_kpis, verify_kpis
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recount the dashboard KPI counters and compare them")
+    parser.add_argument("--db", default="biz_app.db")
+    parser.add_argument("--rebuild", action="store_true", help="replace drifted counters with the recount")
+    args = parser.parse_args(argv)
+
+    db = DBManager(db_path=args.db, slow_query_ms=None)
+    try:
+        drift = verify_kpis(db)
+        for name, stored, actual in drift:
+            print(f"  {name}: counter {stored} but recount {actual}")
+        if not drift:
+            print("All KPI counters match a recount.")
+        elif args.rebuild:
+            rebuild_kpis(db)
+            print(f"Rebuilt {len(drift)} drifted counters.")
+    finally:
+        db.close()
+    return 1 if drift and not args.rebuild else 0
+
+if __name__ == "__main__":
+    sys.exit(main())